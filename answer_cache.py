@@ -0,0 +1,107 @@
+"""
+Cache câu trả lời chat theo ngữ nghĩa: câu hỏi mới đủ giống (cosine giữa
+embedding) một câu hỏi đã trả lời trên cùng bộ CV thì dùng lại câu trả lời
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from metrics import count_cache
+
+
+class SemanticAnswerCache:
+    """
+    Cache trong bộ nhớ, key = (hash bộ CV, phạm vi câu hỏi, embedding câu hỏi).
+    Tra cứu bằng láng giềng gần nhất (tích vô hướng trên vector đã chuẩn hoá)
+    trong cùng (hash bộ CV, phạm vi); loại bỏ theo LRU và TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()  # id -> entry, thứ tự LRU
+        self._groups: Dict[Tuple[str, str], Tuple[List[int], Optional[np.ndarray]]] = {}
+        self._next_id = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        group = (entry["corpus_hash"], entry["scope"])
+        ids, _ = self._groups[group]
+        ids.remove(entry_id)
+        if ids:
+            # Ma trận vector của nhóm được dựng lại ở lần tra cứu sau
+            self._groups[group] = (ids, None)
+        else:
+            del self._groups[group]
+
+    def _group_matrix(self, group: Tuple[str, str]) -> Tuple[List[int], Optional[np.ndarray]]:
+        ids, matrix = self._groups.get(group, ([], None))
+        if ids and matrix is None:
+            matrix = np.stack([self._entries[entry_id]["vector"] for entry_id in ids])
+            self._groups[group] = (ids, matrix)
+        return ids, matrix
+
+    def get(self, corpus_hash: str, question_vector, scope: str = "") -> Optional[Tuple[dict, float]]:
+        """
+        Tìm câu trả lời cho câu hỏi gần nhất (cùng bộ CV và phạm vi).
+        Trả về (entry, độ tương đồng) hoặc None; entry gồm question, answer, sources.
+        """
+        query = self._normalize(question_vector)
+        with self._lock:
+            ids, matrix = self._group_matrix((corpus_hash, scope))
+            if matrix is not None:
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                entry_id, similarity = ids[best], float(similarities[best])
+                entry = self._entries[entry_id]
+                if similarity >= self.similarity_threshold:
+                    if time.time() - entry["created_at"] <= self.ttl_seconds:
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        count_cache("answer", hits=1)
+                        return entry, similarity
+                    self._remove(entry_id)
+            self.misses += 1
+            count_cache("answer", misses=1)
+        return None
+
+    def put(self, corpus_hash: str, question: str, question_vector, answer: str, sources: list, scope: str = ""):
+        """Lưu câu trả lời của một câu hỏi"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "corpus_hash": corpus_hash,
+                "scope": scope,
+                "question": question,
+                "vector": self._normalize(question_vector),
+                "answer": answer,
+                "sources": sources,
+                "created_at": time.time(),
+            }
+            ids, _ = self._groups.get((corpus_hash, scope), ([], None))
+            self._groups[(corpus_hash, scope)] = (ids + [entry_id], None)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> dict:
+        """Thống kê hit/miss và số câu trả lời đang lưu"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
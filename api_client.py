@@ -0,0 +1,61 @@
+"""
+Client cho API service (api_server.py), dùng bởi giao diện Streamlit khi đặt API_URL
+"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+import httpx
+from config import API_URL, HTTP_TIMEOUT_SECONDS
+
+_api_client = None
+
+
+class CVApiClient:
+    def __init__(self, base_url: str, timeout: float = HTTP_TIMEOUT_SECONDS):
+        # Chấm điểm nhiều CV có thể lâu hơn nhiều so với một lần gọi API model
+        self._client = httpx.Client(base_url=base_url, timeout=httpx.Timeout(timeout, read=None))
+
+    def close(self):
+        self._client.close()
+
+    @staticmethod
+    def _files(files: List[Tuple[str, bytes]]) -> list:
+        return [("files", (file_name, data, "application/pdf")) for file_name, data in files]
+
+    def ingest(self, files: List[Tuple[str, bytes]]) -> List[Dict]:
+        """Thêm CV vào index của service, trả về file_name / file_hash / chunks / new của từng file"""
+        response = self._client.post("/ingest", files=self._files(files))
+        response.raise_for_status()
+        return response.json()["files"]
+
+    def ask_stream(self, question: str, file_hashes: Optional[List[str]] = None) -> Iterator[dict]:
+        """Các sự kiện {"token"} / {"done"} của câu trả lời"""
+        payload = {"question": question, "file_hashes": file_hashes, "stream": True}
+        with self._client.stream("POST", "/ask", json=payload) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def score(
+        self,
+        files: List[Tuple[str, bytes]],
+        job_description: str,
+        batch: bool = False,
+        local_skills: bool = True,
+    ) -> Dict:
+        """Chấm điểm CV: {"job_requirements": ..., "results": [CV đã xếp hạng]}"""
+        data = {"job_description": job_description, "batch": str(batch).lower(), "local_skills": str(local_skills).lower()}
+        response = self._client.post("/score", files=self._files(files), data=data)
+        response.raise_for_status()
+        return response.json()
+
+
+def get_api_client() -> CVApiClient:
+    """
+    Lấy client API (dùng chung cho cả process)
+    """
+    global _api_client
+    if _api_client is None:
+        _api_client = CVApiClient(API_URL)
+    return _api_client
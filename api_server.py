@@ -0,0 +1,328 @@
+"""
+API service (ASGI, Starlette) chạy lâu dài: index, embedding, LLM, cache và
+client HTTP tới API model được khởi tạo một lần khi start và dùng chung cho
+mọi request, thay vì dựng lại theo từng phiên Streamlit.
+
+- POST /ingest  multipart "files": thêm CV vào index (bỏ qua file đã có, CV gần trùng
+                chỉ được ghi nhận là bản trùng của CV đại diện)
+- POST /ask     JSON {"question", "file_hashes"?, "stream"?}: trả lời câu hỏi
+                (stream=true trả về NDJSON: các dòng {"token"} rồi {"done"})
+- POST /score   multipart "files" + "job_description" (+ "batch", "local_skills")
+- GET  /health, GET /metrics (Prometheus)
+
+Câu hỏi embed cùng lúc và prompt chấm điểm từ nhiều request được gom thành
+một request tới API model (micro_batching.py).
+
+Chạy: uvicorn api_server:app --host 127.0.0.1 --port 8000
+      python api_server.py
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from config import (
+    INDEX_DIR, API_HOST, API_PORT, API_LLM_BACKEND, API_SCORING_WORKERS,
+    LLM_REQUESTS_PER_SECOND, LLM_BURST, SCORING_BATCH_TOKEN_BUDGET, LOCAL_SKILL_MATCHING
+)
+from metrics import get_metrics, trace
+
+
+class ReadWriteLock:
+    """
+    Nhiều luồng đọc (tìm kiếm) song song, luồng ghi (thêm CV vào index) độc quyền
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+def create_service_llm(backend: str = API_LLM_BACKEND):
+    """LLM chấm điểm của service (chưa gom prompt)"""
+    if backend == "openai":
+        from llm_clients import create_scoring_llm
+        return create_scoring_llm()
+    if backend == "fake":
+        from fake_llm import FakeLLM
+        return FakeLLM()
+    raise ValueError(f"LLM backend của API không hợp lệ: {backend}")
+
+
+class CVService:
+    """
+    Trạng thái dùng chung của API service
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        # Import trong hàm để tránh import vòng giữa cv_scoring và scoring_engine
+        from cv_chat import create_chat_llm, get_answer_cache
+        from cv_scoring import get_result_cache
+        from index_manager import CVIndexManager
+        from micro_batching import BatchedLLM, BatchingEmbeddings
+        from scoring_engine import TokenBucket
+        from vector_store import get_embeddings
+
+        self.index_dir = index_dir
+        self.embeddings = BatchingEmbeddings(get_embeddings())
+        self.index_manager = CVIndexManager.load(index_dir, self.embeddings) or CVIndexManager(self.embeddings)
+        self.index_lock = ReadWriteLock()
+        self.chat_llm = create_chat_llm()
+        # Giới hạn tốc độ áp dụng cho mỗi request đã gom, không phải mỗi prompt
+        limiter = TokenBucket(LLM_REQUESTS_PER_SECOND, LLM_BURST) if LLM_REQUESTS_PER_SECOND else None
+        self.scoring_llm = BatchedLLM(llm=create_service_llm(), limiter=limiter)
+        self.scoring_executor = ThreadPoolExecutor(max_workers=API_SCORING_WORKERS, thread_name_prefix="api-scoring")
+        self.result_cache = get_result_cache()
+        self.answer_cache = get_answer_cache()
+
+    def close(self):
+        self.scoring_executor.shutdown(wait=False, cancel_futures=True)
+
+    def corpus_hash(self, file_hashes: Optional[List[str]] = None) -> str:
+        """Hash của bộ CV được hỏi (cả index nếu không chỉ định)"""
+        hashes = sorted(file_hashes if file_hashes is not None else self.index_manager.manifest)
+        return hashlib.md5("|".join(hashes).encode("utf-8")).hexdigest()
+
+    def ingest(self, files: List[Tuple[str, bytes]]) -> List[Dict]:
+        """Thêm các CV (file_name, bytes) vào index, lưu phần thay đổi nếu có"""
+        from index_manager import CVIndexManager, snapshot_lock
+
+        file_hashes = [hashlib.md5(data).hexdigest() for _, data in files]
+        with self.index_lock.write(), snapshot_lock(self.index_dir):
+            # Index trên đĩa có thể được process khác thêm file: cập nhật trước khi thêm,
+            # rồi chỉ ghi phần của các file mới
+            if not self.index_manager.refresh(self.index_dir):
+                self.index_manager = (
+                    CVIndexManager.load(self.index_dir, self.embeddings) or CVIndexManager(self.embeddings)
+                )
+            before = set(self.index_manager.manifest)
+            added = self.index_manager.add_pdfs(files, file_hashes)
+            if added:
+                self.index_manager.save_delta(self.index_dir, added)
+            return [
+                {
+                    "file_name": file_name,
+                    "file_hash": file_hash,
+                    "chunks": len(self.index_manager.manifest.get(file_hash, [])),
+                    "new": file_hash not in before,
+                    "duplicate_of": self.index_manager.duplicates.get(file_hash, {}).get("of"),
+                    "duplicate_similarity": self.index_manager.duplicates.get(file_hash, {}).get("similarity"),
+                }
+                for (file_name, _), file_hash in zip(files, file_hashes)
+            ]
+
+    def ask(self, question: str, file_hashes: Optional[List[str]] = None) -> Iterator[dict]:
+        """
+        Trả lời câu hỏi trên các CV đã ingest (chỉ các file `file_hashes` nếu có).
+        Sinh các sự kiện {"token": ...} rồi một {"done": {...}} cuối cùng.
+        """
+        from context_packing import pack_context
+        from cv_chat import stream_answer
+        from hybrid_search import HybridSearchEngine
+
+        start = time.perf_counter()
+        # Chỉ giữ khoá đọc khi tra cache và tìm kiếm; câu trả lời được gửi sau khi nhả khoá
+        # để client đọc chậm không chặn ingest
+        docs = []
+        with self.index_lock.read():
+            manager = self.index_manager
+            # Phạm vi: chunk của các file được hỏi (CV gần trùng dùng chunk của CV đại diện);
+            # bộ lọc chỉ xét ứng viên / file trong phạm vi này
+            allowed = None if file_hashes is None else manager.chunk_ids_for(file_hashes)
+            filters = manager.metadata_index.detect_filters(question, allowed)
+            scope = json.dumps({field: sorted(values) for field, values in filters.items()}, sort_keys=True)
+            corpus_hash = self.corpus_hash(file_hashes)
+
+            with trace("answer_cache_lookup"):
+                question_vector = self.embeddings.embed_query(question)
+                cached = self.answer_cache.get(corpus_hash, question_vector, scope)
+
+            if cached is None:
+                # Thu hẹp theo bộ lọc suy ra từ câu hỏi; không khớp chunk nào thì giữ cả phạm vi
+                chunk_ids = manager.metadata_index.resolve(question, allowed) or allowed
+                if manager.chunks and chunk_ids != set():
+                    docs = [
+                        manager.chunks[chunk_id]
+                        for chunk_id, _ in HybridSearchEngine(manager).search(question, chunk_ids)
+                    ]
+
+        if cached is not None:
+            entry, similarity = cached
+            yield {"token": entry["answer"]}
+            yield {"done": {
+                "answer": entry["answer"], "sources": entry["sources"], "cached": True,
+                "similar_question": entry["question"], "similarity": similarity,
+                "timings": {"total": time.perf_counter() - start},
+            }}
+            return
+
+        with trace("context_packing", chunks=len(docs)):
+            context, docs_in_context, context_tokens = pack_context(docs)
+        timings = {}
+        tokens = []
+        for token in stream_answer(self.chat_llm, question, context, timings):
+            tokens.append(token)
+            yield {"token": token}
+        answer = "".join(tokens)
+
+        sources = [
+            {
+                "applicant_name": doc.metadata.get("applicant_name"),
+                "section": doc.metadata.get("section"),
+                "file_name": doc.metadata.get("file_name"),
+                "page_content": doc.page_content,
+            }
+            for doc in docs_in_context
+        ]
+        self.answer_cache.put(corpus_hash, question, question_vector, answer, sources, scope)
+        timings["total"] = time.perf_counter() - start
+        yield {"done": {
+            "answer": answer, "sources": sources, "cached": False,
+            "context_chunks": len(docs_in_context), "retrieved_chunks": len(docs),
+            "context_tokens": context_tokens, "timings": timings,
+        }}
+
+    def score(
+        self,
+        files: List[Tuple[str, bytes]],
+        job_description: str,
+        batch: bool = False,
+        local_skills: bool = LOCAL_SKILL_MATCHING,
+    ) -> Dict:
+        """Chấm điểm và xếp hạng các CV theo mô tả công việc"""
+        from cv_scoring import SkillMatcher, analyze_job_requirements, rank_cvs
+        from pdf_extraction import parse_pdf_files
+        from scoring_engine import score_parsed_cvs
+
+        job_requirements = analyze_job_requirements(job_description, self.scoring_llm, self.result_cache)
+        skill_matcher = SkillMatcher(job_requirements.get("skills", [])) if local_skills else None
+        cv_scores = list(score_parsed_cvs(
+            parse_pdf_files(files), job_requirements, self.scoring_llm,
+            batch_token_budget=SCORING_BATCH_TOKEN_BUDGET if batch else None,
+            result_cache=self.result_cache, skill_matcher=skill_matcher, executor=self.scoring_executor,
+        ))
+        return {"job_requirements": job_requirements, "results": rank_cvs(cv_scores)}
+
+
+async def _read_files(form) -> List[Tuple[str, bytes]]:
+    return [(upload.filename or f"CV_{i + 1}", await upload.read()) for i, upload in enumerate(form.getlist("files"))]
+
+
+def _form_flag(form, name: str, default: bool) -> bool:
+    value = form.get(name)
+    return default if value is None else str(value).lower() in ("1", "true", "yes", "on")
+
+
+def create_app(service: Optional[CVService] = None) -> Starlette:
+    """Tạo ứng dụng ASGI; service được khởi tạo khi start nếu không truyền vào"""
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        from llm_clients import close_http_client
+
+        app.state.service = service or await run_in_threadpool(CVService)
+        try:
+            yield
+        finally:
+            app.state.service.close()
+            close_http_client()
+
+    async def ingest(request: Request):
+        async with request.form() as form:
+            files = await _read_files(form)
+        if not files:
+            return JSONResponse({"error": "Thiếu file CV (trường 'files')"}, status_code=400)
+        results = await run_in_threadpool(request.app.state.service.ingest, files)
+        return JSONResponse({"files": results})
+
+    async def ask(request: Request):
+        body = await request.json()
+        question = str(body.get("question") or "").strip()
+        if not question:
+            return JSONResponse({"error": "Thiếu câu hỏi (trường 'question')"}, status_code=400)
+        events = request.app.state.service.ask(question, body.get("file_hashes"))
+
+        if body.get("stream"):
+            lines = (json.dumps(event, ensure_ascii=False) + "\n" async for event in iterate_in_threadpool(events))
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        done = None
+        async for event in iterate_in_threadpool(events):
+            done = event.get("done", done)
+        return JSONResponse(done)
+
+    async def score(request: Request):
+        async with request.form() as form:
+            files = await _read_files(form)
+            job_description = str(form.get("job_description") or "").strip()
+            batch = _form_flag(form, "batch", False)
+            local_skills = _form_flag(form, "local_skills", LOCAL_SKILL_MATCHING)
+        if not files or not job_description:
+            return JSONResponse({"error": "Cần 'files' và 'job_description'"}, status_code=400)
+        result = await run_in_threadpool(request.app.state.service.score, files, job_description, batch, local_skills)
+        return JSONResponse(result)
+
+    async def health(request: Request):
+        manager = request.app.state.service.index_manager
+        return JSONResponse({"status": "ok", "files": len(manager.manifest), "chunks": len(manager.chunks)})
+
+    async def metrics(request: Request):
+        return PlainTextResponse(get_metrics().to_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return Starlette(
+        routes=[
+            Route("/ingest", ingest, methods=["POST"]),
+            Route("/ask", ask, methods=["POST"]),
+            Route("/score", score, methods=["POST"]),
+            Route("/health", health, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+def main():
+    import uvicorn
+
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
+
+
+if __name__ == "__main__":
+    main()
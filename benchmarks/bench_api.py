@@ -0,0 +1,156 @@
+"""
+Benchmark API service (api_server.py) dưới tải đồng thời, với API model là server
+giả lập (fake_openai_server.py) có độ trễ cố định mỗi request: độ trễ /ask và
+/score (p50/p95) cùng số request thực sự gửi tới API model so với số câu hỏi /
+prompt, cho thấy hiệu quả của connection pool và micro-batching.
+
+Mọi cache (index, embedding, kết quả, đọc PDF) nằm trong thư mục tạm. Embedding
+OpenAI cần tải bảng token của tiktoken; khi không có mạng dùng --embedding-backend hashing.
+
+Chạy: python benchmarks/bench_api.py --cvs 50 --asks 200 --scores 8 --concurrency 32 --delay 0.2
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+JOB_DESCRIPTION = (
+    "Kỹ năng cần thiết: Python, PyTorch, TensorFlow, SQL, Docker.\n"
+    "Project liên quan: machine learning, chatbot, computer vision."
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port: int):
+    """Chạy app ASGI bằng uvicorn trong luồng nền, chờ tới khi nhận kết nối"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentiles(latencies_ms):
+    import numpy as np
+
+    if not latencies_ms:
+        return {}
+    values = np.asarray(latencies_ms)
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "max_ms": round(float(values.max()), 1),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cvs", type=int, default=50)
+    parser.add_argument("--asks", type=int, default=200, help="số câu hỏi gửi tới /ask")
+    parser.add_argument("--scores", type=int, default=8, help="số request /score (mỗi request chấm mọi CV)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--delay", type=float, default=0.2, help="độ trễ mỗi request của API model giả lập (giây)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embedding-backend", default="openai", choices=["openai", "hashing"])
+    parser.add_argument("--output", help="ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    # Cấu hình phải được đặt trước khi import các module đọc config
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    fake_port, api_port = free_port(), free_port()
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "OPENAI_API_KEY": "test",
+        "EMBEDDING_BACKEND": args.embedding_backend,
+        "CHAT_LLM_BACKEND": "openai",
+        "API_LLM_BACKEND": "openai",
+        "INDEX_DIR": os.path.join(workdir, "index"),
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embeddings"),
+        "RESULT_CACHE_PATH": os.path.join(workdir, "results.sqlite3"),
+        "PARSE_CACHE_DIR": os.path.join(workdir, "parsed"),
+        "METRICS_PROM_FILE": os.path.join(workdir, "metrics.prom"),
+    })
+
+    from api_client import CVApiClient
+    from api_server import create_app
+    from fake_openai_server import create_app as create_fake_openai_app
+    from synthetic_cvs import SKILLS, generate_corpus
+
+    fake_app = create_fake_openai_app(args.delay)
+    start_server(fake_app, fake_port)
+    api_server = start_server(create_app(), api_port)
+    client = CVApiClient(f"http://127.0.0.1:{api_port}")
+
+    files = generate_corpus(args.cvs, args.seed)
+    start = time.perf_counter()
+    ingested = client.ingest(files)
+    ingest_seconds = time.perf_counter() - start
+    file_hashes = [item["file_hash"] for item in ingested]
+
+    def counts():
+        return dict(fake_app.state.fake_openai.counts)
+
+    def ask(i: int):
+        # Câu hỏi khác nhau để không trúng cache câu trả lời
+        question = f"Ứng viên nào có kinh nghiệm {SKILLS[i % len(SKILLS)]} và project số {i}?"
+        for _ in client.ask_stream(question, file_hashes):
+            pass
+
+    def score(i: int):
+        client.score(files, f"{JOB_DESCRIPTION}\nVị trí số {i}", batch=False, local_skills=False)
+
+    results = {"args": vars(args), "ingest": {"cvs": len(files), "seconds": round(ingest_seconds, 3)}}
+    print(f"ingest: {len(files)} CV trong {ingest_seconds:.2f}s")
+    for name, fn, count in (("ask", ask, args.asks), ("score", score, args.scores)):
+        if not count:
+            continue
+        before = counts()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            latencies = list(executor.map(lambda i: timed(fn, i), range(count)))
+        wall = time.perf_counter() - start
+        after = counts()
+        upstream = {key: after[key] - before[key] for key in after}
+        results[name] = {**percentiles(latencies), "requests_per_second": round(count / wall, 2), "upstream": upstream}
+        print(f"{name}: {results[name]}")
+
+    # Mỗi request completions mang nhiều prompt nhờ micro-batching
+    total = fake_app.state.fake_openai.counts
+    results["batching"] = {
+        "prompts_per_completion_request": round(total["prompts"] / max(total["completions"], 1), 2),
+        "inputs_per_embedding_request": round(total["embedding_inputs"] / max(total["embeddings"], 1), 2),
+    }
+    print(f"batching: {results['batching']}")
+
+    client.close()
+    api_server.should_exit = True
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark trích xuất PDF: throughput theo số process
+
+Chạy: python benchmarks/bench_extraction.py --cvs 200 --pages 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from pdf_extraction import extract_documents
+
+
+def make_multipage_pdf(i: int, pages: int) -> bytes:
+    """Tạo CV PDF nhiều trang, mỗi trang đầy chữ"""
+    with fitz.open() as doc:
+        for p in range(pages):
+            page = doc.new_page()
+            lines = [f"Candidate {i} - page {p + 1}", "SKILLS" if p == 0 else "PROJECTS"]
+            lines += [f"Item {j}: Python, PyTorch, SQL, Docker, Kubernetes, FastAPI" for j in range(50)]
+            page.insert_text((40, 40), "\n".join(lines), fontsize=8)
+        return doc.tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cvs", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args()
+
+    files = [(f"cv_{i}.pdf", make_multipage_pdf(i, args.pages)) for i in range(args.cvs)]
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, cpu_count} & set(range(1, cpu_count + 1)))
+
+    print(f"CVs: {args.cvs} x {args.pages} trang, CPU: {cpu_count}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        count = sum(1 for _ in extract_documents(files, max_workers=workers))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>3} process: {elapsed:.2f}s ({count / elapsed:.1f} CV/s, x{baseline / elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
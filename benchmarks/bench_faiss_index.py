@@ -0,0 +1,102 @@
+"""
+Benchmark các kiểu index FAISS (faiss_index.py): thời gian dựng/train, kích thước
+index, độ trễ tìm kiếm và recall@k so với flat (chính xác) theo nprobe / efSearch
+
+Vector giả lập theo cụm (gần với embedding thật hơn vector ngẫu nhiên đều);
+câu hỏi là vector của chunk cộng nhiễu. Index xấp xỉ chỉ được dựng khi số vector
+>= FAISS_ANN_MIN_VECTORS, cỡ nhỏ hơn sẽ luôn là flat.
+
+Chạy: python benchmarks/bench_faiss_index.py --sizes 10000 100000 --dim 384 --k 10
+      python benchmarks/bench_faiss_index.py --sizes 100000 --dim 1536 --types flat ivf_pq ivf_sq8 --output faiss.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from faiss_index import INDEX_TYPES, build_index, index_memory_bytes, index_type_of, recall_at_k, search
+
+NPROBE_SWEEP = [1, 4, 16, 64]
+EF_SEARCH_SWEEP = [16, 64, 128, 256]
+
+
+def make_vectors(size: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Vector đã chuẩn hoá, tập trung quanh `clusters` tâm cụm"""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + 0.5 * rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(index, queries: np.ndarray, k: int, **params):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, positions = search(index, query[None, :], k, **params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(positions[0])
+    return np.array(results), float(np.mean(latencies)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--output", help="ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"dim: {args.dim}, k: {args.k}, queries: {args.queries}")
+    print(f"{'vectors':>8} | {'type':<8} | {'param':<13} | {'build (s)':>9} | {'size (MB)':>9} | "
+          f"{'mean/p95 (ms)':>15} | recall@{args.k}")
+    for size in args.sizes:
+        rng = np.random.default_rng(size)
+        vectors = make_vectors(size, args.dim, args.clusters, rng)
+        picks = rng.integers(0, size, args.queries)
+        queries = vectors[picks] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+        flat = build_index(vectors, "flat")
+        exact, _, _ = measure(flat, queries, args.k)
+        for index_type in args.types:
+            start = time.perf_counter()
+            index = build_index(vectors, index_type)
+            build_seconds = time.perf_counter() - start
+            actual_type = index_type_of(index)
+            if actual_type.startswith("ivf"):
+                sweep = [("nprobe", value) for value in NPROBE_SWEEP]
+            elif actual_type == "hnsw":
+                sweep = [("ef_search", value) for value in EF_SEARCH_SWEEP]
+            else:
+                sweep = [(None, None)]
+
+            for name, value in sweep:
+                found, mean_ms, p95_ms = measure(index, queries, args.k, **({name: value} if name else {}))
+                row = {
+                    "vectors": size,
+                    "type": actual_type,
+                    "param": f"{name}={value}" if name else "",
+                    "build_seconds": round(build_seconds, 3),
+                    "size_mb": round(index_memory_bytes(index) / 2**20, 2),
+                    "mean_ms": round(mean_ms, 3),
+                    "p95_ms": round(p95_ms, 3),
+                    f"recall@{args.k}": round(recall_at_k(exact, found), 4),
+                }
+                rows.append(row)
+                print(f"{size:>8} | {actual_type:<8} | {row['param']:<13} | {row['build_seconds']:>9} | "
+                      f"{row['size_mb']:>9} | {row['mean_ms']:>6} / {row['p95_ms']:>6} | {row[f'recall@{args.k}']:.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
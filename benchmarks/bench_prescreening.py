@@ -0,0 +1,138 @@
+"""
+Benchmark sàng lọc bằng embedding trước khi chấm bằng LLM: số lần gọi LLM,
+thời gian và chất lượng xếp hạng so với chấm toàn bộ CV bằng LLM
+
+LLM giả lập chấm theo đúng quy tắc trong prompt (đếm skill / loại project khớp
+yêu cầu) để xếp hạng "chuẩn" có ý nghĩa.
+
+Chạy: python benchmarks/bench_prescreening.py --cvs 2000 --top-k 100 --delay 0.05
+      python benchmarks/bench_prescreening.py --backend sentence-transformers
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+import numpy as np
+from scipy.stats import spearmanr
+from cv_scoring import extract_scoring_sections
+from embedding_backends import create_embedding_backend
+from fake_llm import FakeLLM
+from pdf_extraction import parse_pdf_files
+from prescreening import screening_scores, select_candidates
+from scoring_engine import score_cvs_concurrently
+
+SKILLS = ["Python", "PyTorch", "TensorFlow", "SQL", "Docker", "Kubernetes", "Java", "Spring", "React", "Angular",
+          "Golang", "Rust", "AWS", "GCP", "Spark", "Kafka", "Airflow", "Figma", "Photoshop", "Excel",
+          "Accounting", "SAP", "Salesforce", "Marketing", "SEO", "Flutter", "Swift", "Kotlin", "PHP", "Laravel"]
+PROJECTS = ["machine learning", "chatbot", "recommendation system", "e-commerce website", "mobile app",
+            "data pipeline", "ERP integration", "marketing campaign", "game", "computer vision"]
+JOB_REQUIREMENTS = {
+    "skills": ["python", "pytorch", "tensorflow", "sql", "docker"],
+    "projects_related": ["machine learning", "chatbot", "computer vision"],
+}
+
+
+class RuleBasedLLM(FakeLLM):
+    """Chấm điểm như quy tắc trong prompt: mỗi skill khớp 1 điểm, mỗi project liên quan 2 điểm (tối đa 5)"""
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        skills = re.search(r"CV Skills: (.*?)\nRequired Skills: (.*?)\n", prompt, re.DOTALL)
+        if skills:
+            cv_text = skills.group(1).lower()
+            return str(min(sum(skill in cv_text for skill in skills.group(2).split(", ")), 5))
+        projects = re.search(r"CV Projects: (.*?)\nRequired Project Types: (.*?)\n", prompt, re.DOTALL)
+        if projects:
+            cv_text = projects.group(1).lower()
+            return str(min(2 * sum(kind in cv_text for kind in projects.group(2).split(", ")), 5))
+        return "0"
+
+
+def make_cv_pdf(i: int, rng: random.Random) -> bytes:
+    """CV ngẫu nhiên: một phần ứng viên có nhiều skill / project khớp yêu cầu, phần còn lại ở ngành khác"""
+    skills = rng.sample(SKILLS[:8] if rng.random() < 0.3 else SKILLS, rng.randint(3, 7))
+    projects = rng.sample(PROJECTS, rng.randint(1, 3))
+    text = (
+        f"Candidate {i}\n"
+        f"SKILLS\n{', '.join(skills)}\n"
+        "PROJECTS\n" + "\n".join(f"Built a {project} project" for project in projects) + "\n"
+        "EDUCATION\nHanoi University of Science and Technology\n"
+    )
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_text((50, 72), text)
+        return doc.tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cvs", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--min-similarity", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=0.05, help="độ trễ giả lập mỗi lần gọi LLM (giây)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--backend", default="hashing", help="backend embedding (hashing, sentence-transformers, openai)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    files = [(f"cv_{i}.pdf", make_cv_pdf(i, rng)) for i in range(args.cvs)]
+    llm = RuleBasedLLM(delay=args.delay)
+    embeddings, _ = create_embedding_backend(args.backend)
+
+    # Chấm toàn bộ bằng LLM (xếp hạng chuẩn)
+    start = time.perf_counter()
+    baseline = {
+        row["file_name"]: row["total_score"]
+        for row in score_cvs_concurrently(files, JOB_REQUIREMENTS, llm, max_workers=args.workers, requests_per_second=None)
+    }
+    baseline_time = time.perf_counter() - start
+
+    # Sàng lọc bằng embedding rồi chỉ chấm các CV được chọn
+    start = time.perf_counter()
+    parsed = dict(parse_pdf_files(files))
+    similarities = screening_scores(
+        [extract_scoring_sections(parsed[i]["sections"]) for i in range(len(files))], JOB_REQUIREMENTS, embeddings
+    )
+    selected = select_candidates(similarities, args.top_k, args.min_similarity)
+    screen_time = time.perf_counter() - start
+    screened = {
+        row["file_name"]: row["total_score"]
+        for row in score_cvs_concurrently(
+            [files[i] for i in selected], JOB_REQUIREMENTS, llm, max_workers=args.workers, requests_per_second=None
+        )
+    }
+    prescreen_time = time.perf_counter() - start
+
+    names = [file_name for file_name, _ in files]
+    baseline_scores = np.array([baseline[name] for name in names])
+    rho = spearmanr(similarities, baseline_scores).correlation
+
+    # Recall@K: tỉ lệ CV thuộc top-K của xếp hạng chuẩn còn được giữ lại sau sàng lọc
+    # (CV cùng điểm với CV thứ K cũng được tính là top-K)
+    k = min(args.top_k, len(names))
+    cutoff = np.sort(baseline_scores)[::-1][k - 1]
+    top_true = {name for name, score in zip(names, baseline_scores) if score >= cutoff}
+    recall = len(top_true & set(screened)) / len(top_true)
+    top10_cutoff = np.sort(baseline_scores)[::-1][min(10, len(names)) - 1]
+    top10 = {name for name, score in zip(names, baseline_scores) if score >= top10_cutoff}
+    recall10 = len(top10 & set(screened)) / len(top10)
+
+    print(f"CVs: {args.cvs}, top-K: {args.top_k}, LLM delay: {args.delay}s, workers: {args.workers}, embedding: {args.backend}")
+    print(f"Chấm toàn bộ bằng LLM : {baseline_time:.2f}s, {2 * len(files)} lần gọi LLM")
+    print(f"Sàng lọc + LLM        : {prescreen_time:.2f}s (sàng lọc {screen_time:.2f}s), "
+          f"{2 * len(selected)} lần gọi LLM, x{baseline_time / prescreen_time:.1f} nhanh hơn")
+    print(f"Spearman(độ tương đồng, điểm LLM): {rho:.3f}")
+    print(f"Recall top-{k} (gồm CV đồng điểm, {len(top_true)} CV): {recall:.1%}, "
+          f"{len(top_true & set(screened))}/{len(screened)} CV được giữ thuộc nhóm này")
+    print(f"Recall top-10 (gồm CV đồng điểm, {len(top10)} CV): {recall10:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark hybrid retrieval: EnsembleRetriever (tuần tự, gộp bằng dict) so với
+HybridSearchEngine (song song, gộp bằng NumPy) theo số chunk
+
+Chạy: python benchmarks/bench_retrieval.py --sizes 1000 10000 100000 --queries 50 --embed-delay 0.05
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain.retrievers import EnsembleRetriever
+from langchain.schema import Document
+from bm25_index import BM25IndexRetriever
+from config import VECTOR_RETRIEVER_K, BM25_RETRIEVER_K, HYBRID_WEIGHTS
+from embedding_backends import HashingEmbeddings
+from hybrid_search import HybridSearchEngine
+from index_manager import CVIndexManager
+
+SKILLS = ["python", "java", "pytorch", "tensorflow", "sql", "docker", "kubernetes", "react", "spark", "fastapi",
+          "golang", "aws", "gcp", "airflow", "kafka", "nlp", "opencv", "django", "flask", "redis"]
+SECTIONS = ["SKILLS", "PROJECTS", "EXPERIENCE", "EDUCATION"]
+CHUNKS_PER_FILE = 1000
+
+
+class DelayedEmbeddings(HashingEmbeddings):
+    """Giả lập độ trễ gọi API khi embed câu hỏi"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def embed_query(self, text):
+        time.sleep(self.delay)
+        return super().embed_query(text)
+
+
+def build_manager(size: int, embed_delay: float) -> CVIndexManager:
+    rng = random.Random(size)
+    manager = CVIndexManager(DelayedEmbeddings(embed_delay))
+    for start in range(0, size, CHUNKS_PER_FILE):
+        chunks = []
+        for i in range(start, min(start + CHUNKS_PER_FILE, size)):
+            section = SECTIONS[i % len(SECTIONS)]
+            text = f"Candidate {i // 4} - {section}: " + ", ".join(rng.sample(SKILLS, 6))
+            chunks.append(Document(
+                page_content=text,
+                metadata={"applicant_name": f"Candidate {i // 4}", "section": section, "file_name": f"cv_{i // 4}.pdf"},
+            ))
+        manager.add_file(f"file{start}", chunks)
+    return manager
+
+
+def measure(retrieve, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retrieve(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.mean(latencies), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--embed-delay", type=float, default=0.0, help="độ trễ giả lập khi embed câu hỏi (giây)")
+    parser.add_argument("--method", default="rrf", choices=["rrf", "score"])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [f"Ai có kinh nghiệm {' '.join(rng.sample(SKILLS, 2))}?" for _ in range(args.queries)]
+
+    print(f"Queries: {args.queries}, embed delay: {args.embed_delay * 1000:.0f}ms, fusion: {args.method}")
+    print(f"{'chunks':>8} | {'ensemble mean/p95 (ms)':>24} | {'hybrid mean/p95 (ms)':>22} | speedup")
+    for size in args.sizes:
+        manager = build_manager(size, args.embed_delay)
+        ensemble = EnsembleRetriever(
+            retrievers=[
+                manager.vector_store.as_retriever(search_kwargs={"k": VECTOR_RETRIEVER_K}),
+                BM25IndexRetriever(index=manager.bm25_index, chunks=manager.chunks, k=BM25_RETRIEVER_K),
+            ],
+            weights=HYBRID_WEIGHTS,
+        )
+        engine = HybridSearchEngine(manager, method=args.method, metadata_filter=False)
+
+        # Khởi động (dựng ma trận BM25, luồng của executor)
+        ensemble.invoke(queries[0])
+        engine.search(queries[0])
+
+        ensemble_mean, ensemble_p95 = measure(ensemble.invoke, queries)
+        hybrid_mean, hybrid_p95 = measure(engine.search, queries)
+        print(f"{size:>8} | {ensemble_mean:>11.2f} / {ensemble_p95:>10.2f} | "
+              f"{hybrid_mean:>10.2f} / {hybrid_p95:>9.2f} | x{ensemble_mean / hybrid_mean:.1f}")
+
+
+if __name__ == "__main__":
+    main()
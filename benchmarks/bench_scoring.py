@@ -0,0 +1,69 @@
+"""
+Benchmark chấm điểm CV: tuần tự so với song song, dùng FakeLLM (không cần mạng)
+
+Chạy: python benchmarks/bench_scoring.py --cvs 50 --delay 0.2 --workers 16
+      python benchmarks/bench_scoring.py --cvs 200 --batch-budget 6000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from fake_llm import FakeLLM
+from cv_scoring import score_cv_against_requirements
+from pdf_extraction import extract_pdf_text, parse_cv_text
+from scoring_engine import score_cvs_concurrently
+
+
+def make_cv_pdf(i: int) -> bytes:
+    """Tạo một CV PDF đơn giản"""
+    text = (
+        f"Candidate {i}\n"
+        "SKILLS\nPython, PyTorch, SQL, Docker\n"
+        f"PROJECTS\nChatbot project {i}\nMachine learning pipeline\n"
+        "EDUCATION\nHanoi University of Science and Technology\n"
+    )
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_text((50, 72), text)
+        return doc.tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cvs", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="độ trễ giả lập mỗi lần gọi LLM (giây)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=None, help="giới hạn request/giây (mặc định: không giới hạn)")
+    parser.add_argument("--batch-budget", type=int, default=None, help="bật chấm theo lô với ngân sách token này")
+    args = parser.parse_args()
+
+    llm = FakeLLM(delay=args.delay)
+    job_requirements = llm.job_requirements
+    files = [(f"cv_{i}.pdf", make_cv_pdf(i)) for i in range(args.cvs)]
+
+    start = time.perf_counter()
+    for file_name, data in files:
+        parsed = parse_cv_text(extract_pdf_text(data))
+        score_cv_against_requirements(parsed["sections"], job_requirements, llm)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = list(score_cvs_concurrently(
+        files, job_requirements, llm, max_workers=args.workers, requests_per_second=args.rps,
+        batch_token_budget=args.batch_budget
+    ))
+    concurrent = time.perf_counter() - start
+
+    print(f"CVs: {len(results)}, LLM delay: {args.delay}s, workers: {args.workers}")
+    print(f"Tuần tự : {serial:.2f}s ({args.cvs / serial:.1f} CV/s)")
+    print(f"Song song: {concurrent:.2f}s ({args.cvs / concurrent:.1f} CV/s)")
+    print(f"Tăng tốc: {serial / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
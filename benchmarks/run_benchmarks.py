@@ -0,0 +1,248 @@
+"""
+Bộ benchmark offline trên CV giả lập (benchmarks/synthetic_cvs.py): trích xuất PDF,
+tách section / chunk, dựng index, độ trễ hybrid retrieval (p50/p95/p99) và
+throughput chấm điểm. Embedding (HashingEmbeddings) và LLM (FakeLLM) đều xác định,
+không cần mạng. Kết quả ghi ra JSON để so sánh giữa các commit.
+
+Chạy: python benchmarks/run_benchmarks.py --sizes 10 100 1000 10000 --output bench.json
+      python benchmarks/run_benchmarks.py --sizes 100 1000 --compare bench.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from config import PDF_EXTRACTION_WORKERS
+from cv_scoring import SkillMatcher, extract_scoring_sections
+from embedding_backends import HashingEmbeddings
+from fake_llm import FakeLLM
+from hybrid_search import HybridSearchEngine
+from index_manager import CVIndexManager
+from metrics import get_metrics, stage_deltas
+from pdf_extraction import extract_documents, parse_cv_text
+from scoring_engine import score_parsed_cvs
+from synthetic_cvs import SKILLS, PROJECTS, generate_corpus
+from vector_store import create_chunks_from_sections
+
+JOB_REQUIREMENTS = {
+    "skills": ["python", "pytorch", "tensorflow", "sql", "docker"],
+    "projects_related": ["machine learning", "chatbot", "computer vision"],
+}
+
+# Chỉ số chính (đường dẫn trong kết quả, lớn hơn là tốt hơn?) dùng khi so sánh hai lần chạy
+KEY_METRICS = [
+    ("extraction.docs_per_second", True),
+    ("chunking.docs_per_second", True),
+    ("index_build.chunks_per_second", True),
+    ("retrieval.p50_ms", False),
+    ("retrieval.p95_ms", False),
+    ("retrieval.p99_ms", False),
+    ("scoring.cvs_per_second", True),
+]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentiles(latencies_ms):
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "mean_ms": round(float(np.mean(latencies_ms)), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def make_queries(count: int, applicant_names, rng: random.Random):
+    """Câu hỏi tổng hợp: theo skill, theo loại project và theo tên ứng viên (kích hoạt lọc metadata)"""
+    queries = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            queries.append(f"Ai có kinh nghiệm {' và '.join(rng.sample(SKILLS, 2))}?")
+        elif kind == 1:
+            queries.append(f"Ứng viên nào đã làm dự án {rng.choice(PROJECTS)}?")
+        else:
+            queries.append(f"Kỹ năng của {rng.choice(applicant_names)} là gì?")
+    return queries
+
+
+def bench_size(size: int, args) -> dict:
+    metrics = get_metrics()
+    before = metrics.snapshot()
+    files = generate_corpus(size, seed=args.seed)
+    result = {"cvs": size, "pdf_bytes": sum(len(data) for _, data in files)}
+
+    # Trích xuất PDF (không dùng parse cache để đo đúng chi phí mở PDF)
+    start = time.perf_counter()
+    texts = [None] * size
+    for i, document in extract_documents(files, max_workers=args.extraction_workers):
+        texts[i] = document.page_content
+    elapsed = time.perf_counter() - start
+    result["extraction"] = {"seconds": round(elapsed, 4), "docs_per_second": round(size / elapsed, 1)}
+
+    # Tách section + tạo chunk
+    start = time.perf_counter()
+    parsed_cvs, file_chunks = [], []
+    for (file_name, data), text in zip(files, texts):
+        parsed = parse_cv_text(text)
+        parsed_cvs.append({**parsed, "file_name": file_name, "content_hash": hashlib.md5(data).hexdigest()})
+        file_chunks.append(create_chunks_from_sections(
+            parsed["applicant_name"], parsed["sections"], {"source": "pdf", "file_name": file_name}
+        ))
+    elapsed = time.perf_counter() - start
+    chunk_count = sum(len(chunks) for chunks in file_chunks)
+    # CV đọc được cả mục skills và projects, theo kiểu tiêu đề (kiểm tra tách section đúng)
+    detected = {"caps": [0, 0], "keywords": [0, 0]}
+    for parsed in parsed_cvs:
+        style = "caps" if parsed["file_name"].endswith("_caps.pdf") else "keywords"
+        skills_section, projects_section = extract_scoring_sections(parsed["sections"])
+        detected[style][0] += bool(skills_section and projects_section)
+        detected[style][1] += 1
+    result["chunking"] = {
+        "seconds": round(elapsed, 4),
+        "docs_per_second": round(size / elapsed, 1),
+        "chunks": chunk_count,
+        "sections_detected": {style: round(ok / total, 4) if total else None for style, (ok, total) in detected.items()},
+    }
+
+    # Dựng index FAISS + BM25 (mỗi CV một lần add_file như khi upload)
+    manager = CVIndexManager(HashingEmbeddings())
+    start = time.perf_counter()
+    for parsed, chunks in zip(parsed_cvs, file_chunks):
+        manager.add_file(parsed["content_hash"], chunks)
+    elapsed = time.perf_counter() - start
+    result["index_build"] = {"seconds": round(elapsed, 4), "chunks_per_second": round(chunk_count / elapsed, 1)}
+
+    # Hybrid retrieval
+    rng = random.Random(args.seed)
+    names = [parsed["applicant_name"] for parsed in parsed_cvs]
+    queries = make_queries(args.queries, names, rng)
+    engine = HybridSearchEngine(manager)
+    engine.search(queries[0])  # khởi động (ma trận BM25, luồng executor)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        engine.search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    result["retrieval"] = {"queries": len(queries), **percentiles(latencies)}
+
+    # Chấm điểm (LLM giả lập, không giới hạn tốc độ)
+    score_count = min(size, args.score_limit) if args.score_limit else size
+    llm = FakeLLM(delay=args.llm_delay)
+    skill_matcher = None if args.llm_skills else SkillMatcher(JOB_REQUIREMENTS["skills"])
+    start = time.perf_counter()
+    scored = sum(1 for _ in score_parsed_cvs(
+        enumerate(parsed_cvs[:score_count]), JOB_REQUIREMENTS, llm,
+        max_workers=args.workers, skill_matcher=skill_matcher,
+    ))
+    elapsed = time.perf_counter() - start
+    result["scoring"] = {
+        "cvs": scored,
+        "seconds": round(elapsed, 4),
+        "cvs_per_second": round(scored / elapsed, 1),
+        "llm_delay": args.llm_delay,
+        "local_skills": skill_matcher is not None,
+    }
+
+    result["stages"] = [
+        {key: round(value, 3) if isinstance(value, float) else value for key, value in row.items()}
+        for row in stage_deltas(before, metrics.snapshot())
+    ]
+    return result
+
+
+def lookup(result: dict, path: str):
+    for key in path.split("."):
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def compare(current: dict, baseline: dict):
+    """In thay đổi của các chỉ số chính so với một file kết quả trước đó"""
+    print(f"\nSo với {baseline['meta']['commit']} ({baseline['meta']['timestamp']}):")
+    baseline_by_size = {row["cvs"]: row for row in baseline["results"]}
+    for row in current["results"]:
+        old = baseline_by_size.get(row["cvs"])
+        if old is None:
+            continue
+        print(f"  {row['cvs']} CV:")
+        for path, higher_is_better in KEY_METRICS:
+            new_value, old_value = lookup(row, path), lookup(old, path)
+            if not new_value or not old_value:
+                continue
+            change = new_value / old_value - 1
+            better = change > 0 if higher_is_better else change < 0
+            print(f"    {path:<32} {old_value:>12} -> {new_value:>12} ({change:+.1%}{'' if abs(change) < 0.05 else ' ✓' if better else ' ✗'})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=100, help="số câu hỏi đo độ trễ retrieval")
+    parser.add_argument("--extraction-workers", type=int, default=PDF_EXTRACTION_WORKERS)
+    parser.add_argument("--workers", type=int, default=16, help="số luồng chấm điểm")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="độ trễ giả lập mỗi lần gọi LLM (giây)")
+    parser.add_argument("--llm-skills", action="store_true", help="chấm skills bằng LLM thay vì từ điển")
+    parser.add_argument("--score-limit", type=int, default=2000, help="chấm tối đa N CV mỗi cỡ (0: tất cả)")
+    parser.add_argument("--output", help="file JSON kết quả (mặc định benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="file JSON của lần chạy trước để so sánh")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    for size in args.sizes:
+        row = bench_size(size, args)
+        report["results"].append(row)
+        retrieval = row["retrieval"]
+        print(
+            f"{size:>6} CV | trích xuất {row['extraction']['docs_per_second']:>8} CV/s | "
+            f"chunk {row['chunking']['docs_per_second']:>9} CV/s | "
+            f"index {row['index_build']['chunks_per_second']:>8} chunk/s | "
+            f"retrieval p50/p95/p99 {retrieval['p50_ms']}/{retrieval['p95_ms']}/{retrieval['p99_ms']} ms | "
+            f"chấm {row['scoring']['cvs_per_second']:>7} CV/s"
+        )
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi kết quả vào {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
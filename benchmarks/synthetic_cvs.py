@@ -0,0 +1,108 @@
+"""
+Sinh bộ CV PDF giả lập (xác định theo seed, không cần mạng) cho benchmark.
+CV chẵn dùng tiêu đề mục in hoa (SKILLS, PROJECTS...), CV lẻ dùng tiêu đề
+theo CV_SECTION_KEYWORDS (Skills, Projects...) - hai kiểu mà `split_cv_sections` hỗ trợ.
+
+Chạy: python benchmarks/synthetic_cvs.py --cvs 1000 --output-dir /tmp/cvs
+"""
+
+import argparse
+import os
+import random
+import sys
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+FIRST_NAMES = ["Nguyen", "Tran", "Le", "Pham", "Hoang", "Vu", "Dang", "Bui", "Do", "Ngo"]
+MIDDLE_NAMES = ["Van", "Thi", "Minh", "Duc", "Thu", "Quang", "Hai", "Ngoc"]
+LAST_NAMES = ["An", "Binh", "Chi", "Dung", "Giang", "Hoa", "Khanh", "Linh", "Nam", "Phuong", "Quan", "Son", "Trang"]
+SKILLS = ["Python", "PyTorch", "TensorFlow", "SQL", "Docker", "Kubernetes", "Java", "Spring Boot", "React",
+          "Angular", "Golang", "Rust", "AWS", "GCP", "Spark", "Kafka", "Airflow", "FastAPI", "Django",
+          "Redis", "PostgreSQL", "MongoDB", "NLP", "OpenCV", "Scikit-learn", "Figma", "Excel", "C++", "C#", "Node.js"]
+PROJECTS = ["machine learning", "chatbot", "recommendation system", "e-commerce website", "mobile app",
+            "data pipeline", "ERP integration", "computer vision", "search engine", "payment gateway"]
+COMPANIES = ["FPT Software", "Viettel", "VNG", "Tiki", "MoMo", "Shopee", "Grab", "VinAI", "Techcombank", "Zalo"]
+UNIVERSITIES = ["Hanoi University of Science and Technology", "VNU University of Engineering and Technology",
+                "Ho Chi Minh City University of Technology", "Posts and Telecommunications Institute of Technology"]
+CERTIFICATIONS = ["AWS Certified Developer", "Google Data Analytics", "TOEIC 850", "IELTS 7.0", "Azure Fundamentals"]
+
+# Tiêu đề mục theo hai kiểu: in hoa toàn bộ / từ khoá trong CV_SECTION_KEYWORDS
+HEADING_STYLES = {
+    "caps": {"profile": "PROFILE", "skills": "SKILLS", "experience": "WORK EXPERIENCE",
+             "projects": "PROJECTS", "education": "EDUCATION", "certifications": "CERTIFICATIONS"},
+    "keywords": {"profile": "Profile", "skills": "Skills", "experience": "Work experience",
+                 "projects": "Projects", "education": "Education", "certifications": "Certifications"},
+}
+
+
+def generate_cv_text(i: int, rng: random.Random, style: str) -> str:
+    """Text một CV: tên ứng viên ở dòng đầu, sau đó là các mục theo kiểu tiêu đề `style`"""
+    headings = HEADING_STYLES[style]
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+    skills = rng.sample(SKILLS, rng.randint(4, 10))
+    projects = rng.sample(PROJECTS, rng.randint(1, 4))
+    years = rng.randint(1, 10)
+    # Nội dung không có dòng nào chỉ gồm chữ in hoa (tránh bị nhận nhầm là tiêu đề mục)
+    sections = [
+        ("profile", [f"Software engineer with {years} years of experience in {rng.choice(PROJECTS)}."]),
+        ("skills", [", ".join(skills)]),
+        ("experience", [
+            f"{rng.choice(COMPANIES)} - Developer ({2024 - j * 2 - 2}-{2024 - j * 2})"
+            for j in range(rng.randint(1, 3))
+        ]),
+        ("projects", [
+            f"Built a {project} using {', '.join(rng.sample(skills, min(2, len(skills))))}"
+            for project in projects
+        ]),
+        ("education", [f"{rng.choice(UNIVERSITIES)}, class of {2024 - years}"]),
+    ]
+    if rng.random() < 0.5:
+        sections.append(("certifications", rng.sample(CERTIFICATIONS, 2)))
+
+    lines = [name, f"Email: candidate{i}@example.com"]
+    for key, body in sections:
+        lines.append(headings[key])
+        lines.extend(body)
+    return "\n".join(lines)
+
+
+def make_pdf(text: str) -> bytes:
+    """Ghi text thành PDF một trang"""
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_text((40, 50), text, fontsize=9)
+        return doc.tobytes()
+
+
+def generate_corpus(count: int, seed: int = 0) -> List[Tuple[str, bytes]]:
+    """
+    `count` CV PDF (file_name, bytes), xen kẽ hai kiểu tiêu đề mục.
+    Cùng `count` và `seed` luôn cho cùng nội dung.
+    """
+    rng = random.Random(seed)
+    files = []
+    for i in range(count):
+        style = "caps" if i % 2 == 0 else "keywords"
+        files.append((f"cv_{i:05d}_{style}.pdf", make_pdf(generate_cv_text(i, rng, style))))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh CV PDF giả lập ra thư mục")
+    parser.add_argument("--cvs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", required=True)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for file_name, data in generate_corpus(args.cvs, args.seed):
+        with open(os.path.join(args.output_dir, file_name), "wb") as f:
+            f.write(data)
+    print(f"Đã ghi {args.cvs} CV vào {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Index BM25 cho các chunk CV: thống kê term lưu trong ma trận thưa (SciPy),
+chấm điểm truy vấn bằng phép toán vector (NumPy), hỗ trợ thêm/xoá và lưu/nạp
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Collection, Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+from config import BM25_K1, BM25_B
+
+BM25_FORMAT_VERSION = 1
+
+
+def bm25_tokenize(text: str) -> List[str]:
+    """Tách từ cho BM25 (chữ thường, bỏ dấu câu)"""
+    return re.findall(r"\w+", text.lower())
+
+
+class BM25Index:
+    """
+    Index BM25 thêm/xoá được theo chunk id.
+
+    Mỗi chunk giữ (cột term, tần suất) riêng; ma trận tần suất dạng CSC chỉ
+    được dựng lại khi index thay đổi và chỉ các cột của term trong truy vấn
+    được dùng khi chấm điểm.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.doc_ids: List[Optional[str]] = []       # dòng -> chunk id (None nếu đã xoá)
+        self._rows: Dict[str, int] = {}               # chunk id -> dòng
+        self._doc_terms: List[Optional[Tuple[np.ndarray, np.ndarray]]] = []
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._df = np.zeros(0, dtype=np.int32)
+        self._matrix: Optional[sparse.csc_matrix] = None
+        self._deleted = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    def add(self, doc_ids: List[str], texts: List[str]):
+        """
+        Thêm các chunk (chunk đã có sẽ được thay thế)
+        """
+        self.remove([doc_id for doc_id in doc_ids if doc_id in self._rows])
+
+        new_lens = []
+        vocab = self.vocab
+        for doc_id, text in zip(doc_ids, texts):
+            tokens = bm25_tokenize(text)
+            counts = Counter(tokens)
+            cols = np.fromiter(
+                (vocab.setdefault(token, len(vocab)) for token in counts), dtype=np.int32, count=len(counts)
+            )
+            tfs = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+            self._rows[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self._doc_terms.append((cols, tfs))
+            new_lens.append(len(tokens))
+
+            if len(self.vocab) > len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self.vocab) - len(self._df) + 1024, dtype=np.int32)])
+            self._df[cols] += 1
+
+        self._doc_len = np.concatenate([self._doc_len, np.asarray(new_lens, dtype=np.float32)])
+        self._matrix = None
+
+    def remove(self, doc_ids: List[str]):
+        """
+        Xoá các chunk theo id (id không tồn tại sẽ bị bỏ qua)
+        """
+        for doc_id in doc_ids:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                continue
+            cols, _ = self._doc_terms[row]
+            self._df[cols] -= 1
+            self._doc_terms[row] = None
+            self.doc_ids[row] = None
+            self._doc_len[row] = 0
+            self._deleted += 1
+            self._matrix = None
+
+        # Dọn các dòng đã xoá khi chiếm quá nửa index
+        if self._deleted and self._deleted * 2 > len(self.doc_ids):
+            self._compact()
+
+    def _compact(self):
+        alive = [row for row, doc_id in enumerate(self.doc_ids) if doc_id is not None]
+        self.doc_ids = [self.doc_ids[row] for row in alive]
+        self._doc_terms = [self._doc_terms[row] for row in alive]
+        self._doc_len = self._doc_len[alive] if alive else np.zeros(0, dtype=np.float32)
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+        self._deleted = 0
+        self._matrix = None
+
+    def _get_matrix(self) -> sparse.csc_matrix:
+        if self._matrix is None:
+            rows, cols, tfs = [], [], []
+            for row, terms in enumerate(self._doc_terms):
+                if terms is not None:
+                    rows.append(np.full(len(terms[0]), row, dtype=np.int32))
+                    cols.append(terms[0])
+                    tfs.append(terms[1])
+            shape = (len(self.doc_ids), max(len(self.vocab), 1))
+            if rows:
+                self._matrix = sparse.csc_matrix(
+                    (np.concatenate(tfs), (np.concatenate(rows), np.concatenate(cols))), shape=shape
+                )
+            else:
+                self._matrix = sparse.csc_matrix(shape, dtype=np.float32)
+        return self._matrix
+
+    def get_scores(self, query: str, doc_ids: Optional[Collection[str]] = None) -> np.ndarray:
+        """
+        Điểm BM25 của truy vấn với mọi dòng trong index (dòng đã xoá có điểm 0).
+        Nếu có `doc_ids`, chỉ chấm các chunk đó (các dòng khác có điểm 0).
+        """
+        n_rows = len(self.doc_ids)
+        cols = [self.vocab[token] for token in bm25_tokenize(query) if token in self.vocab]
+        if not cols or not self._rows:
+            return np.zeros(n_rows, dtype=np.float32)
+
+        n_docs = len(self._rows)
+        avgdl = float(self._doc_len.sum()) / n_docs or 1.0
+        df = self._df[cols].astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+        sub = self._get_matrix()[:, cols]
+        if doc_ids is not None:
+            # Chỉ giữ các dòng được phép (ma trận con CSR theo dòng -> COO)
+            rows_subset = np.array([self._rows[doc_id] for doc_id in doc_ids if doc_id in self._rows], dtype=np.int64)
+            sub = sub.tocsr()[rows_subset].tocoo()
+            rows, term_index, tf = rows_subset[sub.row], sub.col, sub.data
+        else:
+            term_index = np.repeat(np.arange(len(cols)), np.diff(sub.indptr))
+            rows, tf = sub.indices, sub.data
+        length_norm = self.k1 * (1 - self.b + self.b * self._doc_len[rows] / avgdl)
+        weights = idf[term_index] * tf * (self.k1 + 1) / (tf + length_norm)
+        return np.bincount(rows, weights=weights, minlength=n_rows).astype(np.float32)
+
+    def search(self, query: str, k: int, doc_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Trả về k chunk (id, điểm) có điểm BM25 cao nhất (trong `doc_ids` nếu có)
+        """
+        scores = self.get_scores(query, doc_ids)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.doc_ids[row], float(scores[row])) for row in top if self.doc_ids[row] is not None]
+
+    def save(self, directory: str):
+        """
+        Lưu index ra thư mục (bm25.json + bm25.npz)
+        """
+        self._compact()
+        os.makedirs(directory, exist_ok=True)
+        lengths = np.array([len(cols) for cols, _ in self._doc_terms], dtype=np.int64)
+        np.savez(
+            os.path.join(directory, "bm25.npz"),
+            cols=np.concatenate([cols for cols, _ in self._doc_terms]) if self._doc_terms else np.zeros(0, dtype=np.int32),
+            tfs=np.concatenate([tfs for _, tfs in self._doc_terms]) if self._doc_terms else np.zeros(0, dtype=np.float32),
+            lengths=lengths,
+            doc_len=self._doc_len,
+            df=self._df,
+        )
+        with open(os.path.join(directory, "bm25.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": BM25_FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "vocab": self.vocab,
+                "doc_ids": self.doc_ids,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        """
+        Nạp index đã lưu bằng `save`
+        """
+        with open(os.path.join(directory, "bm25.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != BM25_FORMAT_VERSION:
+            raise ValueError(f"Phiên bản index BM25 không hỗ trợ: {meta.get('version')}")
+        arrays = np.load(os.path.join(directory, "bm25.npz"))
+
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index.vocab = meta["vocab"]
+        index.doc_ids = meta["doc_ids"]
+        index._rows = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+        offsets = np.concatenate([[0], np.cumsum(arrays["lengths"])])
+        cols, tfs = arrays["cols"], arrays["tfs"]
+        index._doc_terms = [
+            (cols[offsets[row]:offsets[row + 1]], tfs[offsets[row]:offsets[row + 1]])
+            for row in range(len(index.doc_ids))
+        ]
+        index._doc_len = arrays["doc_len"]
+        index._df = arrays["df"]
+        return index
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """
+    Retriever dùng BM25Index, thay cho BM25Retriever trong EnsembleRetriever
+    """
+
+    index: Any
+    chunks: Any  # chunk id -> Document (dùng chung với nơi quản lý index, không sao chép)
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [self.chunks[doc_id] for doc_id, score in self.index.search(query, self.k) if score > 0]
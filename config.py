@@ -13,11 +13,115 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = "text-embedding-3-small"
 LLM_MODEL = "gpt-4o-mini"
 LLM_TEMPERATURE = 0
+CHAT_LLM_BACKEND = os.getenv("CHAT_LLM_BACKEND", "openai")  # "openai" | "fake" (trả lời giả lập, không cần mạng)
+
+# Cấu hình backend embedding: "openai" | "sentence-transformers" (local CPU) | "hashing" (kiểm thử)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+LOCAL_EMBEDDING_DEVICE = "cpu"
+LOCAL_EMBEDDING_BATCH_SIZE = 64
+HASHING_EMBEDDING_DIM = 256
 
 # Cấu hình truy xuất thông tin
 VECTOR_RETRIEVER_K = 8
 BM25_RETRIEVER_K = 7
 HYBRID_WEIGHTS = [0.7, 0.3]  # [trọng_số_vector, trọng_số_bm25]
+BM25_K1 = 1.5
+BM25_B = 0.75
+RETRIEVAL_METADATA_FILTER = True  # lọc chunk theo ứng viên / mục CV nhận diện từ câu hỏi
+RRF_C = 60                        # hằng số của reciprocal rank fusion
+HYBRID_FUSION = "rrf"             # "rrf" (weighted reciprocal rank fusion) | "score" (trộn điểm đã chuẩn hoá)
+HYBRID_TOP_K = 10                 # số chunk trả về sau khi gộp
+HYBRID_SEARCH_WORKERS = 4         # số luồng chạy song song vector search và BM25
+
+# Cấu hình đóng gói ngữ cảnh cho câu hỏi chat
+CONTEXT_TOKEN_BUDGET = 3000       # số token tối đa của ngữ cảnh gửi cho LLM
+CONTEXT_DEDUP_THRESHOLD = 0.8     # độ trùng (Jaccard theo từ) để coi hai chunk là trùng nhau
+
+# Cấu hình cache câu trả lời chat theo độ tương đồng câu hỏi (trong bộ nhớ, dùng chung mọi phiên)
+ANSWER_CACHE_MAX_ENTRIES = 500
+ANSWER_CACHE_TTL_SECONDS = 60 * 60
+ANSWER_CACHE_SIMILARITY = 0.92    # cosine tối thiểu giữa hai câu hỏi để dùng lại câu trả lời
+
+# Cấu hình trích xuất PDF
+PDF_EXTRACTION_WORKERS = os.cpu_count() or 1  # số process trích xuất PDF
+PDF_EXTRACTION_MIN_FILES_FOR_POOL = 4         # ít file hơn thì xử lý ngay trong process hiện tại
+
+# Cấu hình cache CV đã đọc (text, section, tên ứng viên) theo hash nội dung PDF
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", ".cache/parsed")
+PARSE_CACHE_MEMORY_ENTRIES = 2000  # số CV giữ trong bộ nhớ
+
+# Cấu hình chấm điểm CV song song
+SCORING_MAX_WORKERS = 8          # số luồng tối đa (đọc PDF + gọi LLM)
+LLM_REQUESTS_PER_SECOND = 8.0    # giới hạn tốc độ gọi LLM (None để tắt)
+LLM_BURST = 8                    # số request được phép dồn trong một lúc
+SCORING_BATCH_TOKEN_BUDGET = 6000  # số token tối đa cho một prompt chấm điểm theo lô
+SCORING_BATCH_MAX_SIZE = 20        # số CV tối đa trong một lô
+BATCH_PROMPT_TOKENS = 250          # ước lượng token phần hướng dẫn của prompt theo lô
+BATCH_ITEM_OVERHEAD_TOKENS = 40    # token thêm cho mỗi CV (tiêu đề + JSON trả về)
+SCORING_LIVE_REFRESH_SECONDS = 0.5  # bảng xếp hạng tạm trong lúc chấm được vẽ lại tối đa mỗi 0.5 giây
+SCORING_LIVE_TABLE_ROWS = 50        # số CV đầu bảng hiển thị trong bảng tạm
+
+# Cấu hình chấm skills bằng từ điển (không gọi LLM); LLM chỉ dùng để phân định CV đồng điểm
+LOCAL_SKILL_MATCHING = True
+SKILL_TIEBREAK_TOP_N = 10          # chỉ phân định các CV đồng điểm trong top N
+
+# Cấu hình sàng lọc CV bằng embedding trước khi chấm bằng LLM
+PRESCREEN_TOP_K = 50               # số CV có độ tương đồng cao nhất được chấm tiếp bằng LLM
+PRESCREEN_MIN_SIMILARITY = 0.0     # CV có độ tương đồng thấp hơn ngưỡng này bị loại
+
+# Cấu hình cache kết quả chấm điểm (SQLite)
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", ".cache/results.sqlite3")
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600  # kết quả cũ hơn 7 ngày sẽ được chấm lại
+
+# Cấu hình lưu index (FAISS + BM25) xuống đĩa để nạp lại nhanh
+INDEX_DIR = os.getenv("INDEX_DIR", ".cache/index")
+INDEX_KEEP_SNAPSHOTS = 2  # số snapshot giữ lại cho các process đang đọc
+INDEX_MAX_DELTAS = 20  # số phần bổ sung (file thêm sau) tối đa trước khi gộp thành snapshot mới
+
+# Cấu hình index FAISS
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")  # flat | hnsw | ivf_flat | ivf_pq | ivf_sq8
+FAISS_ANN_MIN_VECTORS = 10_000   # dưới ngưỡng này luôn dùng flat; đủ ngưỡng thì train/dựng index theo FAISS_INDEX_TYPE
+FAISS_IVF_NLIST = 0              # số cụm IVF, 0: tự chọn ~4*sqrt(số vector), dựng lại khi số vector tăng ~4 lần
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))        # số cụm IVF quét mỗi truy vấn
+FAISS_HNSW_M = 32                # số láng giềng mỗi nút HNSW
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "128"))  # độ rộng tìm kiếm HNSW
+FAISS_PQ_M = 64                  # số sub-quantizer của IVF-PQ (8 bit mỗi sub-quantizer)
+FAISS_EXACT_FILTER_MAX = 2048    # lọc metadata còn <= số chunk này thì tính chính xác trên tập đó
+
+# Cấu hình cache embedding
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_MAX_ENTRIES = 50_000  # số vector tối đa, vượt quá sẽ loại bỏ theo LRU
+EMBEDDING_CACHE_FLUSH_ENTRIES = 512    # ghi vector mới xuống đĩa khi đủ số này...
+EMBEDDING_CACHE_FLUSH_SECONDS = 5.0    # ...hoặc sau số giây này (và khi process kết thúc)
+
+# Cấu hình phát hiện CV gần trùng (MinHash/LSH trên text CV đã làm sạch): mỗi nhóm chỉ index / chấm một CV
+NEAR_DUPLICATE_DETECTION = True
+NEAR_DUPLICATE_THRESHOLD = 0.85  # độ tương đồng Jaccard (ước lượng) tối thiểu giữa hai CV gần trùng
+MINHASH_NUM_PERM = 128           # số hàm băm của chữ ký MinHash
+MINHASH_BANDS = 16               # số band LSH (mỗi band 128 / 16 = 8 giá trị)
+SHINGLE_SIZE = 5                 # số từ liên tiếp trong một shingle
+
+# Cấu hình API service (api_server.py) và client HTTP dùng chung
+API_URL = os.getenv("API_URL")          # đặt thì giao diện Streamlit chỉ gọi API (thin client)
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_LLM_BACKEND = os.getenv("API_LLM_BACKEND", "openai")  # "openai" | "fake" cho LLM chấm điểm của API
+API_SCORING_WORKERS = 64                # số luồng chấm điểm dùng chung cho mọi request
+HTTP_MAX_CONNECTIONS = 32               # kết nối tối đa của client HTTP tới API model (mỗi process)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 16
+HTTP_TIMEOUT_SECONDS = 60.0
+EMBED_MICROBATCH_MAX_SIZE = 64          # số câu hỏi tối đa gom vào một request embedding
+EMBED_MICROBATCH_WAIT_MS = 5            # thời gian chờ gom câu hỏi đến cùng lúc
+LLM_MICROBATCH_MAX_SIZE = 20            # số prompt tối đa gom vào một request completions
+LLM_MICROBATCH_WAIT_MS = 20
+
+# Cấu hình đo thời gian / token theo từng bước xử lý
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", ".cache/metrics.prom")  # file text định dạng Prometheus
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # > 0: mở endpoint HTTP /metrics ở cổng này
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # địa chỉ lắng nghe của /metrics ("0.0.0.0": mọi interface)
+METRICS_LOG_FILE = os.getenv("METRICS_LOG_FILE")    # ghi log JSON của từng bước vào file này (nếu có)
 
 # Từ khóa các mục trong CV
 CV_SECTION_KEYWORDS = [
@@ -26,6 +130,52 @@ CV_SECTION_KEYWORDS = [
     "References", "Activities", "Interests"
 ]
 
+# Nhóm mục CV dùng để lọc khi truy xuất (tên nhóm -> từ khoá trong tiêu đề mục / câu hỏi)
+SECTION_ALIASES = {
+    "skills": ["skill", "kỹ năng", "technical", "competence"],
+    "projects": ["project", "dự án"],
+    "experience": ["experience", "kinh nghiệm", "work", "employment"],
+    "education": ["education", "học vấn", "trình độ", "university", "đại học"],
+    "certifications": ["certificat", "chứng chỉ"],
+    "awards": ["award", "honor", "giải thưởng"],
+    "profile": ["profile", "objective", "summary", "mục tiêu", "giới thiệu"],
+    "activities": ["activit", "hoạt động"],
+    "interests": ["interest", "sở thích"],
+    "references": ["reference", "tham chiếu"],
+}
+
+# Từ đồng nghĩa / viết tắt của skill: mỗi nhóm là các cách viết của cùng một skill
+SKILL_ALIASES = [
+    ["pytorch", "torch"],
+    ["tensorflow", "tf"],
+    ["scikit-learn", "sklearn"],
+    ["huggingface", "hugging face"],
+    ["javascript", "js"],
+    ["typescript", "ts"],
+    ["node.js", "nodejs"],
+    ["react", "reactjs", "react.js"],
+    ["vue", "vuejs", "vue.js"],
+    ["angular", "angularjs"],
+    ["golang", "go lang"],
+    ["c++", "cpp"],
+    ["c#", "csharp"],
+    ["postgresql", "postgres"],
+    ["mongodb", "mongo"],
+    ["sql server", "mssql"],
+    ["kubernetes", "k8s"],
+    ["amazon web services", "aws"],
+    ["google cloud platform", "gcp", "google cloud"],
+    ["microsoft azure", "azure"],
+    ["ci/cd", "cicd"],
+    ["rest api", "restful api", "restful"],
+    ["machine learning", "ml", "học máy"],
+    ["deep learning", "dl", "học sâu"],
+    ["natural language processing", "nlp", "xử lý ngôn ngữ tự nhiên"],
+    ["computer vision", "thị giác máy tính"],
+    ["large language model", "large language models", "llm", "llms"],
+]
+
 # Cấu hình Streamlit
 PAGE_TITLE = "Ask your CV"
 PAGE_ICON = "📄"
+CHUNK_VIEWER_PAGE_SIZE = 20  # số chunk hiển thị mỗi trang trong tab chat
@@ -0,0 +1,124 @@
+"""
+Đóng gói ngữ cảnh cho câu hỏi chat: bỏ chunk trùng, gom theo ứng viên,
+cắt theo ngân sách token (đếm bằng tokenizer local)
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from langchain.schema import Document
+from config import LLM_MODEL, CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    """
+    Tokenizer tiktoken của model (None nếu chưa cài tiktoken hoặc không tải được
+    file BPE - tiktoken tải file này từ mạng ở lần dùng đầu tiên)
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(model_name)
+    except KeyError:
+        encoding_name = "cl100k_base"
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model_name: str = LLM_MODEL) -> int:
+    """
+    Số token của chuỗi theo tokenizer của model; ước lượng ~4 ký tự / token nếu không có tiktoken
+    """
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _chunk_body(doc: Document) -> str:
+    """Nội dung chunk không kèm dòng tên ứng viên lặp lại ở đầu"""
+    applicant_name = doc.metadata.get("applicant_name", "")
+    content = doc.page_content.strip()
+    if applicant_name and content.startswith(applicant_name):
+        content = content[len(applicant_name):].strip()
+    return content
+
+
+def _word_set(text: str) -> frozenset:
+    return frozenset(re.findall(r"\w+", text.lower()))
+
+
+def _is_duplicate(body: str, words: frozenset, kept: List[Tuple[str, frozenset]], threshold: float) -> bool:
+    for kept_body, kept_words in kept:
+        if body in kept_body:
+            return True
+        union = len(words | kept_words)
+        if union and len(words & kept_words) / union >= threshold:
+            return True
+    return False
+
+
+def _format_chunk(doc: Document, body: str) -> str:
+    return f"SOURCE: file={doc.metadata.get('file_name')}; section={doc.metadata.get('section')}\n{body}"
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, model_name: str) -> str:
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return text[:max(max_tokens, 0) * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max(max_tokens, 0)])
+
+
+def pack_context(
+    docs: List[Document],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+    model_name: str = LLM_MODEL,
+) -> Tuple[str, List[Document], int]:
+    """
+    Đóng gói các chunk (đã xếp theo độ liên quan giảm dần) thành ngữ cảnh:
+    - bỏ chunk trùng hoặc nằm trọn trong chunk liên quan hơn
+    - lấy lần lượt theo độ liên quan cho tới khi hết ngân sách token
+      (chunk không vừa thì bỏ qua, thử chunk sau)
+    - gom theo ứng viên, ứng viên có chunk liên quan nhất đứng trước
+    Trả về (ngữ cảnh, các chunk được chọn, số token của ngữ cảnh).
+    """
+    kept: List[Tuple[str, frozenset]] = []
+    groups: Dict[str, List[str]] = {}
+    selected: List[Document] = []
+    used = 0
+
+    for doc in docs:
+        body = _chunk_body(doc)
+        words = _word_set(body)
+        if not body or _is_duplicate(body, words, kept, dedup_threshold):
+            continue
+
+        applicant_name = doc.metadata.get("applicant_name") or "Không rõ"
+        block = _format_chunk(doc, body)
+        # Tiêu đề ứng viên chỉ tính một lần; +2 token cho dòng trống giữa các khối
+        cost = count_tokens(block, model_name) + 2
+        if applicant_name not in groups:
+            cost += count_tokens(f"### Ứng viên: {applicant_name}", model_name) + 2
+
+        if used + cost > token_budget:
+            if selected:
+                continue
+            # Chunk liên quan nhất không vừa ngân sách: cắt bớt thay vì trả về ngữ cảnh rỗng
+            block = _truncate_to_tokens(block, token_budget - (cost - count_tokens(block, model_name)), model_name)
+            cost = token_budget
+
+        kept.append((body, words))
+        groups.setdefault(applicant_name, []).append(block)
+        selected.append(doc)
+        used += cost
+
+    context = "\n\n".join(
+        f"### Ứng viên: {applicant_name}\n" + "\n\n".join(blocks) for applicant_name, blocks in groups.items()
+    )
+    return context, selected, count_tokens(context, model_name) if context else 0
@@ -1,132 +1,292 @@
+import json
+import time
+from typing import Dict, Iterator, List, Set
 import streamlit as st
-from langchain_openai import OpenAIEmbeddings, OpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains.question_answering import load_qa_chain
-from langchain_community.callbacks.manager import get_openai_callback
-from langchain.prompts import PromptTemplate
-from langchain.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
-from langchain.schema import Document
-import hashlib
-import fitz
-from text_processing import clean_pdf_text, split_cv_sections
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from answer_cache import SemanticAnswerCache
+from context_packing import pack_context
+from vector_store import calculate_file_hash, calculate_pdf_hash, get_embeddings
+from index_manager import CVIndexManager, snapshot_lock
+from cv_scoring import render_duplicate_groups
+from llm_clients import create_openai_chat_model
+from metrics import get_metrics, llm_callbacks, record_action, render_timing_panel, trace
+from config import (
+    INDEX_DIR, CHAT_LLM_BACKEND, CHUNK_VIEWER_PAGE_SIZE,
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY
+)
+
+
+QA_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", (
+        "Bạn là trợ lý phân tích CV.\n"
+        "Yêu cầu:\n"
+        "- Trả lời chính xác, ngắn gọn.\n"
+        "- Khi tìm kiếm hãy tìm đúng các mục 'section' kết hợp với 'applicant_name'trong metadata.\n"
+        "- Trích dẫn mục trong CV (SECTION) nếu có.\n"
+        "- Nếu CV không có thông tin, hãy trả lời: 'Không thấy trong CV'."
+    )),
+    ("human", "Dựa trên ngữ cảnh sau:\n{context}\n\nCâu hỏi: {question}"),
+])
+
+_answer_cache = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """
+    Lấy cache câu trả lời chat (dùng chung cho cả process)
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY
+        )
+        get_metrics().register_cache("answer", _answer_cache.stats)
+    return _answer_cache
+
+
+def create_chat_llm(backend: str = CHAT_LLM_BACKEND) -> BaseChatModel:
+    """
+    Tạo chat model có streaming theo cấu hình
+    """
+    if backend == "openai":
+        return create_openai_chat_model(streaming=True)
+    if backend == "fake":
+        from fake_llm import FakeChatModel
+        return FakeChatModel()
+    raise ValueError(f"Chat LLM backend không hợp lệ: {backend}")
+
+
+def stream_answer(llm: BaseChatModel, question: str, context: str, timings: dict) -> Iterator[str]:
+    """
+    Sinh câu trả lời theo từng token. Ghi vào `timings` thời gian tới token
+    đầu tiên (`first_token`) và tổng thời gian (`total`), tính bằng giây.
+    """
+    chain = QA_PROMPT | llm | StrOutputParser()
+    start = time.perf_counter()
+    for token in chain.stream({"context": context, "question": question}, config={"callbacks": llm_callbacks("llm_chat")}):
+        if "first_token" not in timings:
+            timings["first_token"] = time.perf_counter() - start
+        yield token
+    timings["total"] = time.perf_counter() - start
+
+
+def render_sources(sources: List[dict]):
+    """Hiển thị các chunk đã dùng làm ngữ cảnh"""
+    st.subheader("Nguồn:")
+    for source in sources:
+        with st.expander(f"{source['applicant_name']} - {source['section']} ({source['file_name']})"):
+            st.text(source["page_content"])
+
+
+def render_chunk_viewer(
+    index_manager: CVIndexManager, scope: Set[str], page_size: int = CHUNK_VIEWER_PAGE_SIZE
+):
+    """
+    Xem chunk (trong `scope`: chunk các CV của phiên) theo trang, lọc theo ứng viên / mục CV
+    qua metadata index. Chỉ các chunk của trang hiện tại được render nên số widget không tăng theo số CV.
+    """
+    st.subheader(f"Các chunk CV ({len(scope)} chunks):")
+    metadata_index = index_manager.metadata_index
+    applicants = metadata_index.options("applicant_name", scope)
+    sections = metadata_index.options("section", scope)
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        selected_applicants = st.multiselect(
+            "Ứng viên", list(applicants), format_func=applicants.get, key="chunk_viewer_applicants"
+        )
+    with col2:
+        selected_sections = st.multiselect(
+            "Mục CV", list(sections), format_func=sections.get, key="chunk_viewer_sections"
+        )
+    with col3:
+        page = int(st.number_input("Trang", min_value=1, value=1, step=1, key="chunk_viewer_page")) - 1
+
+    chunks, total, page = index_manager.chunk_page(
+        {"applicant_name": selected_applicants, "section": selected_sections}, page, page_size, scope
+    )
+    pages = max(1, -(-total // page_size))
+    st.caption(f"Trang {page + 1}/{pages}, {total} chunk khớp bộ lọc")
+    for i, chunk in enumerate(chunks, start=page * page_size + 1):
+        st.write(
+            f"**Chunk {i}** ({chunk.metadata.get('applicant_name')}, Section: {chunk.metadata.get('section')}, "
+            f"File: {chunk.metadata.get('file_name')}):"
+        )
+        st.text_area(
+            f"Nội dung chunk {i}", chunk.page_content, height=100,
+            key=f"chunk_{chunk.metadata.get('chunk_id', i)}"
+        )
+        st.write("---")
 
 
 def process_cvs_for_chat(pdfs):
-    """Xử lý CV cho tính năng chat"""
+    """Xử lý CV cho tính năng chat (kèm bảng thời gian xử lý theo bước)"""
+    with record_action() as recorder:
+        _process_cvs_for_chat(pdfs)
+    render_timing_panel(recorder)
+
+
+def process_cvs_for_chat_remote(pdfs):
+    """Chat với CV qua API service (API_URL): index và LLM nằm ở service"""
+    from api_client import get_api_client
+
+    client = get_api_client()
+    current_pdf_hash = calculate_pdf_hash(pdfs)
+    if st.session_state.pdf_hash != current_pdf_hash:
+        files = []
+        for i, pdf in enumerate(pdfs):
+            if pdf is not None:
+                files.append((pdf.name if hasattr(pdf, "name") else f"CV_{i+1}", pdf.read()))
+                pdf.seek(0)
+        with st.spinner("Đang gửi CV tới API service..."):
+            ingested = client.ingest(files)
+        st.session_state.pdf_hash = current_pdf_hash
+        st.session_state.file_hashes = sorted({item["file_hash"] for item in ingested})
+        names = {item["file_hash"]: item["file_name"] for item in ingested}
+        groups: Dict[str, List[dict]] = {}
+        for item in ingested:
+            if item.get("duplicate_of"):
+                groups.setdefault(names.get(item["duplicate_of"], item["duplicate_of"]), []).append(
+                    {"file_name": item["file_name"], "similarity": item.get("duplicate_similarity")}
+                )
+        st.session_state.duplicate_groups = list(groups.items())
+        st.success("CV đã được xử lý thành công!")
+        st.caption(
+            f"Thêm {sum(item['new'] for item in ingested)} file, "
+            f"{sum(item['chunks'] for item in ingested)} chunk trong index của service"
+        )
+
+    render_duplicate_groups(st.session_state.get("duplicate_groups", []))
+
+    user_question = st.text_input("Hãy đặt câu hỏi về CV:")
+    if not user_question:
+        return
+
+    done = {}
+
+    def tokens():
+        for event in client.ask_stream(user_question, st.session_state.file_hashes):
+            if "token" in event:
+                yield event["token"]
+            else:
+                done.update(event["done"])
+
+    st.subheader("Trả lời:")
+    st.write_stream(tokens())
+    if done.get("cached"):
+        st.caption(
+            f"Trả lời từ cache sau {done['timings']['total'] * 1000:.0f}ms "
+            f"(câu hỏi tương tự: \"{done['similar_question']}\", độ tương đồng {done['similarity']:.2f})"
+        )
+    elif done:
+        st.caption(
+            f"Ngữ cảnh: {done['context_chunks']}/{done['retrieved_chunks']} chunk, {done['context_tokens']} token. "
+            f"Token đầu tiên sau {done['timings'].get('first_token', 0) * 1000:.0f}ms, "
+            f"hoàn tất sau {done['timings']['total'] * 1000:.0f}ms"
+        )
+    render_sources(done.get("sources", []))
+
+
+def _process_cvs_for_chat(pdfs):
     # Hash để detect thay đổi file
-    pdf_content = b""
-    for pdf in pdfs:
-        if pdf is not None:
-            pdf_content += pdf.read()
-            pdf.seek(0)  
-    
-    current_pdf_hash = hashlib.md5(pdf_content).hexdigest()
+    current_pdf_hash = calculate_pdf_hash(pdfs)
     
     if (st.session_state.pdf_hash != current_pdf_hash or 
         st.session_state.hybrid_retriever is None):
-        
+
+        # Không xoá câu trả lời đã cache của bộ CV cũ: cache dùng chung cho mọi phiên
+        # (phiên khác có thể đang dùng cùng bộ CV), khoá theo hash bộ CV và tự hết hạn theo LRU / TTL
         with st.spinner("Đang xử lý CV và tạo embeddings..."):
-            documents = []
-            for pdf in pdfs:
-                if pdf is not None:
-                    file_name = pdf.name if hasattr(pdf, "name") else "Unknown"
-
-                    # Mở file PDF với fitz (cần đọc binary từ Streamlit upload)
-                    with fitz.open(stream=pdf.read(), filetype="pdf") as doc_fitz:
-                        full_text = ""
-                        for page in doc_fitz:
-                            page_text = page.get_text("text") or ""
-                            full_text += page_text + "\n"
-                            
-                    # Làm sạch text
-                    full_text = clean_pdf_text(full_text)
-
-                    documents.append(
-                        Document(
-                            page_content=full_text,
-                            metadata={
-                                "source": "pdf", 
-                                "file_name": file_name
-                            }
-                        )
-                    )
-
-            # Chunking theo section + bullet
-            all_chunks = []
-            for doc in documents:
-                first_line = doc.page_content.strip().split("\n")[0]
-                applicant_name = first_line.strip()
-                sections = split_cv_sections(doc.page_content)
-                for title, body in sections:
-                    if body.strip():
-                        all_chunks.append(
-                            Document(
-                                page_content=applicant_name + "\n" + body.strip(),   # giữ nguyên cả section (có cả title)
-                                metadata={
-                                    **doc.metadata, 
-                                    "section": title, 
-                                    "applicant_name": applicant_name
-                                }
-                            )
+            index_manager = st.session_state.index_manager
+            file_hashes = list(dict.fromkeys(calculate_file_hash(pdf) for pdf in pdfs if pdf is not None))
+            added = []
+            if index_manager is None or any(file_hash not in index_manager.manifest for file_hash in file_hashes):
+                # Index trên đĩa dùng chung cho mọi phiên và chỉ được thêm file: cập nhật các file
+                # phiên khác vừa thêm (chỉ nạp lại cả index khi snapshot đã đổi), embed file còn
+                # thiếu rồi chỉ ghi phần của các file đó
+                with snapshot_lock(INDEX_DIR):
+                    if index_manager is None or not index_manager.refresh(INDEX_DIR):
+                        index_manager = (
+                            CVIndexManager.load(INDEX_DIR, get_embeddings()) or CVIndexManager(get_embeddings())
                         )
+                    file_hashes, added = index_manager.add_uploads(pdfs)
+                    if added:
+                        index_manager.save_delta(INDEX_DIR, added)
+                st.session_state.index_manager = index_manager
 
-            # Tạo embeddings
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            knowledge_base = FAISS.from_documents(all_chunks, embeddings)
-
-            # Hybrid retriever
-            vector_retriever = knowledge_base.as_retriever(search_kwargs={"k": 8})
-            bm25_retriever = BM25Retriever.from_documents(all_chunks)
-            bm25_retriever.k = 7
-
-            hybrid_retriever = EnsembleRetriever(
-                retrievers=[vector_retriever, bm25_retriever],
-                weights=[0.7, 0.3],
-            )
-            
+            # Phiên chỉ tìm trong chunk của các file mình đã upload
             st.session_state.pdf_hash = current_pdf_hash
-            st.session_state.hybrid_retriever = hybrid_retriever
-            st.session_state.all_chunks = all_chunks
+            st.session_state.file_hashes = file_hashes
+            st.session_state.hybrid_retriever = index_manager.get_retriever(file_hashes)
 
         st.success("CV đã được xử lý thành công!")
-
-    qa_prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template=(
-            "Bạn là trợ lý phân tích CV. Dựa trên ngữ cảnh sau:\n"
-            "{context}\n\n"
-            "Câu hỏi: {question}\n"
-            "Yêu cầu:\n"
-            "- Trả lời chính xác, ngắn gọn.\n"
-            "- Khi tìm kiếm hãy tìm đúng các mục 'section' kết hợp với 'applicant_name'trong metadata.\n"
-            "- Trích dẫn mục trong CV (SECTION) nếu có.\n"
-            "- Nếu CV không có thông tin, hãy trả lời: 'Không thấy trong CV'."
+        st.caption(f"Thêm {len(added)} file mới vào index, phiên này dùng {len(file_hashes)} file")
+        cache_stats = get_embeddings().cache.stats()
+        st.caption(
+            f"Embedding cache: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+            f"({cache_stats['entries']} vector trên đĩa)"
         )
-    )
-
-    doc_prompt = PromptTemplate.from_template(
-        "SOURCE: file={file_name}; section={section}\n{page_content}"
-    )
 
-    if 'all_chunks' in st.session_state:
-        st.subheader(f"Các chunk CV ({len(st.session_state.all_chunks)} chunks):")
-        for i, chunk in enumerate(st.session_state.all_chunks):
-            st.write(f"**Chunk {i+1}** (Section: {chunk.metadata.get('section')}, File: {chunk.metadata.get('file_name')}):")
-            st.text_area(f"Nội dung chunk {i+1}", chunk.page_content, height=100, key=f"chunk_{i}")
-            st.write("---")
+    if st.session_state.index_manager is not None:
+        index_manager = st.session_state.index_manager
+        file_hashes = st.session_state.file_hashes
+        render_duplicate_groups(index_manager.duplicate_groups(set(file_hashes)))
+        render_chunk_viewer(index_manager, index_manager.chunk_ids_for(file_hashes))
 
     user_question = st.text_input("Hãy đặt câu hỏi về CV:")
-    if user_question:
+    if user_question and st.session_state.hybrid_retriever is None:
+        st.warning("Không tìm thấy nội dung nào trong CV đã upload")
+    elif user_question:
+        start = time.perf_counter()
+        # Chỉ nhận diện ứng viên / file trong các CV của phiên
+        filters = st.session_state.index_manager.metadata_index.detect_filters(
+            user_question, st.session_state.hybrid_retriever.scope
+        )
+        if filters:
+            st.caption("Bộ lọc: " + "; ".join(f"{field} = {', '.join(sorted(values))}" for field, values in filters.items()))
+
+        # Câu hỏi gần giống câu đã hỏi (cùng bộ CV, cùng ứng viên/mục CV) thì dùng lại câu trả lời
+        answer_cache = get_answer_cache()
+        scope = json.dumps({field: sorted(values) for field, values in filters.items()}, sort_keys=True)
+        with trace("answer_cache_lookup"):
+            question_vector = get_embeddings().embed_query(user_question)
+            cached = answer_cache.get(st.session_state.pdf_hash, question_vector, scope)
+        if cached is not None:
+            entry, similarity = cached
+            st.subheader("Trả lời:")
+            st.markdown(entry["answer"])
+            st.caption(
+                f"Trả lời từ cache sau {(time.perf_counter() - start) * 1000:.0f}ms "
+                f"(câu hỏi tương tự: \"{entry['question']}\", độ tương đồng {similarity:.2f})"
+            )
+            render_sources(entry["sources"])
+            return
+
         docs = st.session_state.hybrid_retriever.get_relevant_documents(user_question)
 
-        llm = OpenAI(model="gpt-4o-mini", temperature=0)
-        chain = load_qa_chain(llm, chain_type="stuff", prompt=qa_prompt, document_prompt=doc_prompt)
-        with get_openai_callback() as cb:
-            response = chain.invoke({'input_documents': docs, 'question': user_question})
-            print(cb)
+        # Bỏ chunk trùng, gom theo ứng viên và giới hạn số token gửi cho LLM
+        with trace("context_packing", chunks=len(docs)):
+            context, docs_in_context, context_tokens = pack_context(docs)
+        st.caption(f"Ngữ cảnh: {len(docs_in_context)}/{len(docs)} chunk, {context_tokens} token")
 
-        # response = chain.invoke({'input_documents': docs, 'question': user_question})
         st.subheader("Trả lời:")
-        st.write(response['output_text'])
-        st.write(docs)
+        timings = {}
+        answer = st.write_stream(stream_answer(create_chat_llm(), user_question, context, timings))
+        if "first_token" in timings:
+            st.caption(
+                f"Token đầu tiên sau {timings['first_token'] * 1000:.0f}ms, "
+                f"hoàn tất sau {timings['total'] * 1000:.0f}ms"
+            )
+
+        sources = [
+            {
+                "applicant_name": doc.metadata.get("applicant_name"),
+                "section": doc.metadata.get("section"),
+                "file_name": doc.metadata.get("file_name"),
+                "page_content": doc.page_content,
+            }
+            for doc in docs_in_context
+        ]
+        answer_cache.put(st.session_state.pdf_hash, user_question, question_vector, answer, sources, scope)
+        render_sources(sources)
@@ -1,19 +1,60 @@
 from dotenv import load_dotenv
 import streamlit as st
-from langchain_openai import OpenAI
 from langchain.prompts import PromptTemplate
-import fitz
+import bisect
 import json
 import pandas as pd
 import re
-from typing import List, Dict, Tuple
-from text_processing import clean_pdf_text, split_cv_sections
+import time
+import unicodedata
+from typing import List, Dict, Optional, Set, Tuple
+from config import (
+    BATCH_PROMPT_TOKENS, BATCH_ITEM_OVERHEAD_TOKENS,
+    SCORING_BATCH_TOKEN_BUDGET, SCORING_BATCH_MAX_SIZE,
+    RESULT_CACHE_PATH, RESULT_CACHE_TTL_SECONDS, PRESCREEN_TOP_K, PRESCREEN_MIN_SIMILARITY,
+    SKILL_ALIASES, LOCAL_SKILL_MATCHING, SKILL_TIEBREAK_TOP_N,
+    SCORING_LIVE_REFRESH_SECONDS, SCORING_LIVE_TABLE_ROWS
+)
+from llm_clients import create_scoring_llm
+from metrics import get_metrics, llm_callbacks, record_action, render_timing_panel, trace, traced
+from pdf_extraction import parse_pdf_files
+from prescreening import screening_scores, select_candidates
+from result_cache import ResultCache
+from vector_store import get_embeddings
 
+# Tăng khi thay đổi prompt/quy tắc chấm điểm để không dùng lại điểm cũ trong cache
+SCORING_PROMPT_VERSION = 1
 
-def analyze_job_requirements(job_description: str, llm) -> Dict[str, List[str]]:
+_result_cache = None
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Lấy cache kết quả chấm điểm (dùng chung cho cả process)
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(RESULT_CACHE_PATH, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+        _result_cache.purge_expired()
+        get_metrics().register_cache("result", _result_cache.stats)
+    return _result_cache
+
+
+def get_llm_name(llm) -> str:
+    """Tên model của LLM (dùng trong key cache)"""
+    return getattr(llm, "model_name", None) or type(llm).__name__
+
+
+def analyze_job_requirements(job_description: str, llm, result_cache: Optional[ResultCache] = None) -> Dict[str, List[str]]:
     """
     Phân tích yêu cầu công việc và tách thành các skills cụ thể
+    Nếu có `result_cache`, mô tả công việc đã phân tích trước đó sẽ không gọi lại LLM.
     """
+    if result_cache is not None:
+        cached = result_cache.get_requirements(job_description)
+        if cached is not None:
+            return cached
+
     prompt = PromptTemplate(
         input_variables=["job_description"],
         template=(
@@ -28,13 +69,17 @@ def analyze_job_requirements(job_description: str, llm) -> Dict[str, List[str]]:
     )
     
     chain = prompt | llm
-    response = chain.invoke({"job_description": job_description})
+    response = chain.invoke(
+        {"job_description": job_description}, config={"callbacks": llm_callbacks("llm_requirements")}
+    )
     
     try:
         # Tìm JSON trong response
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
         if json_match:
             result = json.loads(json_match.group())
+            if result_cache is not None:
+                result_cache.put_requirements(job_description, result)
             return result
         else:
             # Fallback nếu không tìm thấy JSON
@@ -43,12 +88,11 @@ def analyze_job_requirements(job_description: str, llm) -> Dict[str, List[str]]:
         return {"skills": [], "projects_related": []}
 
 
-def score_cv_against_requirements(cv_sections: List[Tuple[str, str]], job_requirements: Dict[str, List[str]], llm) -> Dict[str, float]:
+def extract_scoring_sections(cv_sections: List[Tuple[str, str]]) -> Tuple[str, str]:
     """
-    Chấm điểm CV dựa trên yêu cầu công việc
-    Trả về: {"skills_score": float, "projects_score": float, "total_score": float}
+    Tách mục skills và projects từ danh sách section của CV
+    Trả về: (skills_section, projects_section)
     """
-    # Tách skills và projects từ CV
     skills_section = ""
     projects_section = ""
     
@@ -59,73 +103,498 @@ def score_cv_against_requirements(cv_sections: List[Tuple[str, str]], job_requir
         elif any(keyword in title_lower for keyword in ["project", "dự án", "experience", "kinh nghiệm"]):
             projects_section = content
     
-    # Chấm điểm skills (tối đa 5 điểm)
-    skills_score = 0
-    if skills_section and job_requirements.get("skills"):
-        skills_prompt = PromptTemplate(
-            input_variables=["cv_skills", "required_skills"],
-            template=(
-                "So sánh skills trong CV với yêu cầu công việc:\n"
-                "CV Skills: {cv_skills}\n"
-                "Required Skills: {required_skills}\n\n"
-                "Đếm số skills trong CV phù hợp với yêu cầu (mỗi skill = 1 điểm, tối đa 5 điểm).\n"
-                "Trả về chỉ số điểm (0-5), không có text khác."
+    return skills_section, projects_section
+
+
+def normalize_skill_text(text: str) -> str:
+    """
+    Chuẩn hoá text để so khớp skill: chữ thường, "-"/"_" thành khoảng trắng, gộp khoảng trắng
+    """
+    text = unicodedata.normalize("NFC", text.lower())
+    return re.sub(r"\s+", " ", re.sub(r"[-_]", " ", text)).strip()
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Gộp các từ thành một regex dạng trie (tiền tố chung chỉ so một lần,
+    ưu tiên khớp dài nhất)
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class SkillMatcher:
+    """
+    So khớp skill yêu cầu trong text CV không cần LLM.
+    Mỗi skill yêu cầu được mở rộng thành các cách viết trong SKILL_ALIASES
+    (vd. "pytorch" / "torch"); mọi cách viết được biên dịch thành một regex
+    trie duy nhất nên mỗi CV chỉ cần quét một lượt.
+    """
+
+    def __init__(self, required_skills: List[str], aliases: List[List[str]] = SKILL_ALIASES):
+        alias_groups = [[normalize_skill_text(alias) for alias in group] for group in aliases]
+        self.required_skills = list(required_skills)
+        self._surface_forms: Dict[str, str] = {}  # cách viết đã chuẩn hoá -> skill yêu cầu
+        for skill in required_skills:
+            normalized = normalize_skill_text(skill)
+            if not normalized:
+                continue
+            forms = {normalized}
+            for group in alias_groups:
+                if normalized in group:
+                    forms.update(group)
+            for form in forms:
+                self._surface_forms.setdefault(form, skill)
+
+        self._pattern = None
+        if self._surface_forms:
+            self._pattern = re.compile(
+                # Cho phép số phiên bản ngay sau skill (vd. "python3", "c++17")
+                r"(?<![\w+#])(" + _trie_pattern(list(self._surface_forms)) + r")(?![^\W\d]|[+#])"
             )
+
+    def match(self, text: str) -> Set[str]:
+        """Tập skill yêu cầu xuất hiện trong text (theo tên trong yêu cầu công việc)"""
+        if self._pattern is None or not text:
+            return set()
+        return {self._surface_forms[m.group(1)] for m in self._pattern.finditer(normalize_skill_text(text))}
+
+    def score(self, text: str) -> Tuple[float, List[str]]:
+        """
+        Điểm skills theo cùng quy tắc như prompt LLM (mỗi skill khớp = 1 điểm, tối đa 5)
+        kèm danh sách skill đã khớp để đối chiếu
+        """
+        matched = sorted(self.match(text), key=self.required_skills.index)
+        return float(min(len(matched), 5)), matched
+
+
+@traced("llm_parse")
+def _parse_score(response: str) -> float:
+    """
+    Đọc điểm (0-5) từ câu trả lời của LLM, 0 nếu không có số
+    """
+    match = re.search(r'\d+', response)
+    return min(float(match.group()), 5.0) if match else 0
+
+
+def score_skills(skills_section: str, required_skills: List[str], llm) -> float:
+    """
+    Chấm điểm skills (tối đa 5 điểm)
+    """
+    if not skills_section or not required_skills:
+        return 0
+
+    skills_prompt = PromptTemplate(
+        input_variables=["cv_skills", "required_skills"],
+        template=(
+            "So sánh skills trong CV với yêu cầu công việc:\n"
+            "CV Skills: {cv_skills}\n"
+            "Required Skills: {required_skills}\n\n"
+            "Đếm số skills trong CV phù hợp với yêu cầu (mỗi skill = 1 điểm, tối đa 5 điểm).\n"
+            "Trả về chỉ số điểm (0-5), không có text khác."
         )
-        
-        chain = skills_prompt | llm
-        response = chain.invoke({
-            "cv_skills": skills_section,
-            "required_skills": ", ".join(job_requirements["skills"])
-        })
-        
-        try:
-            skills_score = min(float(re.search(r'\d+', response).group()), 5.0)
-        except:
-            skills_score = 0
-    
-    # Chấm điểm projects (tối đa 5 điểm)
-    projects_score = 0
-    if projects_section and job_requirements.get("projects_related"):
-        projects_prompt = PromptTemplate(
-            input_variables=["cv_projects", "required_project_types"],
-            template=(
-                "So sánh projects trong CV với yêu cầu công việc:\n"
-                "CV Projects: {cv_projects}\n"
-                "Required Project Types: {required_project_types}\n\n"
-                "Đánh giá độ liên quan của projects (mỗi project liên quan = 2 điểm, tối đa 5 điểm).\n"
-                "Trả về chỉ số điểm (0-5), không có text khác."
-            )
+    )
+    
+    chain = skills_prompt | llm
+    response = chain.invoke({
+        "cv_skills": skills_section,
+        "required_skills": ", ".join(required_skills)
+    }, config={"callbacks": llm_callbacks("llm_skills")})
+    return _parse_score(response)
+
+
+def score_projects(projects_section: str, required_project_types: List[str], llm) -> float:
+    """
+    Chấm điểm projects (tối đa 5 điểm)
+    """
+    if not projects_section or not required_project_types:
+        return 0
+
+    projects_prompt = PromptTemplate(
+        input_variables=["cv_projects", "required_project_types"],
+        template=(
+            "So sánh projects trong CV với yêu cầu công việc:\n"
+            "CV Projects: {cv_projects}\n"
+            "Required Project Types: {required_project_types}\n\n"
+            "Đánh giá độ liên quan của projects (mỗi project liên quan = 2 điểm, tối đa 5 điểm).\n"
+            "Trả về chỉ số điểm (0-5), không có text khác."
         )
-        
-        chain = projects_prompt | llm
-        response = chain.invoke({
-            "cv_projects": projects_section,
-            "required_project_types": ", ".join(job_requirements["projects_related"])
-        })
-        
-        try:
-            projects_score = min(float(re.search(r'\d+', response).group()), 5.0)
-        except:
-            projects_score = 0
+    )
+    
+    chain = projects_prompt | llm
+    response = chain.invoke({
+        "cv_projects": projects_section,
+        "required_project_types": ", ".join(required_project_types)
+    }, config={"callbacks": llm_callbacks("llm_projects")})
+    return _parse_score(response)
+
+
+def score_cv_against_requirements(
+    cv_sections: List[Tuple[str, str]],
+    job_requirements: Dict[str, List[str]],
+    llm,
+    skill_matcher: Optional[SkillMatcher] = None,
+) -> Dict[str, float]:
+    """
+    Chấm điểm CV dựa trên yêu cầu công việc
+    Nếu có `skill_matcher`, skills được chấm bằng từ điển trên toàn bộ CV (không gọi LLM).
+    Trả về: {"skills_score": float, "projects_score": float, "total_score": float}
+    (kèm "matched_skills" khi dùng `skill_matcher`)
+    """
+    # Tách skills và projects từ CV
+    skills_section, projects_section = extract_scoring_sections(cv_sections)
+    
+    result = {}
+    if skill_matcher is not None:
+        skills_score, result["matched_skills"] = skill_matcher.score("\n".join(body for _, body in cv_sections))
+    else:
+        skills_score = score_skills(skills_section, job_requirements.get("skills", []), llm)
+    projects_score = score_projects(projects_section, job_requirements.get("projects_related", []), llm)
     
     total_score = skills_score + projects_score
-    return {
+    result.update({
         "skills_score": skills_score,
         "projects_score": projects_score,
         "total_score": total_score
-    }
+    })
+    return result
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Ước lượng nhanh số token (~4 ký tự / token)
+    """
+    return len(text) // 4 + 1
+
+
+def estimate_batch_item_tokens(skills_section: str, projects_section: str) -> int:
+    """
+    Ước lượng số token một CV chiếm trong prompt chấm điểm theo lô (gồm cả phần trả lời)
+    """
+    return estimate_tokens(skills_section) + estimate_tokens(projects_section) + BATCH_ITEM_OVERHEAD_TOKENS
+
+
+def estimate_batch_base_tokens(job_requirements: Dict[str, List[str]]) -> int:
+    """
+    Ước lượng số token cố định của prompt chấm điểm theo lô (hướng dẫn + yêu cầu công việc)
+    """
+    return (
+        BATCH_PROMPT_TOKENS
+        + estimate_tokens(", ".join(job_requirements.get("skills", [])))
+        + estimate_tokens(", ".join(job_requirements.get("projects_related", [])))
+    )
+
+
+@traced("llm_parse_batch")
+def _parse_batch_scores(response: str, batch_size: int) -> Dict[int, Dict[str, float]]:
+    """
+    Đọc điểm từng CV từ JSON trả về; bỏ qua các mục sai định dạng
+    """
+    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if not json_match:
+        return {}
+    try:
+        results = json.loads(json_match.group()).get("results", [])
+    except (json.JSONDecodeError, AttributeError):
+        return {}
+
+    parsed = {}
+    for item in results if isinstance(results, list) else []:
+        try:
+            cv_id = int(item["id"])
+            skills_score = min(max(float(item["skills_score"]), 0.0), 5.0)
+            projects_score = min(max(float(item["projects_score"]), 0.0), 5.0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= cv_id < batch_size:
+            parsed[cv_id] = {"skills_score": skills_score, "projects_score": projects_score}
+    return parsed
+
+
+def score_cv_batch(batch: List[Tuple[str, str]], job_requirements: Dict[str, List[str]], llm) -> List[Dict[str, float]]:
+    """
+    Chấm điểm nhiều CV trong một request (JSON có cấu trúc).
+    `batch` là danh sách (skills_section, projects_section) của từng CV.
+    CV nào không đọc được điểm từ kết quả sẽ được chấm lại riêng lẻ.
+    """
+    required_skills = job_requirements.get("skills", [])
+    required_project_types = job_requirements.get("projects_related", [])
+
+    cvs_text = "\n\n".join(
+        f"### CV id={i}\nCV Skills: {skills_section or '(không có)'}\nCV Projects: {projects_section or '(không có)'}"
+        for i, (skills_section, projects_section) in enumerate(batch)
+    )
+    batch_prompt = PromptTemplate(
+        input_variables=["cvs", "required_skills", "required_project_types"],
+        template=(
+            "Chấm điểm từng CV dưới đây theo yêu cầu công việc:\n"
+            "Required Skills: {required_skills}\n"
+            "Required Project Types: {required_project_types}\n\n"
+            "{cvs}\n\n"
+            "Quy tắc:\n"
+            "- skills_score: đếm số skills trong CV phù hợp với yêu cầu (mỗi skill = 1 điểm, tối đa 5 điểm).\n"
+            "- projects_score: đánh giá độ liên quan của projects (mỗi project liên quan = 2 điểm, tối đa 5 điểm).\n"
+            "Trả về JSON với format: {{\"results\": [{{\"id\": 0, \"skills_score\": 0, \"projects_score\": 0}}, ...]}}\n"
+            "Chỉ trả về JSON, không có text khác."
+        )
+    )
+
+    chain = batch_prompt | llm
+    response = chain.invoke({
+        "cvs": cvs_text,
+        "required_skills": ", ".join(required_skills),
+        "required_project_types": ", ".join(required_project_types)
+    }, config={"callbacks": llm_callbacks("llm_batch")})
+    parsed = _parse_batch_scores(response, len(batch))
+
+    results = []
+    for i, (skills_section, projects_section) in enumerate(batch):
+        if i in parsed:
+            # Giữ quy tắc như chấm riêng lẻ: mục trống thì 0 điểm
+            skills_score = parsed[i]["skills_score"] if skills_section and required_skills else 0
+            projects_score = parsed[i]["projects_score"] if projects_section and required_project_types else 0
+        else:
+            skills_score = score_skills(skills_section, required_skills, llm)
+            projects_score = score_projects(projects_section, required_project_types, llm)
+        results.append({
+            "skills_score": skills_score,
+            "projects_score": projects_score,
+            "total_score": skills_score + projects_score
+        })
+    return results
+
+
+def _rank_key(cv: Dict) -> Tuple[float, float]:
+    return -cv["total_score"], -cv.get("tiebreak_score", 0)
 
 
 def rank_cvs(cv_scores: List[Dict]) -> List[Dict]:
     """
-    Xếp hạng CV từ cao xuống thấp
+    Xếp hạng CV từ cao xuống thấp (CV đồng điểm giữ thứ tự ban đầu)
+    """
+    return sorted(cv_scores, key=_rank_key)
+
+
+def break_ties_with_llm(
+    cv_scores: List[Dict],
+    skills_sections: Dict[str, str],
+    required_skills: List[str],
+    llm,
+    top_n: int = SKILL_TIEBREAK_TOP_N,
+) -> int:
+    """
+    Phân định các CV đồng tổng điểm trong top `top_n` bằng điểm skills do LLM chấm
+    (lưu vào "tiebreak_score"). `skills_sections` là file_name -> mục skills.
+    Trả về số CV đã gọi LLM.
+    """
+    ranked = rank_cvs(cv_scores)
+    top_scores = {cv["total_score"] for cv in ranked[:top_n]}
+    groups: Dict[float, List[Dict]] = {}
+    for cv in ranked:
+        if cv["total_score"] in top_scores:
+            groups.setdefault(cv["total_score"], []).append(cv)
+
+    called = 0
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        for cv in group:
+            cv["tiebreak_score"] = score_skills(skills_sections.get(cv["file_name"], ""), required_skills, llm)
+            called += 1
+    return called
+
+
+def build_ranking_table(ranked_cvs: List[Dict]) -> pd.DataFrame:
+    """
+    Tạo bảng tổng kết từ danh sách CV đã xếp hạng
+    """
+    df_data = []
+    for i, cv in enumerate(ranked_cvs):
+        row = {
+            "Hạng": i+1,
+            "Tên ứng viên": cv['applicant_name'],
+            "Skills (5đ)": cv['skills_score'],
+            "Projects (5đ)": cv['projects_score'],
+            "Tổng điểm": cv['total_score'],
+            "File": cv['file_name']
+        }
+        if "matched_skills" in cv:
+            row["Skills khớp"] = ", ".join(cv["matched_skills"])
+        if cv.get("duplicate_of"):
+            row["Gần trùng với"] = cv["duplicate_of"]
+        df_data.append(row)
+    
+    return pd.DataFrame(df_data)
+
+
+def duplicate_groups(cv_scores: List[Dict]) -> List[Tuple[str, List[Dict]]]:
+    """
+    Các nhóm CV gần trùng trong kết quả chấm: (file đại diện, [{"file_name", "similarity"}])
     """
-    return sorted(cv_scores, key=lambda x: x["total_score"], reverse=True)
+    groups: Dict[str, List[Dict]] = {}
+    for cv in cv_scores:
+        if cv.get("duplicate_of"):
+            groups.setdefault(cv["duplicate_of"], []).append(
+                {"file_name": cv["file_name"], "similarity": cv.get("duplicate_similarity")}
+            )
+    return list(groups.items())
+
+
+def render_duplicate_groups(groups: List[Tuple[str, List[Dict]]]):
+    """Hiển thị các nhóm CV gần trùng: chỉ CV đại diện được index / chấm điểm, các CV còn lại dùng lại kết quả"""
+    if not groups:
+        return
+    with st.expander(f"CV gần trùng ({len(groups)} nhóm, {sum(len(members) for _, members in groups)} CV không xử lý lại)"):
+        for representative, members in groups:
+            st.write(
+                f"**{representative}** (đại diện): " + ", ".join(
+                    f"{member['file_name']}" + (f" ({member['similarity']:.0%})" if member.get("similarity") else "")
+                    for member in members
+                )
+            )
+
+
+def read_uploaded_files(pdfs) -> List[Tuple[str, bytes]]:
+    """Đọc nội dung các file đã upload: [(tên file, bytes)]"""
+    files = []
+    for i, pdf in enumerate(pdfs):
+        if pdf is not None:
+            file_name = pdf.name if hasattr(pdf, "name") else f"CV_{i+1}"
+            files.append((file_name, pdf.read()))
+            pdf.seek(0)
+    return files
+
+
+def build_score_matrix_table(cvs: List[Dict], job_names: List[str], scores) -> pd.DataFrame:
+    """
+    Bảng điểm ứng viên x vị trí kèm vị trí phù hợp nhất của từng ứng viên
+    """
+    df = pd.DataFrame(scores.T, columns=job_names)
+    df.insert(0, "Tên ứng viên", [cv["applicant_name"] for cv in cvs])
+    df["Phù hợp nhất"] = [job_names[j] for j in scores.argmax(axis=0)] if len(job_names) else []
+    df["Điểm cao nhất"] = scores.max(axis=0) if len(job_names) else []
+    df["File"] = [cv["file_name"] for cv in cvs]
+    return df.sort_values("Điểm cao nhất", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def process_cvs_for_multi_job_scoring(pdfs):
+    """Chấm điểm các CV theo nhiều vị trí tuyển dụng cùng lúc"""
+    st.subheader("Các vị trí tuyển dụng")
+    job_count = int(st.number_input("Số vị trí", min_value=2, max_value=10, value=2, step=1))
+    job_descriptions = []
+    for j in range(job_count):
+        with st.expander(f"Vị trí {j + 1}", expanded=True):
+            name = st.text_input("Tên vị trí", value=f"Vị trí {j + 1}", key=f"job_name_{j}")
+            description = st.text_area("Mô tả công việc", height=150, key=f"job_description_{j}")
+            if description.strip():
+                job_descriptions.append((name, description))
+    
+    if len(job_descriptions) < 2:
+        st.warning("Vui lòng nhập mô tả cho ít nhất 2 vị trí")
+        return
+    
+    batch_mode = st.checkbox(
+        "Chấm điểm theo lô (gom nhiều CV vào một request, giảm số lần gọi LLM)",
+        value=len(pdfs) > SCORING_BATCH_MAX_SIZE, key="multi_batch_mode"
+    )
+    local_skills = st.checkbox(
+        "Chấm skills bằng từ điển (nhanh, cho kết quả ổn định, liệt kê skill khớp)",
+        value=LOCAL_SKILL_MATCHING, key="multi_local_skills"
+    )
+    
+    if st.button("Chấm điểm CV theo các vị trí", type="primary"):
+        with st.spinner("Đang phân tích các vị trí và chấm điểm CV..."):
+            from scoring_engine import score_cvs_against_jobs
+
+            llm = create_scoring_llm()
+            result_cache = get_result_cache()
+            job_names = [name for name, _ in job_descriptions]
+            jobs = [analyze_job_requirements(description, llm, result_cache) for _, description in job_descriptions]
+            
+            cvs, scores, details = score_cvs_against_jobs(
+                read_uploaded_files(pdfs), jobs, llm,
+                batch_token_budget=SCORING_BATCH_TOKEN_BUDGET if batch_mode else None,
+                result_cache=result_cache, local_skills=local_skills
+            )
+            cache_stats = result_cache.stats()
+            st.caption(
+                f"{len(jobs)} vị trí x {len(cvs)} CV, "
+                f"cache kết quả: {cache_stats['hits']} hit / {cache_stats['misses']} miss"
+            )
+        
+        st.subheader("Vị trí phù hợp nhất của từng ứng viên:")
+        st.dataframe(build_score_matrix_table(cvs, job_names, scores), use_container_width=True)
+        
+        if details:
+            render_duplicate_groups(duplicate_groups(details[0]))
+        
+        st.subheader("Xếp hạng theo từng vị trí:")
+        for tab, job_name, job_requirements, job_rows in zip(st.tabs(job_names), job_names, jobs, details):
+            with tab:
+                st.write(f"**Skills cần thiết:** {', '.join(job_requirements.get('skills', []))}")
+                st.write(f"**Loại project liên quan:** {', '.join(job_requirements.get('projects_related', []))}")
+                st.dataframe(build_ranking_table(rank_cvs(job_rows)), use_container_width=True)
+
+
+def process_cvs_for_scoring_remote(pdfs):
+    """Chấm điểm CV qua API service (API_URL)"""
+    from api_client import get_api_client
+
+    st.subheader("Yêu cầu công việc")
+    job_description = st.text_area(
+        "Nhập mô tả công việc (bao gồm yêu cầu ứng viên và kỹ năng cần thiết):", height=200
+    )
+    if not job_description.strip():
+        st.warning("Vui lòng nhập yêu cầu công việc để chấm điểm CV")
+        return
+
+    batch_mode = st.checkbox(
+        "Chấm điểm theo lô (gom nhiều CV vào một request, giảm số lần gọi LLM)",
+        value=len(pdfs) > SCORING_BATCH_MAX_SIZE
+    )
+    local_skills = st.checkbox(
+        "Chấm skills bằng từ điển (nhanh, cho kết quả ổn định, liệt kê skill khớp)",
+        value=LOCAL_SKILL_MATCHING
+    )
+
+    if st.button("Chấm điểm CV", type="primary"):
+        with st.spinner("Đang chấm điểm CV trên API service..."):
+            result = get_api_client().score(read_uploaded_files(pdfs), job_description, batch_mode, local_skills)
+
+        job_requirements = result["job_requirements"]
+        st.write(f"**Skills cần thiết:** {', '.join(job_requirements.get('skills', []))}")
+        st.write(f"**Loại project liên quan:** {', '.join(job_requirements.get('projects_related', []))}")
+        st.subheader("Bảng tổng kết:")
+        st.dataframe(build_ranking_table(result["results"]), use_container_width=True)
+        render_duplicate_groups(duplicate_groups(result["results"]))
 
 
 def process_cvs_for_scoring(pdfs):
-    """Xử lý CV cho tính năng chấm điểm"""
+    """Xử lý CV cho tính năng chấm điểm (kèm bảng thời gian xử lý theo bước)"""
+    with record_action() as recorder:
+        _process_cvs_for_scoring(pdfs)
+    render_timing_panel(recorder)
+
+
+def _process_cvs_for_scoring(pdfs):
+    mode = st.radio("Chế độ", ["Một vị trí", "Nhiều vị trí"], horizontal=True)
+    if mode == "Nhiều vị trí":
+        process_cvs_for_multi_job_scoring(pdfs)
+        return
+    
     # Nhập yêu cầu công việc
     st.subheader("Yêu cầu công việc")
     job_description = st.text_area(
@@ -138,12 +607,40 @@ def process_cvs_for_scoring(pdfs):
         st.warning("Vui lòng nhập yêu cầu công việc để chấm điểm CV")
         return
     
+    batch_mode = st.checkbox(
+        "Chấm điểm theo lô (gom nhiều CV vào một request, giảm số lần gọi LLM)",
+        value=len(pdfs) > SCORING_BATCH_MAX_SIZE
+    )
+    
+    local_skills = st.checkbox(
+        "Chấm skills bằng từ điển (nhanh, cho kết quả ổn định, liệt kê skill khớp)",
+        value=LOCAL_SKILL_MATCHING
+    )
+    tiebreak = local_skills and st.checkbox(
+        f"Dùng LLM phân định các CV đồng điểm trong top {SKILL_TIEBREAK_TOP_N}", value=False
+    )
+    
+    prescreen = st.checkbox(
+        "Sàng lọc bằng embedding trước (chỉ chấm bằng LLM các CV giống yêu cầu nhất)",
+        value=len(pdfs) > PRESCREEN_TOP_K
+    )
+    prescreen_top_k = PRESCREEN_TOP_K
+    if prescreen:
+        prescreen_top_k = int(st.number_input(
+            "Số CV chấm tiếp bằng LLM", min_value=1, value=min(PRESCREEN_TOP_K, len(pdfs)), step=1
+        ))
+    
+    if st.button("Xoá cache kết quả chấm điểm"):
+        get_result_cache().clear()
+        st.info("Đã xoá cache, lần chấm tiếp theo sẽ gọi lại LLM")
+    
     if st.button("Chấm điểm CV", type="primary"):
         with st.spinner("Đang phân tích yêu cầu công việc và chấm điểm CV..."):
-            llm = OpenAI(model="gpt-4o-mini", temperature=0)
+            llm = create_scoring_llm()
+            result_cache = get_result_cache()
             
-            # Phân tích yêu cầu công việc
-            job_requirements = analyze_job_requirements(job_description, llm)
+            # Phân tích yêu cầu công việc (dùng lại kết quả nếu mô tả không đổi)
+            job_requirements = analyze_job_requirements(job_description, llm, result_cache)
             
             st.subheader("Yêu cầu đã phân tích:")
             col1, col2 = st.columns(2)
@@ -156,36 +653,73 @@ def process_cvs_for_scoring(pdfs):
                 for project_type in job_requirements.get("projects_related", []):
                     st.write(f"- {project_type}")
             
-            # Xử lý từng CV
+            # Chấm điểm song song, bảng xếp hạng được cập nhật khi từng CV chấm xong
+            # (import trong hàm để tránh import vòng với scoring_engine)
+            from scoring_engine import score_cvs_concurrently
+
+            files = read_uploaded_files(pdfs)
+
+            # Sàng lọc: một phép nhân ma trận embedding cho mọi CV, chỉ CV tốt nhất được chấm bằng LLM
+            screened_out = []
+            if prescreen:
+                parsed_cvs = dict(parse_pdf_files(files))
+                with trace("prescreening", cvs=len(files)):
+                    similarities = screening_scores(
+                        [extract_scoring_sections(parsed_cvs[i]["sections"]) for i in range(len(files))],
+                        job_requirements, get_embeddings()
+                    )
+                selected = set(select_candidates(similarities, prescreen_top_k, PRESCREEN_MIN_SIMILARITY))
+                screened_out = sorted(
+                    (
+                        {
+                            "Tên ứng viên": parsed_cvs[i]["applicant_name"] or parsed_cvs[i]["file_name"],
+                            "Độ tương đồng": round(float(similarities[i]), 3),
+                            "File": parsed_cvs[i]["file_name"],
+                        }
+                        for i in range(len(files)) if i not in selected
+                    ),
+                    key=lambda row: row["Độ tương đồng"], reverse=True
+                )
+                files = [files[i] for i in sorted(selected)]
+                st.caption(f"Sàng lọc: chấm bằng LLM {len(files)}/{len(files) + len(screened_out)} CV")
+
+            progress = st.progress(0.0, text="Đang chấm điểm CV...")
+            live_table = st.empty()
             cv_scores = []
+            # Giữ danh sách đã xếp hạng (chèn theo thứ tự), bảng tạm chỉ vẽ top N và
+            # tối đa một lần mỗi SCORING_LIVE_REFRESH_SECONDS thay vì sau mỗi CV
+            live_ranked = []
+            last_refresh = 0.0
             
-            for i, pdf in enumerate(pdfs):
-                if pdf is not None:
-                    file_name = pdf.name if hasattr(pdf, "name") else f"CV_{i+1}"
-                    
-                    # Đọc CV
-                    with fitz.open(stream=pdf.read(), filetype="pdf") as doc_fitz:
-                        full_text = ""
-                        for page in doc_fitz:
-                            page_text = page.get_text("text") or ""
-                            full_text += page_text + "\n"
-                    
-                    full_text = clean_pdf_text(full_text)
-                    sections = split_cv_sections(full_text)
-                    
-                    # Chấm điểm CV
-                    scores = score_cv_against_requirements(sections, job_requirements, llm)
-                    
-                    # Lấy tên ứng viên (dòng đầu tiên)
-                    applicant_name = full_text.strip().split("\n")[0] if full_text.strip() else file_name
-                    
-                    cv_scores.append({
-                        "applicant_name": applicant_name,
-                        "file_name": file_name,
-                        "skills_score": scores["skills_score"],
-                        "projects_score": scores["projects_score"],
-                        "total_score": scores["total_score"]
-                    })
+            batch_token_budget = SCORING_BATCH_TOKEN_BUDGET if batch_mode else None
+            skill_matcher = SkillMatcher(job_requirements.get("skills", [])) if local_skills else None
+            for scores in score_cvs_concurrently(
+                files, job_requirements, llm,
+                batch_token_budget=batch_token_budget, result_cache=result_cache,
+                skill_matcher=skill_matcher
+            ):
+                cv_scores.append(scores)
+                bisect.insort(live_ranked, scores, key=_rank_key)
+                now = time.monotonic()
+                if now - last_refresh >= SCORING_LIVE_REFRESH_SECONDS or len(cv_scores) == len(files):
+                    last_refresh = now
+                    progress.progress(len(cv_scores) / len(files), text=f"Đã chấm {len(cv_scores)}/{len(files)} CV")
+                    live_table.dataframe(
+                        build_ranking_table(live_ranked[:SCORING_LIVE_TABLE_ROWS]), use_container_width=True
+                    )
+
+            progress.empty()
+            live_table.empty()
+            cache_stats = result_cache.stats()
+            st.caption(f"Cache kết quả: {cache_stats['hits']} hit / {cache_stats['misses']} miss")
+            
+            if tiebreak:
+                skills_sections = {
+                    parsed["file_name"]: extract_scoring_sections(parsed["sections"])[0]
+                    for _, parsed in parse_pdf_files(files)
+                }
+                called = break_ties_with_llm(cv_scores, skills_sections, job_requirements.get("skills", []), llm)
+                st.caption(f"Phân định đồng điểm: gọi LLM cho {called} CV")
             
             # Xếp hạng CV
             ranked_cvs = rank_cvs(cv_scores)
@@ -204,20 +738,16 @@ def process_cvs_for_scoring(pdfs):
                         st.metric("Tổng điểm", f"{cv['total_score']}/10")
                     
                     st.write(f"**File:** {cv['file_name']}")
+                    if "matched_skills" in cv:
+                        st.write(f"**Skills khớp:** {', '.join(cv['matched_skills']) or '(không có)'}")
             
             # Tạo bảng tổng kết
             st.subheader("Bảng tổng kết:")
             
-            df_data = []
-            for i, cv in enumerate(ranked_cvs):
-                df_data.append({
-                    "Hạng": i+1,
-                    "Tên ứng viên": cv['applicant_name'],
-                    "Skills (5đ)": cv['skills_score'],
-                    "Projects (5đ)": cv['projects_score'],
-                    "Tổng điểm": cv['total_score'],
-                    "File": cv['file_name']
-                })
-            
-            df = pd.DataFrame(df_data)
+            df = build_ranking_table(ranked_cvs)
             st.dataframe(df, use_container_width=True)
+            render_duplicate_groups(duplicate_groups(ranked_cvs))
+            
+            if screened_out:
+                with st.expander(f"CV bị loại ở vòng sàng lọc ({len(screened_out)})"):
+                    st.dataframe(pd.DataFrame(screened_out), use_container_width=True)
@@ -0,0 +1,106 @@
+"""
+Các backend embedding: OpenAI, sentence-transformers chạy local trên CPU, hashing (kiểm thử)
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from config import (
+    EMBEDDING_BACKEND, EMBEDDING_MODEL, LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_DEVICE, LOCAL_EMBEDDING_BATCH_SIZE, HASHING_EMBEDDING_DIM
+)
+
+
+@lru_cache(maxsize=None)
+def load_sentence_transformer(model_name: str, device: str):
+    """
+    Nạp model sentence-transformers một lần cho cả process
+    (import muộn vì thư viện nặng, chỉ cần khi dùng backend local)
+    """
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Embedding local bằng sentence-transformers (không cần mạng).
+    Các chunk được sắp xếp theo độ dài trước khi chia batch để giảm padding.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", batch_size: int = 64):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+
+    @property
+    def model(self):
+        return load_sentence_transformer(self.model_name, self.device)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        for start in range(0, len(order), self.batch_size):
+            batch_ids = order[start:start + self.batch_size]
+            vectors[batch_ids] = self.model.encode(
+                [texts[i] for i in batch_ids],
+                batch_size=len(batch_ids),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embedding xác định (deterministic) bằng hashing trick trên các từ.
+    Rất nhanh, không cần model; dùng cho kiểm thử và benchmark offline.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def create_embedding_backend(backend: str = EMBEDDING_BACKEND) -> Tuple[Embeddings, str]:
+    """
+    Tạo backend embedding theo cấu hình.
+    Trả về (embeddings, tên model) - tên model dùng để phân biệt cache embedding.
+    """
+    if backend == "openai":
+        from llm_clients import create_openai_embeddings
+        return create_openai_embeddings(), EMBEDDING_MODEL
+    if backend == "sentence-transformers":
+        embeddings = SentenceTransformerEmbeddings(
+            LOCAL_EMBEDDING_MODEL, device=LOCAL_EMBEDDING_DEVICE, batch_size=LOCAL_EMBEDDING_BATCH_SIZE
+        )
+        return embeddings, LOCAL_EMBEDDING_MODEL
+    if backend == "hashing":
+        return HashingEmbeddings(HASHING_EMBEDDING_DIM), f"hashing-{HASHING_EMBEDDING_DIM}"
+    raise ValueError(f"Embedding backend không hợp lệ: {backend}")
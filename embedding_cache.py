@@ -0,0 +1,348 @@
+"""
+Cache embedding trên đĩa theo nội dung chunk (content-addressed)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from config import EMBEDDING_CACHE_FLUSH_ENTRIES, EMBEDDING_CACHE_FLUSH_SECONDS
+from metrics import count_cache, trace
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có flock, chỉ an toàn khi một process ghi cache
+    fcntl = None
+
+INDEX_FILE = "index.json"
+VECTORS_FILE = "vectors.f32"
+LOCK_FILE = "index.lock"
+CACHE_FORMAT_VERSION = 1
+QUERY_CACHE_ENTRIES = 256  # số câu hỏi gần nhất giữ vector trong bộ nhớ
+
+
+def make_cache_key(text: str, model_name: str) -> str:
+    """
+    Tạo key cho cache từ hash(nội dung chunk + tên model embedding)
+    """
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Khoá giữa các process (flock trên file `path`): độc quyền để ghi,
+    `shared=True` cho nhiều process cùng đọc
+    """
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    """
+    Lưu vector của các chunk trong một ma trận float32 memory-mapped
+    kèm file index (key -> dòng trong ma trận).
+
+    Khi số entry vượt quá `max_entries`, entry ít được dùng gần đây nhất
+    sẽ bị loại bỏ (LRU) và dòng của nó được dùng lại.
+
+    Nhiều process có thể dùng chung một thư mục cache: vector mới được giữ
+    trong bộ nhớ và ghi xuống đĩa theo đợt (đủ `flush_entries` vector hoặc sau
+    `flush_seconds` giây, và khi process kết thúc). Mỗi đợt ghi giữ file lock,
+    nạp lại index nếu process khác đã ghi, rồi thay index.json bằng rename nguyên tử.
+    Đọc vector giữ file lock dùng chung, nên một slot không bị process khác
+    loại bỏ và ghi vector khác vào giữa lúc đang đọc.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int,
+        flush_entries: int = EMBEDDING_CACHE_FLUSH_ENTRIES,
+        flush_seconds: float = EMBEDDING_CACHE_FLUSH_SECONDS,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.flush_entries = flush_entries
+        self.flush_seconds = flush_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> slot, cũ nhất ở đầu
+        self._free_slots: List[int] = []
+        self._dim: Optional[int] = None
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._pending: "OrderedDict[str, np.ndarray]" = OrderedDict()  # vector chưa ghi xuống đĩa
+        self._touched: set = set()  # key được dùng từ lần ghi trước (giữ thứ tự LRU khi nạp lại)
+        self._index_stamp: Optional[Tuple[int, int]] = None
+        self._last_flush = time.monotonic()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with file_lock(self._lock_path):
+            self._load()
+        atexit.register(self.flush)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.cache_dir, VECTORS_FILE)
+
+    @property
+    def _lock_path(self) -> str:
+        return os.path.join(self.cache_dir, LOCK_FILE)
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        """Dấu thời gian / kích thước index.json để biết process khác đã ghi hay chưa"""
+        try:
+            stat = os.stat(self._index_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        """Đọc index và mở ma trận vector (nếu cache đã tồn tại); gọi khi đang giữ file lock"""
+        self._index_stamp = self._stamp()
+        if self._index_stamp is None or not os.path.exists(self._vectors_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if index.get("version") != CACHE_FORMAT_VERSION:
+            return
+
+        self._dim = index["dim"]
+        self._capacity = index["capacity"]
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+",
+            shape=(self._capacity, self._dim)
+        )
+        self._entries = OrderedDict((key, slot) for key, slot in index["entries"])
+        for key in self._touched:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        used = set(self._entries.values())
+        self._free_slots = [slot for slot in range(self._capacity) if slot not in used]
+
+        # max_entries có thể đã bị giảm trong config
+        while len(self._entries) > self.max_entries:
+            self._evict_one()
+
+    def _grow(self, min_capacity: int):
+        """Mở rộng file vector (gấp đôi, không vượt quá max_entries)"""
+        new_capacity = min(max(min_capacity, self._capacity * 2, 1024), self.max_entries)
+        if new_capacity <= self._capacity:
+            return
+
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+",
+            shape=(new_capacity, self._dim)
+        )
+        self._free_slots.extend(range(self._capacity, new_capacity))
+        self._capacity = new_capacity
+
+    def _evict_one(self):
+        _, slot = self._entries.popitem(last=False)
+        self._free_slots.append(slot)
+        self.evictions += 1
+
+    def _allocate_slot(self) -> int:
+        if not self._free_slots:
+            if self._capacity < self.max_entries:
+                self._grow(self._capacity + 1)
+            else:
+                self._evict_one()
+        return self._free_slots.pop()
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Tra cứu vector theo key. Trả về None cho những key chưa có trong cache
+        """
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            with file_lock(self._lock_path, shared=True):
+                if self._stamp() != self._index_stamp:
+                    # Process khác đã ghi thêm vector: nạp lại index để dùng được
+                    self._load()
+                for key in keys:
+                    pending = self._pending.get(key)
+                    slot = self._entries.get(key)
+                    if pending is not None:
+                        self.hits += 1
+                        results.append(pending.copy())
+                    elif slot is None:
+                        self.misses += 1
+                        results.append(None)
+                    else:
+                        self.hits += 1
+                        self._entries.move_to_end(key)
+                        self._touched.add(key)
+                        results.append(np.array(self._vectors[slot]))
+            count_cache("embedding", hits=self.hits - hits, misses=self.misses - misses)
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]):
+        """
+        Thêm các vector mới vào cache; ghi xuống đĩa khi đủ đợt (xem `flush`)
+        """
+        if not keys:
+            return
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._pending[key] = np.asarray(vector, dtype=np.float32)
+            if (len(self._pending) >= self.flush_entries
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self._flush()
+
+    def flush(self):
+        """Ghi các vector chưa lưu xuống đĩa"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        with file_lock(self._lock_path):
+            if self._stamp() != self._index_stamp:
+                self._load()
+            if self._dim is None:
+                self._dim = len(next(iter(self._pending.values())))
+                # Bắt đầu file mới, tránh dính dữ liệu cũ không khớp index
+                if os.path.exists(self._vectors_path):
+                    os.remove(self._vectors_path)
+            for key, vector in self._pending.items():
+                slot = self._entries.get(key)
+                if slot is None:
+                    slot = self._allocate_slot()
+                self._vectors[slot] = vector
+                self._entries[key] = slot
+                self._entries.move_to_end(key)
+            self._vectors.flush()
+
+            index = {
+                "version": CACHE_FORMAT_VERSION,
+                "dim": self._dim,
+                "capacity": self._capacity,
+                "entries": list(self._entries.items()),
+            }
+            tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path)
+            self._index_stamp = self._stamp()
+        self._pending.clear()
+        self._touched.clear()
+
+    def stats(self) -> dict:
+        """Thống kê hit/miss của cache"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries) + len(self._pending),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Bọc một Embeddings bất kỳ: chỉ gửi những chunk chưa từng thấy tới embedder.
+    Vector của các câu hỏi gần nhất được giữ trong bộ nhớ để một câu hỏi chỉ
+    embed một lần (dùng cho cả cache câu trả lời và truy xuất).
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queries_lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [make_cache_key(text, self.model_name) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Gom các chunk chưa có trong cache (bỏ trùng lặp)
+        missing = {}
+        for key, text, vector in zip(keys, texts, cached):
+            if vector is None and key not in missing:
+                missing[key] = text
+
+        new_vectors = {}
+        if missing:
+            with trace("embed_documents", texts=len(missing), cached=len(texts) - len(missing)):
+                vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(list(new_vectors.keys()), list(new_vectors.values()))
+
+        return [
+            vector.tolist() if vector is not None else list(new_vectors[key])
+            for key, vector in zip(keys, cached)
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                return vector
+
+        with trace("embed_query"):
+            vector = self.embeddings.embed_query(text)
+        self._remember_queries({text: vector})
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed nhiều câu hỏi trong một lần gọi embedder (các câu đã có trong bộ nhớ thì dùng lại)
+        """
+        vectors = {}
+        with self._queries_lock:
+            for text in texts:
+                if text in self._queries:
+                    self._queries.move_to_end(text)
+                    vectors[text] = self._queries[text]
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+        if missing:
+            with trace("embed_query", texts=len(missing)):
+                new_vectors = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self._remember_queries(new_vectors)
+            vectors.update(new_vectors)
+        return [vectors[text] for text in texts]
+
+    def _remember_queries(self, vectors: dict):
+        with self._queries_lock:
+            for text, vector in vectors.items():
+                self._queries[text] = vector
+            while len(self._queries) > QUERY_CACHE_ENTRIES:
+                self._queries.popitem(last=False)
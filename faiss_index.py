@@ -0,0 +1,164 @@
+"""
+Các kiểu index FAISS cho vector chunk: flat (chính xác), HNSW, IVF-Flat,
+IVF-PQ và IVF-SQ8 (xấp xỉ / nén). Index xấp xỉ chỉ được dựng khi đủ nhiều
+vector để train; dưới ngưỡng đó flat vừa chính xác vừa đủ nhanh.
+"""
+
+import math
+from typing import Optional, Sequence, Tuple
+import faiss
+import numpy as np
+from config import (
+    FAISS_INDEX_TYPE, FAISS_ANN_MIN_VECTORS, FAISS_IVF_NLIST, FAISS_IVF_NPROBE,
+    FAISS_HNSW_M, FAISS_HNSW_EF_CONSTRUCTION, FAISS_HNSW_EF_SEARCH, FAISS_PQ_M, FAISS_EXACT_FILTER_MAX
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq", "ivf_sq8")
+# Số điểm train tối thiểu cho mỗi cụm (k-means của FAISS cảnh báo nếu ít hơn)
+MIN_POINTS_PER_CENTROID = 39
+
+
+def auto_nlist(count: int) -> int:
+    """Số cụm IVF: ~4*sqrt(số vector), đủ điểm train cho mỗi cụm"""
+    nlist = FAISS_IVF_NLIST or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // MIN_POINTS_PER_CENTROID))
+
+
+def _pq_m(dim: int) -> int:
+    """Số sub-quantizer PQ lớn nhất không vượt FAISS_PQ_M và chia hết số chiều"""
+    return next(m for m in range(min(FAISS_PQ_M, dim), 0, -1) if dim % m == 0)
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Kiểu (trong INDEX_TYPES) của một index FAISS"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_sq8"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def target_index_type(count: int, index_type: str = FAISS_INDEX_TYPE) -> str:
+    """Kiểu index nên dùng cho `count` vector: flat khi chưa đủ FAISS_ANN_MIN_VECTORS"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Kiểu index FAISS không hợp lệ: {index_type}")
+    return index_type if count >= FAISS_ANN_MIN_VECTORS else "flat"
+
+
+def needs_rebuild(index: faiss.Index, index_type: str = FAISS_INDEX_TYPE) -> bool:
+    """
+    Index cần dựng lại khi kiểu hiện tại khác kiểu nên dùng (vượt / tụt dưới ngưỡng,
+    đổi cấu hình) hoặc số vector đã tăng tới mức số cụm IVF nên gấp đôi
+    """
+    current = index_type_of(index)
+    if current != target_index_type(index.ntotal, index_type):
+        return True
+    if current.startswith("ivf"):
+        return auto_nlist(index.ntotal) >= 2 * faiss.extract_index_ivf(index).nlist
+    return False
+
+
+def build_index(vectors: np.ndarray, index_type: str = FAISS_INDEX_TYPE) -> faiss.Index:
+    """
+    Dựng index (L2, như FAISS của LangChain) chứa `vectors` theo thứ tự dòng;
+    train trên chính các vector đó với các kiểu IVF
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    index_type = target_index_type(count, index_type)
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, FAISS_HNSW_M)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+    else:
+        encoding = {"ivf_flat": "Flat", "ivf_pq": f"PQ{_pq_m(dim)}", "ivf_sq8": "SQ8"}[index_type]
+        index = faiss.index_factory(dim, f"IVF{auto_nlist(count)},{encoding}")
+        if index_type == "ivf_pq":
+            # Polysemous training (lọc theo khoảng cách Hamming) không dùng tới mà rất chậm
+            faiss.downcast_index(index).do_polysemous_training = False
+        index.train(vectors)
+    index.add(vectors)
+    prepare_index(index)
+    return index
+
+
+def prepare_index(index: faiss.Index):
+    """Đặt tham số tìm kiếm mặc định và bật direct map của IVF (để lấy lại vector theo vị trí)"""
+    if index_type_of(index).startswith("ivf"):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = FAISS_IVF_NPROBE
+        ivf.make_direct_map()
+    elif index_type_of(index) == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+
+
+def search_parameters(index: faiss.Index, selector=None, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """SearchParameters theo kiểu index (nprobe cho IVF, efSearch cho HNSW), kèm bộ lọc id nếu có"""
+    index_type = index_type_of(index)
+    kwargs = {"sel": selector} if selector is not None else {}
+    if index_type.startswith("ivf"):
+        return faiss.SearchParametersIVF(nprobe=nprobe or FAISS_IVF_NPROBE, **kwargs)
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=ef_search or FAISS_HNSW_EF_SEARCH, **kwargs)
+    return faiss.SearchParameters(**kwargs)
+
+
+def search(
+    index: faiss.Index,
+    query_vectors: np.ndarray,
+    k: int,
+    positions: Optional[np.ndarray] = None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tìm k vector gần nhất, trả về (khoảng cách, vị trí) như `index.search`.
+    Nếu có `positions`, chỉ xét các vị trí đó: với index xấp xỉ và tập nhỏ
+    (<= FAISS_EXACT_FILTER_MAX) tính chính xác trên vector của tập, tập lớn thì
+    lọc bằng IDSelectorBatch và quét mọi cụm IVF để không bỏ sót vector được chọn.
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    index_type = index_type_of(index)
+    if positions is None:
+        return index.search(query_vectors, k, params=search_parameters(index, nprobe=nprobe, ef_search=ef_search))
+
+    k = min(k, len(positions))
+    if index_type != "flat" and len(positions) <= FAISS_EXACT_FILTER_MAX:
+        vectors = index.reconstruct_batch(positions)
+        distances = ((query_vectors[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), positions[order]
+
+    selector = faiss.IDSelectorBatch(positions)
+    if index_type.startswith("ivf"):
+        nprobe = faiss.extract_index_ivf(index).nlist
+    elif index_type == "hnsw":
+        ef_search = max(ef_search or FAISS_HNSW_EF_SEARCH, k)
+    return index.search(query_vectors, k, params=search_parameters(index, selector, nprobe, ef_search))
+
+
+def recall_at_k(exact_positions: np.ndarray, approx_positions: np.ndarray) -> float:
+    """Tỉ lệ trung bình kết quả của index flat (chính xác) cũng có trong kết quả index xấp xỉ"""
+    hits = [
+        len(set(exact[exact >= 0]) & set(approx[approx >= 0])) / max(int((exact >= 0).sum()), 1)
+        for exact, approx in zip(exact_positions, approx_positions)
+    ]
+    return float(np.mean(hits)) if hits else 1.0
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Kích thước index khi serialize (xấp xỉ bộ nhớ chiếm dụng)"""
+    return int(faiss.serialize_index(index).size)
+
+
+def all_vectors(index: faiss.Index, positions: Optional[Sequence[int]] = None) -> np.ndarray:
+    """Lấy lại vector theo vị trí (chính xác với flat / HNSW / IVF-Flat, xấp xỉ với PQ / SQ8)"""
+    if positions is None:
+        return index.reconstruct_n(0, index.ntotal)
+    return index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
@@ -0,0 +1,103 @@
+"""
+LLM và chat model giả lập (không cần mạng) dùng cho kiểm thử và benchmark
+"""
+
+import hashlib
+import json
+import re
+import time
+from typing import Any, Iterator, List, Optional
+from langchain.llms.base import LLM
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeLLM(LLM):
+    """
+    LLM trả lời cố định sau một khoảng trễ giả lập round-trip tới API.
+    - Prompt chấm điểm theo lô: trả về JSON điểm cho từng "CV id=..."
+    - Prompt yêu cầu JSON (phân tích yêu cầu công việc): trả về `job_requirements`
+    - Các prompt khác (chấm điểm): trả về một số 0-5 suy ra từ hash của prompt
+    """
+
+    delay: float = 0.5
+    job_requirements: dict = {
+        "skills": ["python", "pytorch", "sql"],
+        "projects_related": ["machine learning", "chatbot"],
+    }
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-delay"
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> str:
+        time.sleep(self.delay)
+        cv_blocks = re.findall(r"### CV id=(\d+)\nCV Skills: (.*?)\nCV Projects: (.*?)(?=\n\n###|\n\nQuy tắc|\Z)", prompt, re.DOTALL)
+        if cv_blocks:
+            # Điểm mỗi mục chỉ phụ thuộc nội dung mục đó, không phụ thuộc vị trí trong lô
+            return json.dumps({"results": [
+                {"id": int(cv_id), "skills_score": self._score(skills), "projects_score": self._score(projects)}
+                for cv_id, skills, projects in cv_blocks
+            ]})
+        if "JSON" in prompt:
+            return json.dumps(self.job_requirements)
+        return str(self._score(prompt))
+
+    @staticmethod
+    def _score(text: str) -> int:
+        return int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % 6
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model giả lập có streaming: trả về từng token (từ) sau độ trễ
+    `first_token_delay` cho token đầu và `token_delay` cho mỗi token tiếp theo.
+    Câu trả lời là `answer` nếu có, nếu không thì lặp lại đầu tin nhắn cuối cùng.
+    """
+
+    answer: Optional[str] = None
+    first_token_delay: float = 0.3
+    token_delay: float = 0.02
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-stream"
+
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        if self.answer is not None:
+            return self.answer
+        words = str(messages[-1].content).split()
+        return "Trả lời giả lập: " + " ".join(words[:60])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = "".join(chunk.message.content for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(re.findall(r"\S+\s*", self._answer(messages))):
+            if i:
+                time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
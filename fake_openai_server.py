@@ -0,0 +1,161 @@
+"""
+Server giả lập API OpenAI (completions, chat completions có streaming, embeddings)
+để chạy API service / giao diện / benchmark không cần mạng. Trả lời xác định như
+FakeLLM / FakeChatModel, embedding bằng HashingEmbeddings; mỗi request chờ
+`delay` giây như một round-trip tới API thật, bất kể có bao nhiêu prompt.
+
+Chạy: python fake_openai_server.py --port 8001 --delay 0.2
+      OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=test uvicorn api_server:app
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import threading
+import time
+import uuid
+import numpy as np
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from embedding_backends import HashingEmbeddings
+from fake_llm import FakeLLM
+
+EMBEDDING_DIM = 1536
+
+
+class FakeOpenAIState:
+    """Cấu hình độ trễ và bộ đếm request / phần tử (để kiểm tra micro-batching)"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.counts = {"completions": 0, "prompts": 0, "chat": 0, "embeddings": 0, "embedding_inputs": 0}
+        self._lock = threading.Lock()
+        self._llm = FakeLLM(delay=0.0)
+        self._embeddings = HashingEmbeddings(EMBEDDING_DIM)
+
+    def count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.counts[key] += value
+
+    def complete(self, prompt: str) -> str:
+        return self._llm._call(prompt)
+
+    def embed(self, texts):
+        return self._embeddings.embed_documents(texts)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def create_app(delay: float = 0.0) -> Starlette:
+    state = FakeOpenAIState(delay)
+
+    async def completions(request: Request):
+        body = await request.json()
+        prompts = body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+        state.count(completions=1, prompts=len(prompts))
+        await asyncio.sleep(state.delay)
+        texts = [state.complete(prompt) for prompt in prompts]
+        return JSONResponse({
+            "id": f"cmpl-{uuid.uuid4().hex}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {"index": i, "text": text, "finish_reason": "stop", "logprobs": None}
+                for i, text in enumerate(texts)
+            ],
+            "usage": _usage(sum(map(_tokens, prompts)), sum(map(_tokens, texts))),
+        })
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        state.count(chat=1)
+        question = body["messages"][-1]["content"] if body.get("messages") else ""
+        answer = "Trả lời giả lập: " + " ".join(str(question).split()[-40:])
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        await asyncio.sleep(state.delay)
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": _usage(_tokens(json.dumps(body["messages"], ensure_ascii=False)), _tokens(answer)),
+            })
+
+        async def events():
+            words = answer.split(" ")
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(0.005)
+            done = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        # Client có thể gửi token id thay vì text
+        texts = [" ".join(map(str, item)) if isinstance(item, list) else str(item) for item in inputs]
+        state.count(embeddings=1, embedding_inputs=len(texts))
+        await asyncio.sleep(state.delay)
+        vectors = state.embed(texts)
+        if body.get("encoding_format") == "base64":
+            vectors = [base64.b64encode(np.asarray(v, dtype="<f4").tobytes()).decode("ascii") for v in vectors]
+        return JSONResponse({
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": sum(map(_tokens, texts)), "total_tokens": sum(map(_tokens, texts))},
+        })
+
+    async def stats(request: Request):
+        return JSONResponse(state.counts)
+
+    app = Starlette(routes=[
+        Route("/v1/completions", completions, methods=["POST"]),
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/embeddings", embeddings, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
+    ])
+    app.state.fake_openai = state
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Server giả lập API OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.2, help="độ trễ mỗi request (giây)")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.delay), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
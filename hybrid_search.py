@@ -0,0 +1,139 @@
+"""
+Hybrid search: chạy song song vector search (FAISS) và BM25, gộp kết quả
+bằng NumPy theo chunk id (weighted RRF hoặc trộn điểm đã chuẩn hoá)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Collection, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+from config import (
+    VECTOR_RETRIEVER_K, BM25_RETRIEVER_K, HYBRID_WEIGHTS, RRF_C,
+    HYBRID_FUSION, HYBRID_TOP_K, HYBRID_SEARCH_WORKERS, RETRIEVAL_METADATA_FILTER
+)
+from metrics import submit_in_context, traced
+
+# Dùng chung cho mọi phiên: FAISS và phép toán NumPy nhả GIL, embed query chờ mạng
+_executor = ThreadPoolExecutor(max_workers=HYBRID_SEARCH_WORKERS, thread_name_prefix="hybrid-search")
+
+
+def _normalize_scores(scores: np.ndarray) -> np.ndarray:
+    """Min-max về [0, 1]; danh sách có mọi điểm bằng nhau nhận điểm 1"""
+    low, high = scores.min(), scores.max()
+    if high - low <= 1e-12:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def fuse_results(
+    result_lists: Sequence[List[Tuple[str, float]]],
+    weights: Sequence[float],
+    method: str = HYBRID_FUSION,
+    higher_is_better: Optional[Sequence[bool]] = None,
+    c: float = RRF_C,
+) -> List[Tuple[str, float]]:
+    """
+    Gộp nhiều danh sách (chunk id, điểm) đã xếp hạng thành một danh sách duy nhất.
+        method="rrf":   điểm = sum(trọng số / (c + hạng))
+        method="score": điểm = sum(trọng số * điểm đã chuẩn hoá min-max)
+    `higher_is_better[i] = False` nếu danh sách thứ i là khoảng cách (vd. L2 của FAISS).
+    Chunk xuất hiện ở nhiều danh sách được cộng dồn; cùng điểm thì giữ thứ tự xuất hiện đầu tiên.
+    """
+    if higher_is_better is None:
+        higher_is_better = [True] * len(result_lists)
+
+    ids, contributions = [], []
+    for weight, results, higher in zip(weights, result_lists, higher_is_better):
+        if not results:
+            continue
+        ids.extend(chunk_id for chunk_id, _ in results)
+        if method == "rrf":
+            contributions.append(weight / (c + np.arange(1, len(results) + 1, dtype=np.float64)))
+        elif method == "score":
+            scores = np.fromiter((score for _, score in results), dtype=np.float64, count=len(results))
+            contributions.append(weight * _normalize_scores(scores if higher else -scores))
+        else:
+            raise ValueError(f"Phương pháp gộp không hợp lệ: {method}")
+    if not ids:
+        return []
+
+    unique_ids, inverse = np.unique(np.asarray(ids, dtype=object), return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate(contributions), minlength=len(unique_ids))
+    first_seen = np.full(len(unique_ids), len(ids), dtype=np.int64)
+    np.minimum.at(first_seen, inverse, np.arange(len(ids)))
+    order = np.lexsort((first_seen, -fused))
+    return [(unique_ids[i], float(fused[i])) for i in order]
+
+
+class HybridSearchEngine:
+    """
+    Hybrid search trên một CVIndexManager (dùng `vector_search`, `bm25_search`,
+    `metadata_index` và `chunks` của nó).
+    """
+
+    def __init__(
+        self,
+        manager: Any,
+        vector_k: int = VECTOR_RETRIEVER_K,
+        bm25_k: int = BM25_RETRIEVER_K,
+        weights: Sequence[float] = HYBRID_WEIGHTS,
+        method: str = HYBRID_FUSION,
+        top_k: int = HYBRID_TOP_K,
+        metadata_filter: bool = RETRIEVAL_METADATA_FILTER,
+    ):
+        self.manager = manager
+        self.vector_k = vector_k
+        self.bm25_k = bm25_k
+        self.weights = list(weights)
+        self.method = method
+        self.top_k = top_k
+        self.metadata_filter = metadata_filter
+
+    @traced("retrieval")
+    def search(self, query: str, chunk_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Trả về tối đa `top_k` (chunk id, điểm gộp), đã bỏ các chunk trùng nội dung.
+        Nếu bật lọc metadata và không truyền `chunk_ids`, phạm vi tìm kiếm được
+        suy ra từ câu hỏi (ứng viên / file / mục CV).
+        """
+        if chunk_ids is None and self.metadata_filter:
+            chunk_ids = self.manager.metadata_index.resolve(query)
+
+        vector_future = submit_in_context(_executor, self.manager.vector_search, query, self.vector_k, chunk_ids)
+        bm25_results = self.manager.bm25_search(query, self.bm25_k, chunk_ids)
+        vector_results = vector_future.result()
+
+        fused = fuse_results(
+            [vector_results, bm25_results], self.weights, self.method, higher_is_better=[False, True]
+        )
+
+        results, seen_contents = [], set()
+        for chunk_id, score in fused:
+            content = self.manager.chunks[chunk_id].page_content
+            if content in seen_contents:
+                continue
+            seen_contents.add(content)
+            results.append((chunk_id, score))
+            if len(results) >= self.top_k:
+                break
+        return results
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever dùng HybridSearchEngine, thay cho EnsembleRetriever
+    """
+
+    engine: Any
+    # Chunk id được phép tìm (vd. chunk của các CV một phiên đã upload), None: toàn bộ index
+    scope: Optional[Set[str]] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        chunk_ids = self.scope
+        if chunk_ids is not None and self.engine.metadata_filter:
+            # Bộ lọc suy ra từ câu hỏi chỉ xét ứng viên / file trong phạm vi; không khớp thì giữ cả phạm vi
+            chunk_ids = self.engine.manager.metadata_index.resolve(query, chunk_ids) or chunk_ids
+        return [self.engine.manager.chunks[chunk_id] for chunk_id, _ in self.engine.search(query, chunk_ids)]
@@ -0,0 +1,564 @@
+"""
+Quản lý index FAISS + BM25 cập nhật theo từng file CV
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import shutil
+import time
+from typing import Collection, Dict, List, Optional, Set, Tuple
+import faiss
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain.schema import BaseRetriever, Document
+from bm25_index import BM25Index
+from config import INDEX_KEEP_SNAPSHOTS, INDEX_MAX_DELTAS, NEAR_DUPLICATE_DETECTION
+from embedding_cache import file_lock
+from faiss_index import all_vectors, build_index, index_type_of, needs_rebuild, prepare_index, search
+from hybrid_search import HybridRetriever, HybridSearchEngine
+from metadata_index import MetadataIndex
+from metrics import trace, traced
+from near_duplicates import NearDuplicateIndex, minhash_signature
+from pdf_extraction import parse_pdf_files
+from vector_store import calculate_file_hash, create_chunks_from_sections
+
+
+# Tăng khi thay đổi cấu trúc thư mục index trên đĩa
+INDEX_FORMAT_VERSION = 2
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "index.lock"
+
+
+def snapshot_lock(index_dir: str):
+    """
+    Khoá giữa các process khi nạp - thêm file - lưu snapshot trong `index_dir`,
+    để snapshot mới luôn chứa các file mà process khác vừa thêm
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    return file_lock(os.path.join(index_dir, LOCK_FILE))
+
+
+def _embedding_model_name(embeddings: Embeddings) -> str:
+    return getattr(embeddings, "model_name", type(embeddings).__name__)
+
+
+def _current_snapshot(index_dir: str) -> Optional[str]:
+    """Tên snapshot đang dùng trong `index_dir` (None nếu chưa có)"""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class CVIndexManager:
+    """
+    Giữ manifest (hash file -> danh sách chunk id) và cập nhật index theo từng file:
+    file mới chỉ embed các chunk của nó, file bị xoá chỉ xoá các chunk tương ứng.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.manifest: Dict[str, List[str]] = {}
+        self.chunks: Dict[str, Document] = {}
+        self.vector_store: Optional[FAISS] = None
+        self.bm25_index = BM25Index()
+        self.metadata_index = MetadataIndex()
+        self._positions: Optional[Dict[str, int]] = None  # chunk id -> vị trí trong FAISS
+        self._read_only = False
+        # CV gần trùng: chữ ký MinHash của các file được index và
+        # hash file trùng -> {"of": hash file đại diện, "file_name", "similarity"} (không có chunk riêng)
+        self.near_duplicates = NearDuplicateIndex()
+        self.duplicates: Dict[str, Dict] = {}
+        # Snapshot trên đĩa mà manager đang khớp và các phần bổ sung (delta) của nó đã áp dụng
+        self._snapshot: Optional[str] = None
+        self._deltas: Set[str] = set()
+
+    def add_uploads(self, pdfs) -> Tuple[List[str], List[str]]:
+        """
+        Thêm các file đang upload còn thiếu trong index (không xoá file nào:
+        index có thể đang được các phiên khác dùng chung).
+        Trả về (hash các file đang upload, hash các file mới thêm).
+        """
+        current = {}
+        for pdf in pdfs:
+            if pdf is not None:
+                current.setdefault(calculate_file_hash(pdf), pdf)
+
+        added = [file_hash for file_hash in current if file_hash not in self.manifest]
+        if added:
+            files = []
+            for file_hash in added:
+                pdf = current[file_hash]
+                files.append((pdf.name if hasattr(pdf, "name") else "Unknown", pdf.read()))
+                pdf.seek(0)
+            self.add_pdfs(files, added)
+
+        return list(current), added
+
+    def add_pdfs(
+        self, files: List[Tuple[str, bytes]], file_hashes: Optional[List[str]] = None,
+        dedupe: bool = NEAR_DUPLICATE_DETECTION,
+    ) -> List[str]:
+        """
+        Đọc và thêm các CV (file_name, bytes) chưa có trong index.
+        `file_hashes` là hash nội dung từng file (tính nếu không truyền).
+        Nếu `dedupe`, CV gần trùng với một CV đã index chỉ được ghi nhận vào
+        `duplicates` (không tách chunk / embed lại). Trả về hash của các file mới được thêm.
+        """
+        if file_hashes is None:
+            file_hashes = [hashlib.md5(data).hexdigest() for _, data in files]
+        new = [i for i, file_hash in enumerate(file_hashes) if file_hash not in self.manifest]
+        # Section đã tách sẵn được lấy từ cache nếu CV từng được đọc (kể cả ở tab chấm điểm)
+        for j, parsed in parse_pdf_files([files[i] for i in new]):
+            file_hash = file_hashes[new[j]]
+            if file_hash in self.manifest:
+                continue  # cùng nội dung với một file khác trong lần thêm này
+            signature = minhash_signature(parsed["text"]) if dedupe else None
+            match = self.near_duplicates.find(signature)
+            if match is not None:
+                self.manifest[file_hash] = []
+                self.duplicates[file_hash] = {
+                    "of": match[0], "file_name": parsed["file_name"], "similarity": round(match[1], 3)
+                }
+                continue
+            metadata = {"source": "pdf", "file_name": parsed["file_name"]}
+            file_chunks = create_chunks_from_sections(parsed["applicant_name"], parsed["sections"], metadata)
+            self.add_file(file_hash, file_chunks)
+            if signature is not None:
+                self.near_duplicates.add(file_hash, signature)
+        return [file_hashes[i] for i in new]
+
+    def representative(self, file_hash: str) -> str:
+        """Hash của file có chunk trong index đại diện cho `file_hash` (chính nó nếu không trùng)"""
+        return self.duplicates[file_hash]["of"] if file_hash in self.duplicates else file_hash
+
+    def chunk_ids_for(self, file_hashes: Collection[str]) -> Set[str]:
+        """Chunk id của các file (CV gần trùng dùng chunk của CV đại diện)"""
+        return {
+            chunk_id for file_hash in file_hashes
+            for chunk_id in self.manifest.get(self.representative(file_hash), [])
+        }
+
+    def duplicate_groups(self, file_hashes: Optional[Collection[str]] = None) -> List[Tuple[str, List[Dict]]]:
+        """
+        Các nhóm CV gần trùng: (tên file đại diện, [{"file_name", "similarity"} của các CV trùng]),
+        chỉ gồm các CV trùng thuộc `file_hashes` nếu có
+        """
+        groups: Dict[str, List[Dict]] = {}
+        for file_hash, duplicate in self.duplicates.items():
+            if file_hashes is not None and file_hash not in file_hashes:
+                continue
+            groups.setdefault(duplicate["of"], []).append(
+                {"file_name": duplicate["file_name"], "similarity": duplicate["similarity"]}
+            )
+        return [
+            (self.chunks[self.manifest[file_hash][0]].metadata.get("file_name", file_hash)
+             if self.manifest.get(file_hash) else file_hash, members)
+            for file_hash, members in groups.items()
+        ]
+
+    def add_file(self, file_hash: str, file_chunks: List[Document]) -> List[str]:
+        """
+        Thêm chunk của một file CV vào FAISS và BM25
+        """
+        if file_hash in self.manifest:
+            return self.manifest[file_hash]
+
+        chunk_ids = [f"{file_hash}-{i}" for i in range(len(file_chunks))]
+        for chunk_id, chunk in zip(chunk_ids, file_chunks):
+            chunk.metadata["chunk_id"] = chunk_id
+        self.manifest[file_hash] = chunk_ids
+
+        if not file_chunks:
+            return chunk_ids
+
+        with trace("index_build", chunks=len(file_chunks)):
+            texts = [chunk.page_content for chunk in file_chunks]
+            self._add_chunks(chunk_ids, file_chunks, self.embeddings.embed_documents(texts))
+        return chunk_ids
+
+    def _add_chunks(self, chunk_ids: List[str], file_chunks: List[Document], vectors):
+        """Thêm các chunk đã có vector vào FAISS, BM25 và index metadata"""
+        self._ensure_writable()
+        texts = [chunk.page_content for chunk in file_chunks]
+        metadatas = [chunk.metadata for chunk in file_chunks]
+        if self.vector_store is None:
+            self.vector_store = FAISS.from_embeddings(
+                list(zip(texts, vectors)), self.embeddings, metadatas=metadatas, ids=chunk_ids
+            )
+        else:
+            self.vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=chunk_ids)
+
+        for chunk_id, chunk in zip(chunk_ids, file_chunks):
+            self.chunks[chunk_id] = chunk
+            self.metadata_index.add(chunk_id, chunk.metadata)
+        self.bm25_index.add(chunk_ids, texts)
+        self._positions = None
+
+        if needs_rebuild(self.vector_store.index):
+            self._rebuild_vector_index()
+
+    def remove_file(self, file_hash: str):
+        """
+        Xoá toàn bộ chunk của một file CV khỏi FAISS và BM25
+        """
+        chunk_ids = self.manifest.pop(file_hash, [])
+        self.duplicates.pop(file_hash, None)
+        if file_hash in self.near_duplicates:
+            self.near_duplicates.remove(file_hash)
+            # Các CV trùng mất đại diện: bỏ khỏi manifest để lần thêm sau index lại
+            for duplicate_hash in [h for h, duplicate in self.duplicates.items() if duplicate["of"] == file_hash]:
+                del self.duplicates[duplicate_hash]
+                self.manifest.pop(duplicate_hash, None)
+        if not chunk_ids:
+            return
+
+        if self.vector_store is not None:
+            if index_type_of(self.vector_store.index) == "flat":
+                self._ensure_writable()
+                self.vector_store.delete(chunk_ids)
+            else:
+                # Index xấp xỉ không xoá được vector giữa chừng mà giữ nguyên vị trí: dựng lại
+                self._rebuild_vector_index(exclude=set(chunk_ids))
+        for chunk_id in chunk_ids:
+            chunk = self.chunks.pop(chunk_id, None)
+            if chunk is not None:
+                self.metadata_index.remove(chunk_id, chunk.metadata)
+        self.bm25_index.remove(chunk_ids)
+        self._positions = None
+
+    def _ensure_writable(self):
+        """Chép index FAISS memory-mapped (chỉ đọc) vào RAM trước lần sửa đầu tiên"""
+        if self._read_only and self.vector_store is not None:
+            self.vector_store.index = faiss.deserialize_index(faiss.serialize_index(self.vector_store.index))
+            prepare_index(self.vector_store.index)
+        self._read_only = False
+
+    def _rebuild_vector_index(self, exclude: Collection[str] = ()):
+        """
+        Dựng lại index FAISS theo FAISS_INDEX_TYPE (train lại với IVF), bỏ các chunk trong `exclude`.
+        Vector được lấy lại từ index nếu index lưu vector nguyên vẹn, nếu không (PQ / SQ8) thì embed
+        lại nội dung chunk (lấy từ cache embedding).
+        """
+        index = self.vector_store.index
+        docstore_ids = self.vector_store.index_to_docstore_id
+        kept = [position for position in range(index.ntotal) if docstore_ids[position] not in exclude]
+        kept_ids = [docstore_ids[position] for position in kept]
+        if not kept_ids:
+            self.vector_store = None
+            self._read_only = False
+            self._positions = None
+            return
+
+        with trace("index_rebuild", vectors=len(kept_ids)):
+            vectors = self._vectors_at(kept)
+            self.vector_store = FAISS(
+                embedding_function=self.embeddings,
+                index=build_index(vectors),
+                docstore=InMemoryDocstore({chunk_id: self.chunks[chunk_id] for chunk_id in kept_ids}),
+                index_to_docstore_id=dict(enumerate(kept_ids)),
+            )
+        self._read_only = False
+        self._positions = None
+
+    def _vectors_at(self, positions: List[int]) -> np.ndarray:
+        """
+        Vector tại các vị trí trong FAISS: lấy lại từ index nếu index lưu vector nguyên vẹn,
+        nếu không (PQ / SQ8) thì embed lại nội dung chunk (lấy từ cache embedding)
+        """
+        index = self.vector_store.index
+        if index_type_of(index) in ("flat", "hnsw", "ivf_flat"):
+            return all_vectors(index, positions)
+        docstore_ids = self.vector_store.index_to_docstore_id
+        return np.asarray(
+            self.embeddings.embed_documents([self.chunks[docstore_ids[position]].page_content for position in positions]),
+            dtype=np.float32,
+        )
+
+    @traced("index_save")
+    def save(self, index_dir: str) -> str:
+        """
+        Lưu toàn bộ trạng thái index thành một snapshot mới trong `index_dir`:
+            index_dir/CURRENT              tên snapshot đang dùng
+            index_dir/snap-<ts>/manifest.json   manifest file, chunk (nội dung + metadata), id FAISS
+            index_dir/snap-<ts>/vectors.faiss   index FAISS
+            index_dir/snap-<ts>/bm25.json, bm25.npz
+            index_dir/snap-<ts>/minhash.json, minhash.npy   chữ ký MinHash của các file (CV gần trùng)
+        Snapshot được ghi xong mới đổi CURRENT, nên các process khác đang đọc
+        snapshot cũ không bị ảnh hưởng. Trả về đường dẫn snapshot.
+        Để thêm file vào snapshot đang dùng mà không ghi lại toàn bộ index, dùng `save_delta`.
+        """
+        snapshot = f"snap-{time.time_ns()}"
+        snapshot_dir = os.path.join(index_dir, snapshot)
+        tmp_dir = snapshot_dir + ".tmp"
+        os.makedirs(tmp_dir)
+
+        index_to_docstore_id = []
+        if self.vector_store is not None:
+            index_to_docstore_id = [
+                self.vector_store.index_to_docstore_id[i] for i in range(self.vector_store.index.ntotal)
+            ]
+            faiss.write_index(self.vector_store.index, os.path.join(tmp_dir, "vectors.faiss"))
+        self.bm25_index.save(tmp_dir)
+        self.near_duplicates.save(tmp_dir)
+
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": INDEX_FORMAT_VERSION,
+                "embedding_model": _embedding_model_name(self.embeddings),
+                "files": self.manifest,
+                "duplicates": self.duplicates,
+                "chunks": [
+                    {"id": chunk_id, "page_content": chunk.page_content, "metadata": chunk.metadata}
+                    for chunk_id, chunk in self.chunks.items()
+                ],
+                "index_to_docstore_id": index_to_docstore_id,
+            }, f, ensure_ascii=False)
+
+        os.rename(tmp_dir, snapshot_dir)
+        current_tmp = os.path.join(index_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+        os.replace(current_tmp, os.path.join(index_dir, CURRENT_FILE))
+
+        # Giữ lại vài snapshot gần nhất cho các process còn đang đọc
+        snapshots = sorted(name for name in os.listdir(index_dir) if name.startswith("snap-") and not name.endswith(".tmp"))
+        for name in snapshots[:-INDEX_KEEP_SNAPSHOTS]:
+            shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+        self._snapshot = snapshot
+        self._deltas = set()
+        return snapshot_dir
+
+    @traced("index_save_delta")
+    def save_delta(self, index_dir: str, file_hashes: Collection[str]) -> str:
+        """
+        Ghi các file vừa thêm (`file_hashes`) thành một phần bổ sung của snapshot đang dùng:
+            index_dir/snap-<ts>/delta-<ts>.npz   manifest, chunk, vector và chữ ký MinHash của các file đó
+        nên thêm vài CV vào index lớn chỉ ghi phần của các CV đó. Manager phải khớp snapshot
+        đang dùng (vừa `load` / `refresh` trong `snapshot_lock`); nếu không, hoặc snapshot đã có
+        INDEX_MAX_DELTAS phần bổ sung, thì ghi cả index thành snapshot mới bằng `save`.
+        Chỉ dùng cho việc thêm file (xoá file phải `save`). Trả về đường dẫn file đã ghi.
+        """
+        if (self._snapshot is None or self._snapshot != _current_snapshot(index_dir)
+                or len(self._deltas) >= INDEX_MAX_DELTAS):
+            return self.save(index_dir)
+
+        files = {file_hash: self.manifest[file_hash] for file_hash in file_hashes if file_hash in self.manifest}
+        chunk_ids = [chunk_id for ids in files.values() for chunk_id in ids]
+        vectors = np.zeros((0, 0), dtype=np.float32)
+        if chunk_ids:
+            positions = {chunk_id: i for i, chunk_id in self.vector_store.index_to_docstore_id.items()}
+            vectors = self._vectors_at([positions[chunk_id] for chunk_id in chunk_ids])
+        signature_keys = [file_hash for file_hash in files if file_hash in self.near_duplicates]
+        meta = {
+            "files": files,
+            "duplicates": {file_hash: self.duplicates[file_hash] for file_hash in files if file_hash in self.duplicates},
+            "chunks": [
+                {"id": chunk_id, "page_content": self.chunks[chunk_id].page_content,
+                 "metadata": self.chunks[chunk_id].metadata}
+                for chunk_id in chunk_ids
+            ],
+            "signature_keys": signature_keys,
+        }
+
+        delta = f"delta-{time.time_ns()}.npz"
+        path = os.path.join(index_dir, self._snapshot, delta)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, meta=np.array(json.dumps(meta, ensure_ascii=False)), vectors=vectors,
+                signatures=np.stack([self.near_duplicates.signatures[key] for key in signature_keys])
+                if signature_keys else np.zeros((0, 0), dtype=np.uint64),
+            )
+        os.replace(tmp_path, path)
+        self._deltas.add(delta)
+        return path
+
+    def _apply_deltas(self, snapshot_dir: str):
+        """Áp dụng các phần bổ sung của snapshot chưa áp dụng, theo thứ tự ghi"""
+        deltas = sorted(
+            name for name in os.listdir(snapshot_dir)
+            if name.startswith("delta-") and name.endswith(".npz") and name not in self._deltas
+        )
+        for delta in deltas:
+            with np.load(os.path.join(snapshot_dir, delta)) as data:
+                meta = json.loads(str(data["meta"]))
+                vectors = data["vectors"]
+                signatures = data["signatures"]
+            chunks = {
+                item["id"]: Document(page_content=item["page_content"], metadata=item["metadata"])
+                for item in meta["chunks"]
+            }
+            rows = {item["id"]: row for row, item in enumerate(meta["chunks"])}
+            for file_hash, chunk_ids in meta["files"].items():
+                if file_hash in self.manifest:
+                    continue
+                self.manifest[file_hash] = chunk_ids
+                if file_hash in meta["duplicates"]:
+                    self.duplicates[file_hash] = meta["duplicates"][file_hash]
+                if chunk_ids:
+                    self._add_chunks(
+                        chunk_ids, [chunks[chunk_id] for chunk_id in chunk_ids],
+                        vectors[[rows[chunk_id] for chunk_id in chunk_ids]],
+                    )
+            for key, signature in zip(meta["signature_keys"], signatures):
+                if key not in self.near_duplicates:
+                    self.near_duplicates.add(key, signature)
+            self._deltas.add(delta)
+
+    def refresh(self, index_dir: str) -> bool:
+        """
+        Áp dụng các phần bổ sung mà process khác vừa ghi vào snapshot đang dùng (chỉ đọc
+        các delta mới). False nếu snapshot hiện tại đã đổi, khi đó cần nạp lại bằng `load`.
+        """
+        snapshot = _current_snapshot(index_dir)
+        if snapshot != self._snapshot:
+            return False
+        if snapshot is not None:
+            with trace("index_refresh"):
+                self._apply_deltas(os.path.join(index_dir, snapshot))
+        return True
+
+    @classmethod
+    def load(cls, index_dir: str, embeddings: Embeddings) -> Optional["CVIndexManager"]:
+        """
+        Nạp snapshot hiện tại từ `index_dir` cùng các phần bổ sung của nó (None nếu
+        chưa có, khác phiên bản hoặc được tạo bằng model embedding khác). Vector FAISS được memory-map
+        ở chế độ chỉ đọc nên nhiều process có thể dùng chung một snapshot.
+        """
+        snapshot = _current_snapshot(index_dir)
+        if snapshot is None:
+            return None
+        snapshot_dir = os.path.join(index_dir, snapshot)
+        try:
+            with open(os.path.join(snapshot_dir, "manifest.json"), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if (manifest.get("format_version") != INDEX_FORMAT_VERSION
+                or manifest.get("embedding_model") != _embedding_model_name(embeddings)):
+            return None
+
+        manager = cls(embeddings)
+        manager.manifest = manifest["files"]
+        manager.chunks = {
+            item["id"]: Document(page_content=item["page_content"], metadata=item["metadata"])
+            for item in manifest["chunks"]
+        }
+        manager.bm25_index = BM25Index.load(snapshot_dir)
+        manager.near_duplicates = NearDuplicateIndex.load(snapshot_dir) or NearDuplicateIndex()
+        manager.duplicates = manifest.get("duplicates", {})
+        for chunk_id, chunk in manager.chunks.items():
+            manager.metadata_index.add(chunk_id, chunk.metadata)
+
+        if manifest["index_to_docstore_id"]:
+            index = faiss.read_index(
+                os.path.join(snapshot_dir, "vectors.faiss"),
+                getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY,
+            )
+            docstore_ids = manifest["index_to_docstore_id"]
+            manager.vector_store = FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=InMemoryDocstore({chunk_id: manager.chunks[chunk_id] for chunk_id in docstore_ids}),
+                index_to_docstore_id=dict(enumerate(docstore_ids)),
+            )
+            manager._read_only = True
+            prepare_index(index)
+            if needs_rebuild(index):
+                # FAISS_INDEX_TYPE đã đổi so với lúc lưu snapshot
+                manager._rebuild_vector_index()
+
+        manager._snapshot = snapshot
+        manager._apply_deltas(snapshot_dir)
+        return manager
+
+    @traced("vector_search")
+    def vector_search(self, query: str, k: int, chunk_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Tìm k chunk gần nhất theo vector, trả về (chunk id, khoảng cách).
+        Nếu có `chunk_ids`, FAISS chỉ xét các chunk đó (xem `faiss_index.search`).
+        Tham số tìm kiếm (nprobe / efSearch) theo kiểu index hiện tại.
+        """
+        if self.vector_store is None or k <= 0:
+            return []
+        index = self.vector_store.index
+        query_vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+
+        positions = None
+        if chunk_ids is not None:
+            if self._positions is None:
+                self._positions = {
+                    chunk_id: position for position, chunk_id in self.vector_store.index_to_docstore_id.items()
+                }
+            positions = np.array([self._positions[c] for c in chunk_ids if c in self._positions], dtype=np.int64)
+            if not len(positions):
+                return []
+
+        distances, positions = search(index, query_vector, min(k, index.ntotal), positions)
+        return [
+            (self.vector_store.index_to_docstore_id[int(position)], float(distance))
+            for distance, position in zip(distances[0], positions[0]) if position >= 0
+        ]
+
+    @traced("bm25_search")
+    def bm25_search(self, query: str, k: int, chunk_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Tìm k chunk có điểm BM25 cao nhất (trong `chunk_ids` nếu có), trả về (chunk id, điểm)
+        """
+        return [(chunk_id, score) for chunk_id, score in self.bm25_index.search(query, k, chunk_ids) if score > 0]
+
+    def get_chunks(self) -> List[Document]:
+        """Danh sách chunk hiện có theo thứ tự thêm vào"""
+        return list(self.chunks.values())
+
+    def chunk_page(
+        self, filters: Dict[str, Collection[str]], page: int, page_size: int,
+        scope: Optional[Set[str]] = None,
+    ) -> Tuple[List[Document], int, int]:
+        """
+        Một trang chunk (theo thứ tự thêm vào) khớp mọi bộ lọc metadata
+        (trường -> các giá trị đã chuẩn hoá, bộ lọc rỗng bị bỏ qua), trong `scope` nếu có.
+        Trả về (chunk của trang, tổng số chunk khớp, số trang thực tế sau khi giới hạn).
+        Chỉ các chunk của trang được lấy ra, không duyệt lại toàn bộ danh sách.
+        """
+        allowed = scope
+        for field, values in filters.items():
+            if values:
+                ids = self.metadata_index.lookup(field, set(values))
+                allowed = ids if allowed is None else allowed & ids
+
+        total = len(self.chunks) if allowed is None else len(allowed)
+        page = max(0, min(page, (total - 1) // page_size)) if total else 0
+        start = page * page_size
+        if allowed is None:
+            chunk_ids = itertools.islice(self.chunks, start, start + page_size)
+        else:
+            # Chunk id là "<hash file>-<thứ tự>": sắp theo thứ tự file trong manifest rồi thứ tự chunk
+            file_order = {file_hash: i for i, file_hash in enumerate(self.manifest)}
+
+            def order(chunk_id: str):
+                file_hash, _, index = chunk_id.rpartition("-")
+                return file_order.get(file_hash, len(file_order)), int(index)
+
+            chunk_ids = heapq.nsmallest(start + page_size, allowed, key=order)[start:]
+        return [self.chunks[chunk_id] for chunk_id in chunk_ids], total, page
+
+    def get_retriever(self, file_hashes: Optional[Collection[str]] = None) -> Optional[BaseRetriever]:
+        """
+        Tạo hybrid retriever từ index hiện tại, chỉ tìm trong chunk của
+        `file_hashes` nếu có (None nếu không có chunk nào để tìm)
+        """
+        if self.vector_store is None or not self.chunks:
+            return None
+        scope = None if file_hashes is None else self.chunk_ids_for(file_hashes)
+        if scope is not None and not scope:
+            return None
+        return HybridRetriever(engine=HybridSearchEngine(self), scope=scope)
@@ -0,0 +1,54 @@
+"""
+Client OpenAI dùng chung trong process: một httpx.Client có connection pool
+cho mọi LLM / chat model / embedding, thay vì mỗi đối tượng tự mở kết nối
+"""
+
+import threading
+import httpx
+from langchain_openai import ChatOpenAI, OpenAI, OpenAIEmbeddings
+from config import (
+    EMBEDDING_MODEL, LLM_MODEL, LLM_TEMPERATURE,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_TIMEOUT_SECONDS
+)
+
+_http_client = None
+_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Lấy client HTTP (keep-alive, giới hạn số kết nối) dùng chung cho cả process
+    """
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=HTTP_TIMEOUT_SECONDS,
+            )
+    return _http_client
+
+
+def close_http_client():
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def create_scoring_llm() -> OpenAI:
+    """LLM (completions) dùng để phân tích yêu cầu công việc và chấm điểm"""
+    return OpenAI(model=LLM_MODEL, temperature=LLM_TEMPERATURE, http_client=get_http_client())
+
+
+def create_openai_chat_model(streaming: bool = True) -> ChatOpenAI:
+    """Chat model trả lời câu hỏi về CV"""
+    return ChatOpenAI(model=LLM_MODEL, temperature=LLM_TEMPERATURE, streaming=streaming, http_client=get_http_client())
+
+
+def create_openai_embeddings() -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, http_client=get_http_client())
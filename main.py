@@ -1,7 +1,9 @@
 from dotenv import load_dotenv
 import streamlit as st
-from cv_chat import process_cvs_for_chat
-from cv_scoring import process_cvs_for_scoring
+from cv_chat import process_cvs_for_chat, process_cvs_for_chat_remote
+from cv_scoring import process_cvs_for_scoring, process_cvs_for_scoring_remote
+from metrics import start_metrics_server
+from config import API_URL
 import os
 
 
@@ -11,11 +13,15 @@ def main():
     # Get API key from environment or Streamlit secrets
     api_key = os.getenv("OPENAI_API_KEY") or st.secrets.get("OPENAI_API_KEY")
     
-    if not api_key:
+    # Khi dùng API service (API_URL), key OpenAI nằm ở service
+    if not api_key and not API_URL:
         st.error("❌ OpenAI API Key not found!")
         st.info("Please add your OpenAI API key in the Streamlit Cloud secrets or .env file")
         return
 
+    # Endpoint /metrics cho Prometheus (chỉ khi đặt METRICS_PORT)
+    start_metrics_server()
+
     st.set_page_config(page_title="CV Analysis & Scoring System")
     st.header("CV Analysis & Scoring System")
     
@@ -27,6 +33,10 @@ def main():
         st.session_state.pdf_hash = None
     if 'hybrid_retriever' not in st.session_state:
         st.session_state.hybrid_retriever = None
+    if 'index_manager' not in st.session_state:
+        st.session_state.index_manager = None
+    if 'file_hashes' not in st.session_state:
+        st.session_state.file_hashes = []
 
     with tab1:
         st.subheader("Chat with CV")
@@ -36,7 +46,7 @@ def main():
             st.info("Vui lòng upload CV để sử dụng tính năng chat")
         else:
             # Logic xử lý CV cho tab chat
-            process_cvs_for_chat(pdfs)
+            (process_cvs_for_chat_remote if API_URL else process_cvs_for_chat)(pdfs)
     
     with tab2:
         st.subheader("CV Scoring System")
@@ -46,7 +56,7 @@ def main():
             st.info("Vui lòng upload CV để chấm điểm")
         else:
             # Logic chấm điểm CV
-            process_cvs_for_scoring(pdfs_scoring)
+            (process_cvs_for_scoring_remote if API_URL else process_cvs_for_scoring)(pdfs_scoring)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+"""
+Index ngược theo metadata chunk (ứng viên, file, mục CV) và nhận diện bộ lọc từ câu hỏi
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from config import SECTION_ALIASES
+
+FILTER_FIELDS = ("applicant_name", "file_name", "section")
+
+# Tiêu đề CV dính vào dòng tên, không phải một phần của tên
+NAME_TITLE_WORDS = {"cv", "curriculum", "vitae", "resume"}
+# Phần tên trùng với từ thông dụng trong câu hỏi (sau khi bỏ dấu), vd. "năm" -> "nam",
+# "đang làm" -> "dang lam", "do" / "an" trong tiếng Anh: một cụm tên rút gọn chỉ gồm
+# những từ này không đủ để xác định ứng viên
+COMMON_NAME_WORDS = {
+    "van", "thi", "nam", "an", "do", "ha", "to", "me", "minh", "hoa", "son", "long", "hai", "ba",
+    "tu", "anh", "chi", "em", "thu", "lam", "tien", "viet", "dung", "khoa", "binh", "dang", "phan",
+    "dinh", "duong", "cao", "tam", "thanh", "cong", "nhan", "tai", "ly", "le", "mai", "may", "will",
+}
+
+
+def normalize_text(text: str) -> str:
+    """
+    Chuẩn hoá để so khớp: chữ thường, bỏ dấu tiếng Việt, gộp khoảng trắng
+    """
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d").replace("Đ", "d"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", normalize_text(text))
+
+
+def _name_phrases(name: str) -> Dict[str, int]:
+    """
+    Các cách nhắc tới ứng viên trong câu hỏi -> số từ của cụm: họ tên đầy đủ,
+    họ + tên (cả thứ tự tên + họ), tên đệm + tên. Một từ đơn lẻ chỉ đủ khi đó là
+    cả tên; cụm ngắn hơn 3 từ chỉ gồm từ thông dụng bị bỏ qua.
+    """
+    words = [word for word in _words(name) if word not in NAME_TITLE_WORDS]
+    if not words:
+        return {}
+    candidates = [words]
+    if len(words) >= 2:
+        candidates += [[words[0], words[-1]], [words[-1], words[0]]]
+        candidates += [words[i:] for i in range(1, len(words) - 1)]
+    phrases = {}
+    for candidate in candidates:
+        if len(candidate) >= 3 or any(word not in COMMON_NAME_WORDS for word in candidate):
+            phrases.setdefault(" ".join(candidate), len(candidate))
+    return phrases
+
+
+_SECTION_PATTERNS = {
+    category: re.compile(r"\b(" + "|".join(re.escape(normalize_text(alias)) for alias in aliases) + r")")
+    for category, aliases in SECTION_ALIASES.items()
+}
+
+
+def section_category(title: str) -> str:
+    """
+    Quy tiêu đề mục CV (vd. "TECHNICAL SKILLS", "Kỹ năng") về một nhóm chuẩn (vd. "skills")
+    """
+    normalized = normalize_text(title)
+    for category, pattern in _SECTION_PATTERNS.items():
+        if pattern.search(normalized):
+            return category
+    return normalized
+
+
+class MetadataIndex:
+    """
+    Index ngược: trường metadata -> giá trị đã chuẩn hoá -> tập chunk id
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, Set[str]]] = {field: defaultdict(set) for field in FILTER_FIELDS}
+        self._name_phrases: Dict[str, Dict[str, int]] = {}
+        # Giá trị đã chuẩn hoá -> nhãn hiển thị (giá trị gốc đầu tiên gặp)
+        self._labels: Dict[str, Dict[str, str]] = {field: {} for field in FILTER_FIELDS}
+
+    def _values(self, metadata: dict) -> Dict[str, str]:
+        return {
+            "applicant_name": normalize_text(metadata.get("applicant_name", "")),
+            "file_name": normalize_text(metadata.get("file_name", "")),
+            "section": section_category(metadata.get("section", "")),
+        }
+
+    def add(self, chunk_id: str, metadata: dict):
+        for field, value in self._values(metadata).items():
+            if value:
+                self._postings[field][value].add(chunk_id)
+                self._labels[field].setdefault(value, value if field == "section" else metadata.get(field) or value)
+                if field == "applicant_name" and value not in self._name_phrases:
+                    self._name_phrases[value] = _name_phrases(value)
+
+    def remove(self, chunk_id: str, metadata: dict):
+        for field, value in self._values(metadata).items():
+            ids = self._postings[field].get(value)
+            if ids is None:
+                continue
+            ids.discard(chunk_id)
+            if not ids:
+                del self._postings[field][value]
+                self._labels[field].pop(value, None)
+                if field == "applicant_name":
+                    self._name_phrases.pop(value, None)
+
+    def lookup(self, field: str, values: Set[str]) -> Set[str]:
+        """Các chunk có `field` thuộc một trong các giá trị `values`"""
+        postings = self._postings[field]
+        return set().union(*(postings.get(value, set()) for value in values))
+
+    def options(self, field: str, scope: Optional[Set[str]] = None) -> Dict[str, str]:
+        """
+        Các giá trị của `field` đang có chunk (trong `scope` nếu có):
+        giá trị đã chuẩn hoá -> nhãn hiển thị, theo thứ tự nhãn
+        """
+        labels = self._labels[field]
+        if scope is not None:
+            postings = self._postings[field]
+            labels = {
+                value: label for value, label in labels.items() if not postings.get(value, set()).isdisjoint(scope)
+            }
+        return dict(sorted(labels.items(), key=lambda item: normalize_text(item[1])))
+
+    def _in_scope(self, field: str, value: str, scope: Optional[Set[str]]) -> bool:
+        return scope is None or not self._postings[field].get(value, set()).isdisjoint(scope)
+
+    def detect_filters(self, question: str, scope: Optional[Set[str]] = None) -> Dict[str, Set[str]]:
+        """
+        Nhận diện ứng viên / file / mục CV được nhắc tới trong câu hỏi, chỉ xét
+        ứng viên / file có chunk trong `scope` nếu có (vd. CV của một phiên).
+        Ứng viên: tên có một cách gọi (xem `_name_phrases`) xuất hiện liền nhau trong
+        câu hỏi, chọn những tên khớp cụm dài nhất. Câu hỏi về cả nhóm ứng viên
+        (vd. "trên 5 năm kinh nghiệm") không bị thu hẹp vì trùng một từ trong tên.
+        """
+        normalized = normalize_text(question)
+        padded = " " + " ".join(_words(question)) + " "
+        filters: Dict[str, Set[str]] = {}
+
+        best, applicants = 0, set()
+        for name, phrases in self._name_phrases.items():
+            matched = max((length for phrase, length in phrases.items() if f" {phrase} " in padded), default=0)
+            if not matched or matched < best or not self._in_scope("applicant_name", name, scope):
+                continue
+            if matched > best:
+                best, applicants = matched, {name}
+            else:
+                applicants.add(name)
+        if applicants:
+            filters["applicant_name"] = applicants
+
+        files = {
+            file_name for file_name in self._postings["file_name"]
+            if file_name in normalized and self._in_scope("file_name", file_name, scope)
+        }
+        if files:
+            filters["file_name"] = files
+
+        sections = {category for category, pattern in _SECTION_PATTERNS.items() if pattern.search(normalized)}
+        if sections:
+            filters["section"] = sections
+
+        return filters
+
+    def resolve(self, question: str, scope: Optional[Set[str]] = None) -> Optional[Set[str]]:
+        """
+        Tập chunk id cần tìm kiếm cho câu hỏi (None nếu không giới hạn thêm),
+        luôn nằm trong `scope` nếu có.
+        Mục CV chỉ được dùng để thu hẹp thêm khi đã xác định được ứng viên/file;
+        nếu ứng viên không có mục đó thì giữ toàn bộ chunk của ứng viên.
+        """
+        filters = self.detect_filters(question, scope)
+        allowed: Optional[Set[str]] = None
+        for field in ("applicant_name", "file_name"):
+            if field in filters:
+                ids = self.lookup(field, filters[field])
+                allowed = ids if allowed is None else allowed & ids
+        if allowed is not None and scope is not None:
+            allowed = allowed & scope
+        if not allowed:
+            return None
+
+        if "section" in filters:
+            in_section = allowed & self.lookup("section", filters["section"])
+            if in_section:
+                allowed = in_section
+        return allowed
@@ -0,0 +1,372 @@
+"""
+Đo thời gian, số token, cache hit và lỗi theo từng bước xử lý (đọc PDF,
+embed, truy xuất, gọi LLM...). Xuất ra log JSON, file / endpoint định
+dạng text của Prometheus và bảng thời gian trên giao diện Streamlit.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from config import METRICS_PROM_FILE, METRICS_PORT, METRICS_HOST, METRICS_LOG_FILE
+
+# Cận trên các bucket histogram thời gian (giây)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_PREFIX = "cv_rag"
+
+logger = logging.getLogger("cv_rag.metrics")
+
+# Bộ ghi số liệu của các thao tác đang chạy trong context hiện tại (xem `record_action`)
+_recorders: contextvars.ContextVar[Tuple["MetricsRegistry", ...]] = contextvars.ContextVar(
+    "metrics_recorders", default=()
+)
+
+
+class MetricsRegistry:
+    """
+    Lưu số liệu theo bước (an toàn khi dùng nhiều luồng):
+    số lần chạy, lỗi, tổng / lớn nhất thời gian, histogram thời gian, token.
+    Thống kê cache được lấy từ các hàm `stats()` đã đăng ký khi xuất.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._caches: Dict[str, Callable[[], dict]] = {}
+        self._cache_counts: Dict[str, Dict[str, int]] = {}  # chỉ dùng trong bộ ghi của thao tác
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages[stage] = {
+                "count": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "buckets": [0] * len(self.buckets), "prompt_tokens": 0, "completion_tokens": 0,
+            }
+        return stats
+
+    def _targets(self) -> Tuple["MetricsRegistry", ...]:
+        """Registry này và bộ ghi của các thao tác đang chạy"""
+        return (self,) + tuple(recorder for recorder in _recorders.get() if recorder is not self)
+
+    def observe(self, stage: str, seconds: float, error: bool = False, **fields):
+        """Ghi nhận một lần chạy của bước `stage`"""
+        for registry in self._targets():
+            with registry._lock:
+                stats = registry._stage(stage)
+                stats["count"] += 1
+                stats["errors"] += int(error)
+                stats["seconds"] += seconds
+                stats["max_seconds"] = max(stats["max_seconds"], seconds)
+                for i, bound in enumerate(registry.buckets):
+                    if seconds <= bound:
+                        stats["buckets"][i] += 1
+                        break
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "ts": time.time(), "stage": stage, "duration_ms": round(seconds * 1000, 3),
+                "status": "error" if error else "ok", **fields,
+            }, ensure_ascii=False, default=str))
+
+    def add_tokens(self, stage: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        for registry in self._targets():
+            with registry._lock:
+                stats = registry._stage(stage)
+                stats["prompt_tokens"] += prompt_tokens
+                stats["completion_tokens"] += completion_tokens
+
+    def register_cache(self, name: str, stats: Callable[[], dict]):
+        """Đăng ký hàm trả về {"hits", "misses", ...} của một cache"""
+        with self._lock:
+            self._caches[name] = stats
+
+    @contextmanager
+    def span(self, stage: str, **fields) -> Iterator[Dict[str, Any]]:
+        """
+        Đo thời gian một khối lệnh. Dict trả về có thể được bổ sung trường để ghi vào log.
+        Lỗi được tính vào bước rồi ném lại.
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            self.observe(stage, time.perf_counter() - start, error=True, error_type=type(e).__name__, **fields)
+            raise
+        self.observe(stage, time.perf_counter() - start, **fields)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Bản sao số liệu hiện tại: {"stages": {...}, "caches": {...}}"""
+        with self._lock:
+            stages = {stage: {**stats, "buckets": list(stats["buckets"])} for stage, stats in self._stages.items()}
+            caches = dict(self._caches)
+            counts = {name: dict(counts) for name, counts in self._cache_counts.items()}
+        return {"stages": stages, "caches": {**counts, **{name: dict(stats()) for name, stats in caches.items()}}}
+
+    def to_prometheus(self) -> str:
+        """Số liệu ở định dạng text của Prometheus"""
+        snapshot = self.snapshot()
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_stage_duration_seconds Thời gian chạy của từng bước",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, stats["buckets"]):
+                cumulative += count
+                lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'{p}_stage_duration_seconds_sum{{stage="{stage}"}} {stats["seconds"]:.6f}')
+            lines.append(f'{p}_stage_duration_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+        lines += [f"# HELP {p}_stage_errors_total Số lần chạy lỗi của từng bước", f"# TYPE {p}_stage_errors_total counter"]
+        lines += [
+            f'{p}_stage_errors_total{{stage="{stage}"}} {stats["errors"]}'
+            for stage, stats in sorted(snapshot["stages"].items())
+        ]
+
+        lines += [f"# HELP {p}_tokens_total Số token LLM theo bước", f"# TYPE {p}_tokens_total counter"]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            if stats["prompt_tokens"] or stats["completion_tokens"]:
+                lines.append(f'{p}_tokens_total{{stage="{stage}",type="prompt"}} {stats["prompt_tokens"]}')
+                lines.append(f'{p}_tokens_total{{stage="{stage}",type="completion"}} {stats["completion_tokens"]}')
+
+        lines += [f"# HELP {p}_cache_requests_total Số lần tra cache", f"# TYPE {p}_cache_requests_total counter"]
+        for name, stats in sorted(snapshot["caches"].items()):
+            lines.append(f'{p}_cache_requests_total{{cache="{name}",result="hit"}} {stats.get("hits", 0)}')
+            lines.append(f'{p}_cache_requests_total{{cache="{name}",result="miss"}} {stats.get("misses", 0)}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = METRICS_PROM_FILE):
+        """Ghi số liệu ra file (ghi file tạm rồi đổi tên, dùng được với textfile collector)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+_server = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Lấy registry số liệu (dùng chung cho cả process)
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+            if METRICS_LOG_FILE:
+                handler = logging.FileHandler(METRICS_LOG_FILE, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+    return _metrics
+
+
+@contextmanager
+def record_action() -> Iterator[MetricsRegistry]:
+    """
+    Ghi riêng số liệu của một thao tác (vd. một lần chạy script của một phiên Streamlit):
+    các bước chạy trong khối lệnh, kể cả ở luồng nhận việc qua `submit_in_context`, được
+    ghi thêm vào registry trả về nên không lẫn số liệu của các phiên chạy song song.
+    """
+    recorder = MetricsRegistry()
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """`executor.submit` chạy `fn` trong bản sao context hiện tại (giữ bộ ghi của thao tác)"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def count_cache(name: str, hits: int = 0, misses: int = 0):
+    """
+    Ghi lượt tra cache `name` vào bộ ghi của các thao tác đang chạy
+    (số tổng của cả process lấy từ `stats()` đã đăng ký)
+    """
+    for recorder in _recorders.get():
+        with recorder._lock:
+            counts = recorder._cache_counts.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits"] += hits
+            counts["misses"] += misses
+
+
+def trace(stage: str, **fields):
+    """Đo thời gian một khối lệnh: `with trace("embed", texts=10): ...`"""
+    return get_metrics().span(stage, **fields)
+
+
+def traced(stage: str):
+    """Decorator đo thời gian mỗi lần gọi hàm"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback LangChain đo thời gian và token của mỗi lần gọi LLM / chat model.
+    Dùng token_usage do API trả về nếu có, nếu không thì đếm bằng tokenizer local.
+    """
+
+    def __init__(self, stage: str = "llm"):
+        self.stage = stage
+        self._runs: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _count(texts: List[str]) -> int:
+        from context_packing import count_tokens
+        return sum(count_tokens(text) for text in texts)
+
+    def _start(self, run_id, serialized: Optional[dict], texts: List[str]):
+        model = ((serialized or {}).get("kwargs") or {}).get("model_name") or (serialized or {}).get("name")
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), texts, model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, serialized, list(prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, serialized, [str(m.content) for batch in messages for m in batch])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            start, prompts, model = self._runs.pop(run_id, (time.perf_counter(), [], None))
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens") or self._count(prompts)
+        completion_tokens = usage.get("completion_tokens") or self._count(
+            [generation.text for generations in response.generations for generation in generations]
+        )
+        metrics = get_metrics()
+        metrics.add_tokens(self.stage, prompt_tokens, completion_tokens)
+        metrics.observe(
+            self.stage, time.perf_counter() - start, model=model,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            start, _, model = self._runs.pop(run_id, (time.perf_counter(), [], None))
+        get_metrics().observe(self.stage, time.perf_counter() - start, error=True, model=model, error_type=type(error).__name__)
+
+
+_llm_handlers: Dict[str, MetricsCallbackHandler] = {}
+
+
+def llm_callbacks(stage: str = "llm") -> List[BaseCallbackHandler]:
+    """Callback truyền vào `config={"callbacks": ...}` khi gọi LLM, số liệu ghi vào bước `stage`"""
+    with _metrics_lock:
+        handler = _llm_handlers.get(stage)
+        if handler is None:
+            handler = _llm_handlers[stage] = MetricsCallbackHandler(stage)
+    return [handler]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> bool:
+    """
+    Mở endpoint HTTP /metrics ở `host` (một lần cho cả process, chạy ở luồng nền).
+    Trả về False nếu không bật (port <= 0) hoặc cổng đang bị dùng.
+    """
+    global _server
+    with _metrics_lock:
+        if _server is not None:
+            return True
+        if port <= 0:
+            return False
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            return False
+    threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-server").start()
+    return True
+
+
+def stage_deltas(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Số liệu phát sinh giữa hai snapshot, mỗi bước một dòng (bước chậm nhất trước)
+    """
+    rows = []
+    for stage, stats in after["stages"].items():
+        prev = before["stages"].get(stage, {})
+        count = stats["count"] - prev.get("count", 0)
+        if count <= 0:
+            continue
+        seconds = stats["seconds"] - prev.get("seconds", 0.0)
+        rows.append({
+            "stage": stage,
+            "count": count,
+            "total_ms": seconds * 1000,
+            "mean_ms": seconds * 1000 / count,
+            "errors": stats["errors"] - prev.get("errors", 0),
+            "prompt_tokens": stats["prompt_tokens"] - prev.get("prompt_tokens", 0),
+            "completion_tokens": stats["completion_tokens"] - prev.get("completion_tokens", 0),
+        })
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def render_timing_panel(recorder: MetricsRegistry):
+    """
+    Bảng thời gian theo bước trên Streamlit cho thao tác vừa chạy (bộ ghi của `record_action`),
+    đồng thời cập nhật file Prometheus
+    """
+    import pandas as pd
+    import streamlit as st
+
+    snapshot = recorder.snapshot()
+    rows = stage_deltas({"stages": {}}, snapshot)
+    try:
+        get_metrics().write_prometheus()
+    except OSError:
+        pass
+    if not rows:
+        return
+    with st.expander("⏱ Thời gian xử lý theo bước"):
+        df = pd.DataFrame(rows).rename(columns={
+            "stage": "Bước", "count": "Số lần", "total_ms": "Tổng (ms)", "mean_ms": "Trung bình (ms)",
+            "errors": "Lỗi", "prompt_tokens": "Token prompt", "completion_tokens": "Token trả lời",
+        })
+        st.dataframe(df.round(1), use_container_width=True)
+        cache_lines = [
+            f"{name}: {stats['hits']} hit / {stats['misses']} miss"
+            for name, stats in snapshot["caches"].items() if stats["hits"] or stats["misses"]
+        ]
+        if cache_lines:
+            st.caption("Cache: " + ", ".join(cache_lines))
@@ -0,0 +1,131 @@
+"""
+Gom các yêu cầu đến cùng lúc (từ nhiều request / luồng) thành một lần gọi
+API model: câu hỏi cần embed và prompt chấm điểm
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from langchain.embeddings.base import Embeddings
+from langchain.llms.base import LLM
+from config import (
+    EMBED_MICROBATCH_MAX_SIZE, EMBED_MICROBATCH_WAIT_MS, LLM_MICROBATCH_MAX_SIZE, LLM_MICROBATCH_WAIT_MS
+)
+from metrics import llm_callbacks, trace
+
+
+class MicroBatcher:
+    """
+    Gom các phần tử được `submit` trong vòng `max_wait_seconds` (tối đa `max_batch_size`)
+    rồi gọi `fn(danh sách phần tử)` một lần; `fn` trả về kết quả theo đúng thứ tự.
+    Các lô được xử lý song song (tối đa `max_concurrent_batches`) để một lô chậm
+    không chặn lô sau. Lỗi của `fn` được trả về cho mọi phần tử trong lô.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_seconds: float,
+        name: str = "batch",
+        max_concurrent_batches: int = 8,
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix=f"microbatch-{name}")
+        self._thread = threading.Thread(target=self._collect, daemon=True, name=f"microbatch-{name}")
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[tuple]):
+        try:
+            with trace(f"microbatch_{self.name}", size=len(batch)):
+                results = self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Bọc CachedEmbeddings: các câu hỏi embed cùng lúc được gom thành một request.
+    Embed chunk (embed_documents) giữ nguyên vì đã gửi theo lô.
+    """
+
+    def __init__(self, embeddings, max_batch_size: int = EMBED_MICROBATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBED_MICROBATCH_WAIT_MS):
+        self.embeddings = embeddings
+        self.model_name = getattr(embeddings, "model_name", type(embeddings).__name__)
+        self.cache = getattr(embeddings, "cache", None)
+        self._batcher = MicroBatcher(embeddings.embed_queries, max_batch_size, max_wait_ms / 1000, name="embed_query")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._batcher(text)
+
+
+class BatchedLLM(LLM):
+    """
+    LLM completions gom các prompt đến cùng lúc thành một request nhiều prompt
+    (API completions nhận danh sách prompt). Dùng như LLM thường trong chain.
+    Nếu có `limiter`, mỗi request gom (không phải mỗi prompt) lấy một token.
+    Callback của chain ghi nhận từng prompt (gồm cả thời gian chờ gom); request
+    thật được ghi vào bước "llm_microbatch".
+    """
+
+    llm: Any
+    model_name: str = ""
+    limiter: Any = None
+    max_batch_size: int = LLM_MICROBATCH_MAX_SIZE
+    max_wait_ms: float = LLM_MICROBATCH_WAIT_MS
+    batcher: Optional[Any] = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not self.model_name:
+            self.model_name = getattr(self.llm, "model_name", None) or type(self.llm).__name__
+        self.batcher = MicroBatcher(self._generate_batch, self.max_batch_size, self.max_wait_ms / 1000, name="llm")
+
+    @property
+    def _llm_type(self) -> str:
+        return "batched"
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        result = self.llm.generate(prompts, callbacks=llm_callbacks("llm_microbatch"))
+        return [generations[0].text for generations in result.generations]
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Optional[Any] = None, **kwargs: Any) -> str:
+        return self.batcher(prompt)
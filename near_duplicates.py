@@ -0,0 +1,138 @@
+"""
+Phát hiện CV gần trùng (nộp lại nhiều lần, bản sửa nhẹ) bằng MinHash trên
+shingle từ của text CV đã làm sạch, tìm ứng viên trùng bằng LSH theo band
+"""
+
+import json
+import os
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+import numpy as np
+from config import NEAR_DUPLICATE_THRESHOLD, MINHASH_NUM_PERM, MINHASH_BANDS, SHINGLE_SIZE
+from metadata_index import normalize_text
+
+NEAR_DUPLICATE_FORMAT_VERSION = 1
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Hoán vị cố định (seed cố định) để chữ ký so sánh được giữa các lần chạy
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=MINHASH_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=MINHASH_NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Tập các cụm `size` từ liên tiếp (không phân biệt hoa thường / dấu tiếng Việt)"""
+    words = re.findall(r"\w+", normalize_text(text))
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """Chữ ký MinHash (MINHASH_NUM_PERM giá trị) của text CV, None nếu text rỗng"""
+    items = shingles(text)
+    if not items:
+        return None
+    hashes = np.fromiter((zlib.crc32(item.encode("utf-8")) for item in items), dtype=np.uint64, count=len(items))
+    with np.errstate(over="ignore"):
+        permuted = ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Ước lượng độ tương đồng Jaccard giữa hai tập shingle từ chữ ký MinHash"""
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """
+    Index LSH trên chữ ký MinHash: chữ ký được chia thành MINHASH_BANDS band,
+    hai CV trùng nhau ở ít nhất một band là ứng viên, rồi được xác nhận bằng
+    độ tương đồng ước lượng >= `threshold`.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, bands: int = MINHASH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = MINHASH_NUM_PERM // bands
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [defaultdict(set) for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key: Hashable, signature: np.ndarray):
+        self.signatures[key] = signature
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets[band_key].add(key)
+
+    def remove(self, key: Hashable):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = buckets.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del buckets[band_key]
+
+    def find(self, signature: Optional[np.ndarray]) -> Optional[Tuple[Hashable, float]]:
+        """CV đã có giống nhất với chữ ký (key, độ tương đồng), None nếu không có CV nào đủ ngưỡng"""
+        if signature is None:
+            return None
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates |= buckets.get(band_key, set())
+
+        best = None
+        for key in candidates:
+            similarity = estimate_similarity(signature, self.signatures[key])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def save(self, directory: str):
+        """
+        Lưu chữ ký ra thư mục (minhash.json + minhash.npy); key phải là chuỗi
+        """
+        keys = list(self.signatures)
+        np.save(
+            os.path.join(directory, "minhash.npy"),
+            np.stack([self.signatures[key] for key in keys]) if keys else np.zeros((0, MINHASH_NUM_PERM), dtype=np.uint64),
+        )
+        with open(os.path.join(directory, "minhash.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": NEAR_DUPLICATE_FORMAT_VERSION,
+                "num_perm": MINHASH_NUM_PERM,
+                "shingle_size": SHINGLE_SIZE,
+                "keys": keys,
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["NearDuplicateIndex"]:
+        """
+        Nạp index đã lưu bằng `save` (None nếu chưa có hoặc khác cấu hình MinHash)
+        """
+        try:
+            with open(os.path.join(directory, "minhash.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            signatures = np.load(os.path.join(directory, "minhash.npy"))
+        except (OSError, ValueError):
+            return None
+        if (meta.get("version") != NEAR_DUPLICATE_FORMAT_VERSION or meta.get("num_perm") != MINHASH_NUM_PERM
+                or meta.get("shingle_size") != SHINGLE_SIZE):
+            return None
+
+        index = cls()
+        for key, signature in zip(meta["keys"], signatures):
+            index.add(key, signature)
+        return index
@@ -0,0 +1,96 @@
+"""
+Cache kết quả đọc CV (text đã làm sạch, các section, tên ứng viên) theo hash nội dung PDF
+"""
+
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+from metrics import count_cache
+
+# Tăng khi thay đổi clean_pdf_text / split_cv_sections để bỏ qua cache cũ
+PARSE_CACHE_VERSION = 1
+
+
+class ParseCache:
+    """
+    Lưu mỗi CV đã đọc thành một file JSON nén zlib trên đĩa (dùng chung giữa
+    các tab và các phiên Streamlit), kèm một lớp LRU trong bộ nhớ cho các CV hay dùng.
+    """
+
+    def __init__(self, cache_dir: str, max_memory_entries: int):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.json.z")
+
+    def _remember(self, content_hash: str, parsed: Dict):
+        self._memory[content_hash] = parsed
+        self._memory.move_to_end(content_hash)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, content_hash: str) -> Optional[Dict]:
+        """
+        Lấy CV đã đọc theo hash nội dung PDF (None nếu chưa có)
+        """
+        with self._lock:
+            parsed = self._memory.get(content_hash)
+            if parsed is not None:
+                self._memory.move_to_end(content_hash)
+                self.hits += 1
+                count_cache("parse", hits=1)
+                return parsed
+
+        try:
+            with open(self._path(content_hash), "rb") as f:
+                payload = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except (OSError, zlib.error, ValueError):
+            payload = None
+
+        with self._lock:
+            if payload is None or payload.get("version") != PARSE_CACHE_VERSION:
+                self.misses += 1
+                count_cache("parse", misses=1)
+                return None
+            parsed = {
+                "text": payload["text"],
+                "applicant_name": payload["applicant_name"],
+                "sections": [tuple(section) for section in payload["sections"]],
+            }
+            self._remember(content_hash, parsed)
+            self.hits += 1
+            count_cache("parse", hits=1)
+            return parsed
+
+    def put(self, content_hash: str, parsed: Dict):
+        """
+        Lưu CV đã đọc (ghi file tạm rồi đổi tên để an toàn khi nhiều process cùng ghi)
+        """
+        payload = {
+            "version": PARSE_CACHE_VERSION,
+            "text": parsed["text"],
+            "applicant_name": parsed["applicant_name"],
+            "sections": [list(section) for section in parsed["sections"]],
+        }
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        path = self._path(content_hash)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(content_hash, parsed)
+
+    def stats(self) -> dict:
+        """Thống kê hit/miss của cache"""
+        return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
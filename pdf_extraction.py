@@ -0,0 +1,148 @@
+"""
+Trích xuất text từ PDF CV (dùng chung cho tab chat, tab chấm điểm và vector store)
+"""
+
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Tuple
+import fitz
+from langchain.schema import Document
+from config import (
+    PDF_EXTRACTION_WORKERS, PDF_EXTRACTION_MIN_FILES_FOR_POOL,
+    PARSE_CACHE_DIR, PARSE_CACHE_MEMORY_ENTRIES
+)
+from metrics import get_metrics, trace
+from parse_cache import ParseCache
+from text_processing import clean_pdf_text, split_cv_sections
+
+_parse_cache = None
+
+
+def get_parse_cache() -> ParseCache:
+    """
+    Lấy cache CV đã đọc (dùng chung cho cả process)
+    """
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParseCache(PARSE_CACHE_DIR, max_memory_entries=PARSE_CACHE_MEMORY_ENTRIES)
+        get_metrics().register_cache("parse", _parse_cache.stats)
+    return _parse_cache
+
+
+def iter_pdf_pages(data: bytes) -> Iterator[str]:
+    """
+    Đọc lần lượt text của từng trang PDF (không giữ toàn bộ file trong một chuỗi)
+    """
+    with fitz.open(stream=data, filetype="pdf") as doc_fitz:
+        for page in doc_fitz:
+            yield page.get_text("text") or ""
+
+
+def extract_pdf_text(data: bytes) -> str:
+    """
+    Trích xuất và làm sạch text của toàn bộ file PDF
+    """
+    return clean_pdf_text("\n".join(iter_pdf_pages(data)))
+
+
+def _extract_pdf_text_timed(data: bytes) -> Tuple[str, float, float]:
+    """
+    Như `extract_pdf_text` nhưng trả thêm thời gian đọc PDF và làm sạch text
+    (chạy trong process con nên thời gian được gửi về process cha để ghi nhận)
+    """
+    start = time.perf_counter()
+    raw_text = "\n".join(iter_pdf_pages(data))
+    extracted = time.perf_counter()
+    text = clean_pdf_text(raw_text)
+    return text, extracted - start, time.perf_counter() - extracted
+
+
+def _extract_and_record(file_name: str, result: Tuple[str, float, float]) -> str:
+    text, extract_seconds, clean_seconds = result
+    metrics = get_metrics()
+    metrics.observe("pdf_extract", extract_seconds, file_name=file_name)
+    metrics.observe("clean_pdf_text", clean_seconds, file_name=file_name)
+    return text
+
+
+def make_cv_document(file_name: str, text: str) -> Document:
+    """Tạo Document cho một CV đã trích xuất"""
+    return Document(
+        page_content=text,
+        metadata={
+            "source": "pdf",
+            "file_name": file_name
+        }
+    )
+
+
+def extract_documents(files: List[Tuple[str, bytes]], max_workers: int = PDF_EXTRACTION_WORKERS) -> Iterator[Tuple[int, Document]]:
+    """
+    Trích xuất nhiều file PDF (file_name, bytes) song song bằng process pool.
+    Trả về generator (vị trí trong `files`, Document) theo thứ tự file nào xong trước.
+    Với ít file, xử lý ngay trong process hiện tại để tránh chi phí khởi tạo pool.
+    """
+    if max_workers <= 1 or len(files) < PDF_EXTRACTION_MIN_FILES_FOR_POOL:
+        for i, (file_name, data) in enumerate(files):
+            try:
+                result = _extract_pdf_text_timed(data)
+            except Exception as e:
+                get_metrics().observe("pdf_extract", 0.0, error=True, file_name=file_name, error_type=type(e).__name__)
+                raise
+            yield i, make_cv_document(file_name, _extract_and_record(file_name, result))
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_extract_pdf_text_timed, data): i
+            for i, (_, data) in enumerate(files)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            file_name = files[i][0]
+            try:
+                result = future.result()
+            except Exception as e:
+                get_metrics().observe("pdf_extract", 0.0, error=True, file_name=file_name, error_type=type(e).__name__)
+                raise
+            yield i, make_cv_document(file_name, _extract_and_record(file_name, result))
+
+
+def parse_cv_text(text: str) -> Dict:
+    """
+    Tách section và tên ứng viên (dòng đầu tiên) từ text CV đã làm sạch
+    """
+    with trace("split_cv_sections"):
+        sections = split_cv_sections(text)
+    return {
+        "text": text,
+        "applicant_name": text.strip().split("\n")[0].strip() if text.strip() else "",
+        "sections": sections,
+    }
+
+
+def parse_pdf_files(files: List[Tuple[str, bytes]], max_workers: int = PDF_EXTRACTION_WORKERS) -> Iterator[Tuple[int, Dict]]:
+    """
+    Đọc nhiều CV (file_name, bytes), dùng cache theo hash nội dung PDF.
+    CV đã có trong cache được trả về ngay, không cần mở PDF; các CV còn lại
+    được trích xuất song song qua `extract_documents` rồi lưu vào cache.
+    Trả về generator (vị trí trong `files`, dict gồm text, applicant_name,
+    sections, file_name, content_hash).
+    """
+    cache = get_parse_cache()
+    missing = []
+    for i, (file_name, data) in enumerate(files):
+        content_hash = hashlib.md5(data).hexdigest()
+        parsed = cache.get(content_hash)
+        if parsed is not None:
+            yield i, {**parsed, "file_name": file_name, "content_hash": content_hash}
+        else:
+            missing.append((i, content_hash))
+
+    missing_files = [files[i] for i, _ in missing]
+    for j, document in extract_documents(missing_files, max_workers=max_workers):
+        i, content_hash = missing[j]
+        parsed = parse_cv_text(document.page_content)
+        cache.put(content_hash, parsed)
+        yield i, {**parsed, "file_name": files[i][0], "content_hash": content_hash}
@@ -0,0 +1,56 @@
+"""
+Sàng lọc CV bằng embedding trước khi chấm điểm bằng LLM: độ tương đồng
+cosine giữa yêu cầu công việc và mục skills / projects của mọi CV được
+tính bằng một phép nhân ma trận
+"""
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def screening_scores(
+    cv_sections: List[Tuple[str, str]],
+    job_requirements: Dict[str, List[str]],
+    embeddings: Embeddings,
+) -> np.ndarray:
+    """
+    Độ tương đồng của từng CV với yêu cầu công việc.
+    `cv_sections` là danh sách (skills_section, projects_section) như `extract_scoring_sections`.
+    Điểm = trung bình cosine(skills CV, skills yêu cầu) và cosine(projects CV,
+    loại project yêu cầu), chỉ tính chiều có yêu cầu; mục CV trống có cosine 0.
+    """
+    if not cv_sections:
+        return np.zeros(0, dtype=np.float32)
+    required = [job_requirements.get("skills", []), job_requirements.get("projects_related", [])]
+    weights = np.array([1.0 if items else 0.0 for items in required], dtype=np.float32)
+    if not weights.any():
+        return np.zeros(len(cv_sections), dtype=np.float32)
+
+    # Dòng 2i: skills của CV i, dòng 2i+1: projects của CV i
+    texts = [section for pair in cv_sections for section in pair]
+    non_empty = [i for i, text in enumerate(texts) if text.strip()]
+    query_vectors = np.asarray(embeddings.embed_documents([", ".join(items) or "-" for items in required]), dtype=np.float32)
+    cv_vectors = np.zeros((len(texts), query_vectors.shape[1]), dtype=np.float32)
+    if non_empty:
+        cv_vectors[non_empty] = np.asarray(embeddings.embed_documents([texts[i] for i in non_empty]), dtype=np.float32)
+
+    similarities = _normalize_rows(cv_vectors) @ _normalize_rows(query_vectors).T  # (2n, 2)
+    per_dimension = np.stack([similarities[0::2, 0], similarities[1::2, 1]], axis=1)
+    return (per_dimension @ weights / weights.sum()).astype(np.float32)
+
+
+def select_candidates(scores: np.ndarray, top_k: Optional[int], min_similarity: float = 0.0) -> List[int]:
+    """
+    Chỉ số các CV được chấm tiếp: tối đa `top_k` CV có điểm cao nhất và
+    không thấp hơn `min_similarity`, theo thứ tự điểm giảm dần
+    """
+    order = np.argsort(-scores, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+    return [int(i) for i in order if scores[i] >= min_similarity]
@@ -0,0 +1,153 @@
+"""
+Cache kết quả LLM cho tính năng chấm điểm (SQLite):
+- Mức 1: hash mô tả công việc đã chuẩn hoá -> yêu cầu đã phân tích (JSON)
+- Mức 2: (hash section CV, hash yêu cầu, model, phiên bản prompt) -> điểm
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from metrics import count_cache
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 của chuỗi"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_job_description(job_description: str) -> str:
+    """
+    Chuẩn hoá mô tả công việc: bỏ khác biệt về khoảng trắng và chữ hoa/thường
+    """
+    return re.sub(r"\s+", " ", job_description).strip().lower()
+
+
+def hash_requirements(requirements: List[str]) -> str:
+    """Hash của một danh sách yêu cầu (skills hoặc loại project)"""
+    return hash_text(json.dumps(requirements, ensure_ascii=False))
+
+
+def make_score_key(dimension: str, section: str, requirements: List[str], model_name: str, prompt_version: int) -> str:
+    """
+    Key cache điểm của một mục CV (skills hoặc projects) với một danh sách yêu cầu
+    """
+    return hash_text("\0".join([
+        dimension, hash_text(section), hash_requirements(requirements), model_name, str(prompt_version)
+    ]))
+
+
+class ResultCache:
+    """
+    Cache hai mức trên SQLite, có TTL. Dùng được từ nhiều luồng và nhiều process.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS requirements ("
+                "jd_hash TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "key TEXT PRIMARY KEY, requirements_hash TEXT NOT NULL, "
+                "score REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS scores_requirements ON scores (requirements_hash)"
+            )
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl_seconds
+
+    def _count(self, found: bool):
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        count_cache("result", hits=int(found), misses=int(not found))
+
+    def get_requirements(self, job_description: str) -> Optional[Dict[str, List[str]]]:
+        """
+        Lấy yêu cầu đã phân tích của mô tả công việc (None nếu chưa có hoặc đã hết hạn)
+        """
+        jd_hash = hash_text(normalize_job_description(job_description))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM requirements WHERE jd_hash = ? AND created_at >= ?",
+                (jd_hash, self._fresh_after())
+            ).fetchone()
+            self._count(row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put_requirements(self, job_description: str, requirements: Dict[str, List[str]]):
+        jd_hash = hash_text(normalize_job_description(job_description))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO requirements VALUES (?, ?, ?)",
+                (jd_hash, json.dumps(requirements, ensure_ascii=False), time.time())
+            )
+
+    def get_score(self, key: str) -> Optional[float]:
+        """
+        Lấy điểm đã chấm theo key (xem `make_score_key`)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT score FROM scores WHERE key = ? AND created_at >= ?",
+                (key, self._fresh_after())
+            ).fetchone()
+            self._count(row is not None)
+        return row[0] if row else None
+
+    def put_score(self, key: str, requirements: List[str], score: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                (key, hash_requirements(requirements), score, time.time())
+            )
+
+    def invalidate_job_description(self, job_description: str):
+        """Xoá kết quả phân tích của một mô tả công việc"""
+        jd_hash = hash_text(normalize_job_description(job_description))
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM requirements WHERE jd_hash = ?", (jd_hash,))
+
+    def invalidate_requirements(self, requirements: List[str]):
+        """Xoá mọi điểm đã chấm theo một danh sách yêu cầu"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM scores WHERE requirements_hash = ?", (hash_requirements(requirements),)
+            )
+
+    def purge_expired(self):
+        """Xoá các entry đã hết hạn"""
+        fresh_after = self._fresh_after()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM requirements WHERE created_at < ?", (fresh_after,))
+            self._conn.execute("DELETE FROM scores WHERE created_at < ?", (fresh_after,))
+
+    def clear(self):
+        """Xoá toàn bộ cache"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM requirements")
+            self._conn.execute("DELETE FROM scores")
+
+    def stats(self) -> dict:
+        """Thống kê hit/miss của cache"""
+        return {"hits": self.hits, "misses": self.misses}
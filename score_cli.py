@@ -0,0 +1,228 @@
+"""
+Chấm điểm CV không cần giao diện: đọc PDF từ thư mục, ghi kết quả ra JSONL/CSV
+ngay khi từng CV chấm xong, chạy tiếp được sau khi bị dừng giữa chừng
+
+Chạy: python score_cli.py --jd jd.txt --input cvs/ --output results.jsonl --top-n 20
+      python score_cli.py --jd jd.txt --input cvs/ --output results.csv --llm fake
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Set, Tuple
+from config import (
+    SCORING_MAX_WORKERS, LLM_REQUESTS_PER_SECOND, SCORING_BATCH_TOKEN_BUDGET
+)
+from cv_scoring import SkillMatcher, analyze_job_requirements, get_result_cache, rank_cvs
+from llm_clients import create_scoring_llm
+from metrics import get_metrics
+from result_cache import hash_text, normalize_job_description
+from scoring_engine import score_cvs_concurrently
+
+OUTPUT_FIELDS = [
+    "file_name", "applicant_name", "skills_score", "projects_score", "total_score", "matched_skills", "duplicate_of"
+]
+
+
+def iter_pdf_paths(input_dir: str) -> Iterator[str]:
+    """Đường dẫn (tương đối so với `input_dir`) các file PDF trong thư mục, theo thứ tự tên"""
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.relpath(os.path.join(root, name), input_dir)
+
+
+def iter_chunks(paths: Iterator[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _truncate_partial_line(path: str):
+    """Bỏ dòng ghi dở ở cuối file (khi process bị dừng giữa lúc ghi)"""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class ResultWriter:
+    """
+    Ghi kết quả từng CV ra JSONL hoặc CSV (theo đuôi file) và flush sau mỗi dòng.
+    File kết quả đồng thời là checkpoint: các CV đã có trong file được bỏ qua khi chạy lại.
+    """
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        if restart and os.path.exists(path):
+            os.remove(path)
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            _truncate_partial_line(path)
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._csv = None
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS)
+            if not exists:
+                self._csv.writeheader()
+
+    def read_existing(self) -> List[Dict]:
+        """Các kết quả đã ghi từ lần chạy trước"""
+        rows = []
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            if self.format == "csv":
+                for row in csv.DictReader(f):
+                    for field in ("skills_score", "projects_score", "total_score"):
+                        row[field] = float(row[field])
+                    row["matched_skills"] = [s for s in row.get("matched_skills", "").split("; ") if s]
+                    rows.append(row)
+            else:
+                for line in f:
+                    if line.strip():
+                        rows.append(json.loads(line))
+        return rows
+
+    def write(self, row: Dict):
+        row = {field: row.get(field) for field in OUTPUT_FIELDS}
+        if self.format == "csv":
+            self._csv.writerow({**row, "matched_skills": "; ".join(row["matched_skills"] or [])})
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class TopN:
+    """Giữ N CV điểm cao nhất bằng min-heap thay vì sắp xếp toàn bộ kết quả"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: List[Tuple[float, int, Dict]] = []
+        self._seq = 0
+
+    def push(self, row: Dict):
+        # seq âm: cùng điểm thì CV chấm trước được giữ
+        item = (row["total_score"], -self._seq, row)
+        self._seq += 1
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def ranked(self) -> List[Dict]:
+        return rank_cvs([row for _, _, row in sorted(self._heap, key=lambda item: item[:2], reverse=True)])
+
+
+def _check_job_description(meta_path: str, job_description: str, restart: bool):
+    """
+    Lưu hash mô tả công việc cạnh file kết quả; không cho chạy tiếp với mô tả khác
+    """
+    jd_hash = hash_text(normalize_job_description(job_description))
+    if not restart and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f).get("jd_hash") != jd_hash:
+                sys.exit(f"{meta_path}: kết quả đã có được chấm theo mô tả công việc khác (dùng --restart để chấm lại)")
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"jd_hash": jd_hash}, f)
+
+
+def create_llm(name: str, delay: float):
+    if name == "openai":
+        return create_scoring_llm()
+    if name == "fake":
+        from fake_llm import FakeLLM
+        return FakeLLM(delay=delay)
+    raise ValueError(f"LLM không hợp lệ: {name}")
+
+
+def positive_int(value: str) -> int:
+    """Kiểu argparse: số nguyên >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"phải là số nguyên >= 1: {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chấm điểm CV trong thư mục theo mô tả công việc")
+    parser.add_argument("--jd", required=True, help="file text chứa mô tả công việc")
+    parser.add_argument("--input", required=True, help="thư mục chứa CV (PDF, tìm cả thư mục con)")
+    parser.add_argument("--output", required=True, help="file kết quả .jsonl hoặc .csv (cũng là checkpoint)")
+    parser.add_argument("--top-n", type=positive_int, default=20, help="số CV điểm cao nhất in ra khi chấm xong")
+    parser.add_argument("--top-output", help="ghi top-N ra file JSON này")
+    parser.add_argument("--chunk-size", type=positive_int, default=200, help="số PDF đọc vào bộ nhớ mỗi đợt")
+    parser.add_argument("--workers", type=int, default=SCORING_MAX_WORKERS)
+    parser.add_argument("--rps", type=float, default=LLM_REQUESTS_PER_SECOND, help="giới hạn request LLM/giây")
+    parser.add_argument("--batch", action="store_true", help="chấm theo lô (nhiều CV mỗi request)")
+    parser.add_argument("--llm-skills", action="store_true", help="chấm skills bằng LLM thay vì từ điển")
+    parser.add_argument("--llm", default="openai", choices=["openai", "fake"])
+    parser.add_argument("--fake-delay", type=float, default=0.2, help="độ trễ của LLM giả lập (giây)")
+    parser.add_argument("--restart", action="store_true", help="bỏ kết quả cũ và chấm lại từ đầu")
+    parser.add_argument("--metrics", help="ghi số liệu thời gian/token theo bước (định dạng Prometheus) ra file này")
+    args = parser.parse_args()
+
+    with open(args.jd, "r", encoding="utf-8") as f:
+        job_description = f.read()
+    _check_job_description(args.output + ".meta.json", job_description, args.restart)
+
+    llm = create_llm(args.llm, args.fake_delay)
+    result_cache = get_result_cache()
+    job_requirements = analyze_job_requirements(job_description, llm, result_cache)
+    print(f"Skills: {', '.join(job_requirements.get('skills', []))}", file=sys.stderr)
+    print(f"Projects: {', '.join(job_requirements.get('projects_related', []))}", file=sys.stderr)
+    skill_matcher = None if args.llm_skills else SkillMatcher(job_requirements.get("skills", []))
+
+    writer = ResultWriter(args.output, restart=args.restart)
+    top = TopN(args.top_n)
+    done: Set[str] = set()
+    for row in writer.read_existing():
+        done.add(row["file_name"])
+        top.push(row)
+    if done:
+        print(f"Tiếp tục: bỏ qua {len(done)} CV đã chấm", file=sys.stderr)
+
+    scored = 0
+    try:
+        pending = (path for path in iter_pdf_paths(args.input) if path not in done)
+        for chunk in iter_chunks(pending, args.chunk_size):
+            files = []
+            for path in chunk:
+                with open(os.path.join(args.input, path), "rb") as f:
+                    files.append((path, f.read()))
+            for row in score_cvs_concurrently(
+                files, job_requirements, llm,
+                max_workers=args.workers, requests_per_second=args.rps,
+                batch_token_budget=SCORING_BATCH_TOKEN_BUDGET if args.batch else None,
+                result_cache=result_cache, skill_matcher=skill_matcher,
+            ):
+                writer.write(row)
+                top.push(row)
+                scored += 1
+            print(f"Đã chấm {len(done) + scored} CV", file=sys.stderr)
+    finally:
+        writer.close()
+        if args.metrics:
+            get_metrics().write_prometheus(args.metrics)
+
+    ranked = top.ranked()
+    for i, row in enumerate(ranked, start=1):
+        print(f"{i:>3}. {row['total_score']:>4} {row['applicant_name']} ({row['file_name']})")
+    if args.top_output:
+        with open(args.top_output, "w", encoding="utf-8") as f:
+            json.dump(ranked, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
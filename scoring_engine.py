@@ -0,0 +1,298 @@
+"""
+Chấm điểm nhiều CV song song với giới hạn số luồng và tốc độ gọi LLM
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain.schema.runnable import RunnableLambda
+from config import (
+    SCORING_MAX_WORKERS, LLM_REQUESTS_PER_SECOND, LLM_BURST, SCORING_BATCH_MAX_SIZE, NEAR_DUPLICATE_DETECTION
+)
+from cv_scoring import (
+    extract_scoring_sections, score_skills, score_projects, score_cv_batch,
+    estimate_batch_item_tokens, estimate_batch_base_tokens,
+    get_llm_name, SkillMatcher, SCORING_PROMPT_VERSION
+)
+from metrics import submit_in_context
+from near_duplicates import NearDuplicateIndex, minhash_signature
+from pdf_extraction import parse_pdf_files
+from result_cache import ResultCache, make_score_key
+
+
+class TokenBucket:
+    """
+    Bộ giới hạn tốc độ kiểu token bucket (an toàn khi dùng nhiều luồng)
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Chờ tới khi có token rồi lấy 1 token"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def rate_limited(llm, limiter: Optional[TokenBucket]):
+    """
+    Bọc LLM để mỗi lần gọi phải lấy token từ limiter trước
+    """
+    if limiter is None:
+        return llm
+
+    def invoke(prompt_value):
+        limiter.acquire()
+        return llm.invoke(prompt_value)
+
+    return RunnableLambda(invoke)
+
+
+def score_cvs_concurrently(
+    files: List[Tuple[str, bytes]],
+    job_requirements: Dict[str, List[str]],
+    llm,
+    max_workers: int = SCORING_MAX_WORKERS,
+    requests_per_second: Optional[float] = LLM_REQUESTS_PER_SECOND,
+    batch_token_budget: Optional[int] = None,
+    max_batch_size: int = SCORING_BATCH_MAX_SIZE,
+    result_cache: Optional[ResultCache] = None,
+    skill_matcher: Optional[SkillMatcher] = None,
+    dedupe: bool = NEAR_DUPLICATE_DETECTION,
+) -> Iterator[Dict]:
+    """
+    Chấm điểm danh sách CV (file_name, bytes) song song.
+    CV được đọc qua `parse_pdf_files` (cache theo hash nội dung, trích xuất bằng
+    process pool khi chưa có trong cache); ngay khi một CV sẵn sàng, 2 lần gọi
+    LLM (skills, projects) của nó được đưa vào thread pool.
+    Kết quả được trả về ngay khi từng CV chấm xong (không theo thứ tự đầu vào).
+
+    Nếu có `batch_token_budget`, các CV được gom thành lô vừa với ngân sách token
+    và mỗi lô chỉ cần một request LLM (xem `score_cv_batch`).
+    Nếu có `result_cache`, chỉ những mục CV / yêu cầu chưa từng chấm mới gọi LLM.
+    Nếu có `skill_matcher`, skills được chấm bằng từ điển trên toàn bộ text CV
+    (kết quả có thêm "matched_skills"), chỉ projects cần gọi LLM.
+    Nếu `dedupe`, CV gần trùng với một CV đã gặp (near_duplicates.py) không được
+    chấm lại mà nhận bản sao điểm của CV đó (kèm "duplicate_of", "duplicate_similarity").
+    Mỗi kết quả có "cv_index": vị trí của CV trong `files`.
+    """
+    limiter = TokenBucket(requests_per_second, LLM_BURST) if requests_per_second else None
+    yield from score_parsed_cvs(
+        parse_pdf_files(files), job_requirements, llm,
+        max_workers=max_workers, limiter=limiter, batch_token_budget=batch_token_budget,
+        max_batch_size=max_batch_size, result_cache=result_cache, skill_matcher=skill_matcher, dedupe=dedupe,
+    )
+
+
+def score_parsed_cvs(
+    parsed_cvs: Iterable[Tuple[int, Dict]],
+    job_requirements: Dict[str, List[str]],
+    llm,
+    max_workers: int = SCORING_MAX_WORKERS,
+    limiter: Optional[TokenBucket] = None,
+    batch_token_budget: Optional[int] = None,
+    max_batch_size: int = SCORING_BATCH_MAX_SIZE,
+    result_cache: Optional[ResultCache] = None,
+    skill_matcher: Optional[SkillMatcher] = None,
+    executor: Optional[ThreadPoolExecutor] = None,
+    dedupe: bool = NEAR_DUPLICATE_DETECTION,
+) -> Iterator[Dict]:
+    """
+    Như `score_cvs_concurrently` nhưng nhận CV đã đọc: (chỉ số, kết quả của `parse_pdf_files`).
+    Có thể dùng chung `executor` và `limiter` giữa nhiều lần chấm chạy song song
+    (vd. nhiều mô tả công việc); khi đó executor không bị đóng khi chấm xong.
+    """
+    scoring_llm = rate_limited(llm, limiter)
+    llm_name = get_llm_name(llm)
+    requirements = {
+        "skills_score": job_requirements.get("skills", []),
+        "projects_score": job_requirements.get("projects_related", []),
+    }
+    scorers = {"skills_score": score_skills, "projects_score": score_projects}
+    batch_item_budget = (
+        batch_token_budget - estimate_batch_base_tokens(job_requirements) if batch_token_budget else 0
+    )
+
+    with nullcontext(executor) if executor is not None else ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        results: Dict[int, Dict] = {}
+        cache_keys: Dict[int, Dict[str, str]] = {}
+        batch: List[int] = []
+        batch_sections: List[Tuple[str, str]] = []
+        batch_tokens = 0
+        near_duplicates = NearDuplicateIndex() if dedupe else None
+        finished: Dict[int, Dict] = {}          # CV đại diện đã chấm xong
+        members: Dict[int, List[Dict]] = {}     # CV đại diện -> CV gần trùng đang chờ điểm
+
+        def copy_scores(row: Dict, member: Dict) -> Dict:
+            return {**row, **member, "duplicate_of": row["file_name"]}
+
+        def submit_batch():
+            pending[submit_in_context(executor, score_cv_batch, list(batch_sections), job_requirements, scoring_llm)] = ("batch", list(batch))
+            batch.clear()
+            batch_sections.clear()
+
+        def set_score(i: int, dimension: str, score: float, from_cache: bool = False):
+            row = results[i]
+            row.setdefault(dimension, score)
+            key = cache_keys.get(i, {}).get(dimension)
+            if key and not from_cache:
+                result_cache.put_score(key, requirements[dimension], score)
+
+        def finish(i: int) -> Iterator[Dict]:
+            row = results[i]
+            if "skills_score" in row and "projects_score" in row:
+                row["total_score"] = row["skills_score"] + row["projects_score"]
+                cache_keys.pop(i, None)
+                row = results.pop(i)
+                yield row
+                if near_duplicates is not None:
+                    finished[i] = row
+                    for member in members.pop(i, []):
+                        yield copy_scores(row, member)
+
+        def collect(done) -> Iterator[Dict]:
+            for future in done:
+                stage, i = pending.pop(future)
+                if stage == "batch":
+                    for cv_index, scores in zip(i, future.result()):
+                        set_score(cv_index, "skills_score", scores["skills_score"])
+                        set_score(cv_index, "projects_score", scores["projects_score"])
+                        yield from finish(cv_index)
+                    continue
+
+                set_score(i, stage, future.result())
+                yield from finish(i)
+
+        for i, parsed in parsed_cvs:
+            if near_duplicates is not None:
+                signature = minhash_signature(parsed["text"])
+                match = near_duplicates.find(signature)
+                if match is not None:
+                    representative, similarity = match
+                    member = {
+                        "cv_index": i,
+                        "applicant_name": parsed["applicant_name"] or parsed["file_name"],
+                        "file_name": parsed["file_name"],
+                        "duplicate_similarity": round(similarity, 3),
+                    }
+                    if representative in finished:
+                        yield copy_scores(finished[representative], member)
+                    else:
+                        members.setdefault(representative, []).append(member)
+                    continue
+                if signature is not None:
+                    near_duplicates.add(i, signature)
+
+            skills_section, projects_section = extract_scoring_sections(parsed["sections"])
+            sections = {"skills_score": skills_section, "projects_score": projects_section}
+            results[i] = {
+                "cv_index": i,
+                "applicant_name": parsed["applicant_name"] or parsed["file_name"],
+                "file_name": parsed["file_name"],
+            }
+            if skill_matcher is not None:
+                skills_score, results[i]["matched_skills"] = skill_matcher.score(parsed["text"])
+                set_score(i, "skills_score", skills_score)
+                skills_section = ""  # không gửi mục skills trong prompt theo lô
+
+            # Lấy điểm đã chấm từ cache (mục trống thì không cần LLM)
+            missing = []
+            for dimension, section in sections.items():
+                if dimension in results[i]:
+                    continue
+                if not section or not requirements[dimension]:
+                    set_score(i, dimension, 0)
+                    continue
+                if result_cache is not None:
+                    key = make_score_key(dimension, section, requirements[dimension], llm_name, SCORING_PROMPT_VERSION)
+                    cache_keys.setdefault(i, {})[dimension] = key
+                    cached = result_cache.get_score(key)
+                    if cached is not None:
+                        set_score(i, dimension, cached, from_cache=True)
+                        continue
+                missing.append(dimension)
+
+            if not missing:
+                yield from finish(i)
+            elif batch_token_budget:
+                item_tokens = estimate_batch_item_tokens(skills_section, projects_section)
+                if batch and (batch_tokens + item_tokens > batch_item_budget or len(batch) >= max_batch_size):
+                    submit_batch()
+                    batch_tokens = 0
+                batch.append(i)
+                batch_sections.append((skills_section, projects_section))
+                batch_tokens += item_tokens
+            else:
+                for dimension in missing:
+                    future = submit_in_context(
+                        executor, scorers[dimension], sections[dimension], requirements[dimension], scoring_llm
+                    )
+                    pending[future] = (dimension, i)
+
+            # Trả về các CV đã chấm xong trong lúc chờ trích xuất file tiếp theo
+            yield from collect([future for future in pending if future.done()])
+
+        if batch:
+            submit_batch()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+
+def score_cvs_against_jobs(
+    files: List[Tuple[str, bytes]],
+    jobs: List[Dict[str, List[str]]],
+    llm,
+    max_workers: int = SCORING_MAX_WORKERS,
+    requests_per_second: Optional[float] = LLM_REQUESTS_PER_SECOND,
+    batch_token_budget: Optional[int] = None,
+    result_cache: Optional[ResultCache] = None,
+    local_skills: bool = False,
+) -> Tuple[List[Dict], np.ndarray, List[List[Dict]]]:
+    """
+    Chấm N CV theo M mô tả công việc (yêu cầu đã phân tích) trong một lượt:
+    mỗi CV chỉ được đọc một lần, M lượt chấm chạy song song và dùng chung
+    thread pool, bộ giới hạn tốc độ và cache kết quả. CV gần trùng nhận điểm của
+    CV đại diện (xem `score_cvs_concurrently`).
+    Trả về (thông tin N CV, ma trận tổng điểm M x N, chi tiết điểm [job][cv]).
+    """
+    parsed_cvs = list(parse_pdf_files(files))
+    cvs = [None] * len(files)
+    for i, parsed in parsed_cvs:
+        cvs[i] = {"applicant_name": parsed["applicant_name"] or parsed["file_name"], "file_name": parsed["file_name"]}
+
+    limiter = TokenBucket(requests_per_second, LLM_BURST) if requests_per_second else None
+    details: List[List[Optional[Dict]]] = [[None] * len(files) for _ in jobs]
+
+    def score_job(j: int):
+        skill_matcher = SkillMatcher(jobs[j].get("skills", [])) if local_skills else None
+        for row in score_parsed_cvs(
+            parsed_cvs, jobs[j], llm, limiter=limiter, batch_token_budget=batch_token_budget,
+            result_cache=result_cache, skill_matcher=skill_matcher, executor=executor,
+        ):
+            details[j][row["cv_index"]] = row
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            ThreadPoolExecutor(max_workers=max(len(jobs), 1)) as drivers:
+        for future in [submit_in_context(drivers, score_job, j) for j in range(len(jobs))]:
+            future.result()
+
+    scores = np.array([[row["total_score"] for row in job_rows] for job_rows in details], dtype=np.float32)
+    return cvs, scores.reshape(len(jobs), len(files)), details
@@ -0,0 +1,201 @@
+"""
+API service (api_server.py) chạy như khi triển khai, với API model là server giả lập
+(fake_openai_server.py): /ingest, /ask (stream NDJSON và JSON), /score và micro-batching
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from api_client import CVApiClient
+from fake_openai_server import create_app as create_fake_openai_app
+from synthetic_cvs import generate_corpus
+
+JOB_DESCRIPTION = (
+    "Kỹ năng cần thiết: Python, PyTorch, TensorFlow, SQL, Docker.\n"
+    "Project liên quan: machine learning, chatbot, computer vision."
+)
+# Độ trễ mỗi request của API model giả lập, đủ để các prompt đồng thời được gom lại
+FAKE_DELAY = 0.05
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def fake_openai():
+    """Server giả lập chạy bằng uvicorn trong luồng nền của process test"""
+    import uvicorn
+
+    app = create_fake_openai_app(FAKE_DELAY)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    yield app.state.fake_openai, f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture(scope="module")
+def api_url(fake_openai, tmp_path_factory):
+    """
+    API service trong process riêng: config được đọc khi import nên mọi cache
+    (index, embedding, kết quả, đọc PDF) được đặt vào thư mục tạm qua biến môi trường
+    """
+    _, fake_url = fake_openai
+    workdir = tmp_path_factory.mktemp("api")
+    port = free_port()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": fake_url,
+        "OPENAI_API_KEY": "test",
+        "EMBEDDING_BACKEND": "hashing",
+        "CHAT_LLM_BACKEND": "openai",
+        "API_LLM_BACKEND": "openai",
+        "INDEX_DIR": str(workdir / "index"),
+        "EMBEDDING_CACHE_DIR": str(workdir / "embeddings"),
+        "RESULT_CACHE_PATH": str(workdir / "results.sqlite3"),
+        "PARSE_CACHE_DIR": str(workdir / "parsed"),
+        "METRICS_PROM_FILE": str(workdir / "metrics.prom"),
+        "NO_PROXY": "127.0.0.1,localhost",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while True:
+        if process.poll() is not None:
+            pytest.fail(f"API service dừng với mã {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                break
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            process.kill()
+            pytest.fail("API service không khởi động")
+        time.sleep(0.2)
+    yield url
+    process.terminate()
+    process.wait(timeout=10)
+
+
+@pytest.fixture(scope="module")
+def client(api_url):
+    client = CVApiClient(api_url)
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return generate_corpus(6, seed=3)
+
+
+@pytest.fixture(scope="module")
+def ingested(client, corpus):
+    return client.ingest(corpus)
+
+
+def test_ingest_adds_files_once(client, api_url, corpus, ingested):
+    assert [item["file_name"] for item in ingested] == [file_name for file_name, _ in corpus]
+    assert all(item["new"] and item["chunks"] > 0 for item in ingested)
+
+    again = client.ingest(corpus[:2])
+    assert [item["new"] for item in again] == [False, False]
+    assert [item["file_hash"] for item in again] == [item["file_hash"] for item in ingested[:2]]
+    health = httpx.get(f"{api_url}/health", timeout=10).json()
+    assert health["files"] == len(corpus)
+
+
+def test_ask_stream_ndjson(api_url, ingested):
+    payload = {"question": "Ứng viên nào biết Python?", "file_hashes": [item["file_hash"] for item in ingested], "stream": True}
+    with httpx.stream("POST", f"{api_url}/ask", json=payload, timeout=60) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    tokens = [event["token"] for event in events[:-1]]
+    assert tokens and all("token" in event for event in events[:-1])
+    done = events[-1]["done"]
+    assert done["answer"] == "".join(tokens)
+    assert done["cached"] is False
+    assert done["sources"]
+    assert {source["file_name"] for source in done["sources"]} <= {item["file_name"] for item in ingested}
+
+
+def test_ask_json_uses_answer_cache(api_url, ingested):
+    payload = {"question": "Ai có kinh nghiệm Docker?", "file_hashes": [item["file_hash"] for item in ingested]}
+    first = httpx.post(f"{api_url}/ask", json=payload, timeout=60)
+    assert first.status_code == 200
+    first = first.json()
+    assert first["answer"] and first["cached"] is False
+
+    second = httpx.post(f"{api_url}/ask", json=payload, timeout=60).json()
+    assert second["cached"] is True
+    assert second["answer"] == first["answer"]
+
+
+def test_ask_scoped_to_file_hashes(api_url, ingested):
+    own = ingested[0]
+    payload = {"question": "Tóm tắt kỹ năng của ứng viên", "file_hashes": [own["file_hash"]]}
+    done = httpx.post(f"{api_url}/ask", json=payload, timeout=60).json()
+    assert done["sources"]
+    assert {source["file_name"] for source in done["sources"]} == {own["file_name"]}
+
+
+def test_ask_requires_question(api_url):
+    response = httpx.post(f"{api_url}/ask", json={"question": "  "}, timeout=10)
+    assert response.status_code == 400
+
+
+def test_score_ranks_every_cv(client, corpus):
+    result = client.score(corpus, JOB_DESCRIPTION, batch=False, local_skills=False)
+    assert result["job_requirements"]
+    scores = [item["total_score"] for item in result["results"]]
+    assert len(scores) == len(corpus)
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_score_requires_job_description(client, corpus):
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        client.score(corpus[:1], " ")
+    assert error.value.response.status_code == 400
+
+
+def test_concurrent_prompts_are_micro_batched(client, fake_openai):
+    state, _ = fake_openai
+    # CV và mô tả công việc chưa chấm lần nào để không trúng cache kết quả
+    batches = [generate_corpus(6, seed=seed) for seed in range(10, 14)]
+    before = dict(state.counts)
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        results = list(executor.map(
+            lambda i: client.score(batches[i], f"{JOB_DESCRIPTION}\nVị trí số {i}", batch=False, local_skills=False),
+            range(len(batches)),
+        ))
+    assert [len(result["results"]) for result in results] == [len(files) for files in batches]
+
+    prompts = state.counts["prompts"] - before["prompts"]
+    completions = state.counts["completions"] - before["completions"]
+    # Mỗi CV và mỗi mô tả công việc là một prompt; các prompt đồng thời đi chung request
+    assert prompts >= sum(len(files) + 1 for files in batches)
+    assert completions < prompts
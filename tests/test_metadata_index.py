@@ -0,0 +1,79 @@
+"""
+Nhận diện bộ lọc từ câu hỏi: câu hỏi về cả nhóm ứng viên không bị thu hẹp
+vào một CV chỉ vì trùng một từ trong tên
+"""
+
+import pytest
+from metadata_index import MetadataIndex, normalize_text
+
+APPLICANTS = {
+    "nam": ("Phạm Văn Nam", "cv_nam.pdf"),
+    "hung": ("Đỗ Văn Hùng", "cv_hung.pdf"),
+    "an": ("Nguyễn Thị An", "cv_an.pdf"),
+    "lam": ("Đặng Thị Lâm", "cv_lam.pdf"),
+}
+SECTIONS = ("Skills", "Projects", "Experience")
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex()
+    for key, (name, file_name) in APPLICANTS.items():
+        for section in SECTIONS:
+            index.add(f"{key}-{section}", {"applicant_name": name, "file_name": file_name, "section": section})
+    return index
+
+
+def chunk_ids(key, sections=SECTIONS):
+    return {f"{key}-{section}" for section in sections}
+
+
+@pytest.mark.parametrize("question", [
+    "Ứng viên nào có trên 5 năm kinh nghiệm Python?",
+    "Who do we have that knows Python?",
+    "Is there an applicant with React skills?",
+    "Ai đang làm việc với Docker?",
+    "Hùng có biết SQL không?",
+])
+def test_pool_questions_are_not_narrowed_to_one_applicant(index, question):
+    assert "applicant_name" not in index.detect_filters(question)
+    assert index.resolve(question) is None
+
+
+@pytest.mark.parametrize("question, key", [
+    ("Phạm Văn Nam có kỹ năng gì?", "nam"),
+    ("pham van nam co ky nang gi?", "nam"),
+    ("Phạm Nam có kỹ năng gì?", "nam"),
+    ("What skills does Hung Do have?", "hung"),
+    ("Cho tôi biết về Nguyễn Thị An", "an"),
+    ("Đặng Thị Lâm làm ở đâu?", "lam"),
+])
+def test_full_name_or_surname_and_given_name_select_applicant(index, question, key):
+    assert index.detect_filters(question)["applicant_name"] == {normalize_text(APPLICANTS[key][0])}
+
+
+def test_section_narrows_named_applicant(index):
+    assert index.resolve("Dự án của Phạm Văn Nam là gì?") == chunk_ids("nam", ["Projects"])
+
+
+def test_section_alone_does_not_limit_pool(index):
+    assert index.detect_filters("Ai có kinh nghiệm với Kubernetes?") == {"section": {"experience"}}
+    assert index.resolve("Ai có kinh nghiệm với Kubernetes?") is None
+
+
+def test_file_name_selects_applicant(index):
+    assert index.resolve("Tóm tắt cv_hung.pdf") == chunk_ids("hung")
+
+
+def test_names_outside_scope_are_ignored(index):
+    # Phiên chỉ upload CV của Hùng: tên ứng viên của phiên khác không tạo bộ lọc
+    scope = chunk_ids("hung")
+    assert "applicant_name" not in index.detect_filters("Phạm Văn Nam có kỹ năng gì?", scope)
+    assert index.resolve("Phạm Văn Nam có kỹ năng gì?", scope) is None
+    assert index.resolve("Tóm tắt cv_nam.pdf", scope) is None
+
+
+def test_resolve_stays_within_scope(index):
+    scope = chunk_ids("nam") | chunk_ids("hung")
+    assert index.resolve("Dự án của Đỗ Văn Hùng?", scope) == chunk_ids("hung", ["Projects"])
+    assert index.resolve("Dự án của Đỗ Văn Hùng?", chunk_ids("hung", ["Skills"])) == chunk_ids("hung", ["Skills"])
@@ -1,50 +1,76 @@
 """
-Thiết lập vector store và truy xuất thông tin cho tài liệu CV
+Embeddings dùng chung và tạo chunk cho tài liệu CV (index / retrieval nằm ở index_manager.py)
 """
 
-import fitz
 import hashlib
-from typing import List
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+import os
+from typing import List, Tuple
 from langchain.schema import Document
-from config import EMBEDDING_MODEL, VECTOR_RETRIEVER_K, BM25_RETRIEVER_K, HYBRID_WEIGHTS
-from text_processing import clean_pdf_text, split_cv_sections
+from config import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_ENTRIES
+from embedding_backends import create_embedding_backend
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from metrics import get_metrics
+from pdf_extraction import parse_pdf_files, make_cv_document
+from text_processing import split_cv_sections
+
+_cached_embeddings = None
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Lấy embeddings (backend theo EMBEDDING_BACKEND) có cache trên đĩa, dùng chung cho cả process
+    """
+    global _cached_embeddings
+    if _cached_embeddings is None:
+        embeddings, model_name = create_embedding_backend()
+        cache = EmbeddingCache(
+            os.path.join(EMBEDDING_CACHE_DIR, model_name.replace("/", "_")),
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+        )
+        _cached_embeddings = CachedEmbeddings(embeddings, cache, model_name)
+        get_metrics().register_cache("embedding", cache.stats)
+    return _cached_embeddings
 
 
 def process_pdf_files(pdfs) -> List[Document]:
     """
     Xử lý các file PDF đã upload và trả về danh sách đối tượng Document
     """
-    documents = []
-    
+    files = []
     for pdf in pdfs:
         if pdf is not None:
             file_name = pdf.name if hasattr(pdf, "name") else "Unknown"
+            # Đọc binary từ Streamlit upload
+            files.append((file_name, pdf.read()))
+            pdf.seek(0)
 
-            # Mở file PDF với fitz (cần đọc binary từ Streamlit upload)
-            with fitz.open(stream=pdf.read(), filetype="pdf") as doc_fitz:
-                full_text = ""
-                for page in doc_fitz:
-                    page_text = page.get_text("text") or ""
-                    full_text += page_text + "\n"
-                    
-            # Làm sạch text
-            full_text = clean_pdf_text(full_text)
+    documents = [None] * len(files)
+    for i, parsed in parse_pdf_files(files):
+        documents[i] = make_cv_document(parsed["file_name"], parsed["text"])
+    
+    return documents
 
-            documents.append(
+
+def create_chunks_from_sections(applicant_name: str, sections: List[Tuple[str, str]], metadata: dict) -> List[Document]:
+    """
+    Tạo chunks từ các mục CV đã tách sẵn
+    """
+    chunks = []
+    
+    for title, body in sections:
+        if body.strip():
+            chunks.append(
                 Document(
-                    page_content=full_text,
+                    page_content=applicant_name + "\n" + body.strip(),
                     metadata={
-                        "source": "pdf", 
-                        "file_name": file_name
+                        **metadata, 
+                        "section": title, 
+                        "applicant_name": applicant_name
                     }
                 )
             )
     
-    return documents
+    return chunks
 
 
 def create_chunks_from_documents(documents: List[Document]) -> List[Document]:
@@ -57,52 +83,25 @@ def create_chunks_from_documents(documents: List[Document]) -> List[Document]:
         first_line = doc.page_content.strip().split("\n")[0]
         applicant_name = first_line.strip()
         sections = split_cv_sections(doc.page_content)
-        
-        for title, body in sections:
-            if body.strip():
-                all_chunks.append(
-                    Document(
-                        page_content=applicant_name + "\n" + body.strip(),
-                        metadata={
-                            **doc.metadata, 
-                            "section": title, 
-                            "applicant_name": applicant_name
-                        }
-                    )
-                )
+        all_chunks.extend(create_chunks_from_sections(applicant_name, sections, doc.metadata))
     
     return all_chunks
 
 
-def create_hybrid_retriever(all_chunks: List[Document]) -> EnsembleRetriever:
+def calculate_file_hash(pdf) -> str:
     """
-    Tạo hybrid retriever kết hợp vector và BM25 retrieval.
+    Tính MD5 hash nội dung của một file PDF
     """
-    # Tạo embeddings
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
-    knowledge_base = FAISS.from_documents(all_chunks, embeddings)
-
-    # Hybrid retriever
-    vector_retriever = knowledge_base.as_retriever(search_kwargs={"k": VECTOR_RETRIEVER_K})
-    bm25_retriever = BM25Retriever.from_documents(all_chunks)
-    bm25_retriever.k = BM25_RETRIEVER_K
-
-    hybrid_retriever = EnsembleRetriever(
-        retrievers=[vector_retriever, bm25_retriever],
-        weights=HYBRID_WEIGHTS,
-    )
-    
-    return hybrid_retriever
+    pdf.seek(0)
+    file_hash = hashlib.md5(pdf.read()).hexdigest()
+    pdf.seek(0)
+    return file_hash
 
 
 def calculate_pdf_hash(pdfs) -> str:
     """
     Tính MD5 hash của nội dung PDF để phát hiện thay đổi
+    (ghép từ hash của từng file, không cần nối toàn bộ nội dung vào bộ nhớ)
     """
-    pdf_content = b""
-    for pdf in pdfs:
-        if pdf is not None:
-            pdf_content += pdf.read()
-            pdf.seek(0)  
-    
-    return hashlib.md5(pdf_content).hexdigest()
+    file_hashes = [calculate_file_hash(pdf) for pdf in pdfs if pdf is not None]
+    return hashlib.md5("".join(file_hashes).encode("utf-8")).hexdigest()